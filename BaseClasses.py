@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-import copy
 import functools
 import logging
+import math
 import random
 import secrets
 import typing  # this can go away when Python 3.8 support is dropped
 from argparse import Namespace
 from collections import OrderedDict, Counter, deque, ChainMap
+from collections.abc import MutableMapping, MutableSet
 from enum import IntEnum, IntFlag
 from typing import List, Dict, Optional, Set, Iterable, Union, Any, Tuple, TypedDict, Callable, NamedTuple
 
@@ -527,47 +528,32 @@ class MultiWorld():
         prog_locations = {location for location in self.get_locations() if location.item
                           and location.item.advancement and location not in state.locations_checked}
 
-        while prog_locations:
-            sphere = set()
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-            for location in prog_locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            if not sphere:
-                # ran out of places and did not finish yet, quit
-                return False
-
+        # build up spheres of collection radius.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+        for sphere in state.iter_spheres(prog_locations):
             for location in sphere:
                 state.collect(location.item, True, location)
-            prog_locations -= sphere
 
             if self.has_beaten_game(state):
                 return True
 
+        # ran out of places and did not finish yet, quit
         return False
 
     def get_spheres(self):
         state = CollectionState(self)
         locations = set(self.get_filled_locations())
 
-        while locations:
-            sphere = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+        for sphere in state.iter_spheres(locations):
             yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
             for location in sphere:
                 state.collect(location.item, True, location)
             locations -= sphere
 
+        if locations:
+            yield set()
+            yield locations  # unreachable locations
+
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
         if not state:
@@ -604,23 +590,13 @@ class MultiWorld():
                 return False  # still locations required to be collected
             return True
 
-        locations = [location for location in self.get_locations() if location_relevant(location)]
-
-        while locations:
-            sphere: List[Location] = []
-            for n in range(len(locations) - 1, -1, -1):
-                if locations[n].can_reach(state):
-                    sphere.append(locations.pop(n))
-
-            if not sphere:
-                # ran out of places and did not finish yet, quit
-                logging.warning(f"Could not access required locations for accessibility check."
-                                f" Missing: {locations}")
-                return False
+        locations = {location for location in self.get_locations() if location_relevant(location)}
 
+        for sphere in state.iter_spheres(locations):
             for location in sphere:
                 if location.item:
                     state.collect(location.item, True, location)
+            locations.difference_update(sphere)
 
             if self.has_beaten_game(state):
                 beatable_fulfilled = True
@@ -628,51 +604,343 @@ class MultiWorld():
             if all_done():
                 return True
 
+        if locations:
+            # ran out of places and did not finish yet, quit
+            logging.warning(f"Could not access required locations for accessibility check."
+                            f" Missing: {locations}")
         return False
 
 
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class ChangeTrackingCounter(Counter):
+    """Counter that remembers which keys were written since `changed` was last cleared.
+    Additional sets in `observers` receive the same keys, for consumers that only care for a limited time."""
+    changed: Set[Any]
+    observers: List[Set[Any]]
+
+    def __init__(self, *args, **kwargs):
+        self.changed = set()
+        self.observers = []
+        super().__init__(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        self.changed.add(key)
+        for observer in self.observers:
+            observer.add(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.changed.add(key)
+        for observer in self.observers:
+            observer.add(key)
+        super().__delitem__(key)
+
+    def remove_observer(self, observer: Set[Any]) -> None:
+        """Removes observer from observers by identity, list.remove would remove the first equal set."""
+        for index, other in enumerate(self.observers):
+            if other is observer:
+                del self.observers[index]
+                return
+        raise ValueError("observer is not registered")
+
+    def copy(self) -> ChangeTrackingCounter:
+        ret = self.__class__()
+        dict.update(ret, self)  # bypasses __setitem__, the copy has not changed anything yet
+        ret.changed = self.changed.copy()
+        return ret
+
+
+class RuleReadRecorder:
+    """Stands in for CollectionState.prog_items while a rule is evaluated and records the keys it reads.
+    Any access that can't be attributed to single keys marks the evaluation as untracked."""
+    __slots__ = ("prog_items", "keys", "untracked")
+
+    def __init__(self, prog_items: typing.Counter[Tuple[str, int]]):
+        self.prog_items = prog_items
+        self.keys: Set[Tuple[str, int]] = set()
+        self.untracked = False
+
+    def __getitem__(self, key: Tuple[str, int]) -> int:
+        self.keys.add(key)
+        return self.prog_items[key]
+
+    def __contains__(self, key: Tuple[str, int]) -> bool:
+        self.keys.add(key)
+        return key in self.prog_items
+
+    def get(self, key: Tuple[str, int], default: Any = None) -> Any:
+        self.keys.add(key)
+        return self.prog_items.get(key, default)
+
+    def __getattr__(self, item: str) -> Any:
+        self.untracked = True
+        return getattr(self.prog_items, item)
+
+    def __setitem__(self, key: Tuple[str, int], value: int) -> None:
+        self.untracked = True
+        self.prog_items[key] = value
+
+    def __delitem__(self, key: Tuple[str, int]) -> None:
+        self.untracked = True
+        del self.prog_items[key]
+
+    def __iter__(self):
+        self.untracked = True
+        return iter(self.prog_items)
+
+    def __len__(self) -> int:
+        self.untracked = True
+        return len(self.prog_items)
+
+    def __eq__(self, other: Any) -> bool:
+        self.untracked = True
+        return self.prog_items == other
+
+    def __ne__(self, other: Any) -> bool:
+        self.untracked = True
+        return self.prog_items != other
+
+    __hash__ = None
+
+
+class PerPlayerSetView(MutableSet):
+    """Set interface over per-player sets of a CollectionState, routing every element by its player."""
+    __slots__ = ("state", "sets")
+
+    def __init__(self, state: CollectionState, sets: Dict[int, Set[Any]]):
+        self.state = state
+        self.sets = sets
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self.sets[item.player]
+
+    def __iter__(self):
+        for player_set in list(self.sets.values()):
+            yield from player_set
+
+    def __len__(self) -> int:
+        return sum(len(player_set) for player_set in self.sets.values())
+
+    def add(self, item: Any) -> None:
+        self.state.unshare(item.player)
+        self.sets[item.player].add(item)
+
+    def discard(self, item: Any) -> None:
+        if item in self.sets[item.player]:
+            self.state.unshare(item.player)
+            self.sets[item.player].discard(item)
+
+    def copy(self) -> Set[Any]:
+        return set(self)
+
+    __copy__ = copy
+
+    def __repr__(self) -> str:
+        return repr(set(self))
+
+
+class PerPlayerDictView(MutableMapping):
+    """Dict interface over per-player dicts of a CollectionState, routing every key by its player."""
+    __slots__ = ("state", "dicts")
+
+    def __init__(self, state: CollectionState, dicts: Dict[int, Dict[Any, Any]]):
+        self.state = state
+        self.dicts = dicts
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.dicts[key.player][key]
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self.dicts[key.player].get(key, default)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.dicts[key.player]
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.state.unshare(key.player)
+        self.dicts[key.player][key] = value
+
+    def __delitem__(self, key: Any) -> None:
+        self.state.unshare(key.player)
+        del self.dicts[key.player][key]
+
+    def __iter__(self):
+        for player_dict in list(self.dicts.values()):
+            yield from player_dict
+
+    def __len__(self) -> int:
+        return sum(len(player_dict) for player_dict in self.dicts.values())
+
+    def copy(self) -> Dict[Any, Any]:
+        return dict(self)
+
+    __copy__ = copy
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+_state_views = frozenset({"events", "path", "locations_checked"})
+
+
+def _recording_getattribute(self: CollectionState, name: str) -> Any:
+    state_dict = object.__getattribute__(self, "__dict__")
+    if name in state_dict:
+        if name == "prog_items":
+            return state_dict["rule_recorder"]
+        if name != "multiworld":
+            # any other per-state data (reachability, events, LogicMixin attributes) can't be tracked by item
+            state_dict["rule_recorder"].untracked = True
+    elif name in _state_views:
+        state_dict["rule_recorder"].untracked = True
+    return object.__getattribute__(self, name)
+
+
+_recording_state_classes: Dict[type, type] = {}
+
+
+def _get_recording_state_class(state_class: type) -> type:
+    if "rule_recorder" in state_class.__dict__:
+        return state_class  # already recording, nested evaluation
+    recording_class = _recording_state_classes.get(state_class, None)
+    if recording_class is None:
+        recording_class = _recording_state_classes[state_class] = type(
+            f"Recording{state_class.__name__}", (state_class,),
+            {"__getattribute__": _recording_getattribute, "rule_recorder": None})
+    return recording_class
+
+
 class CollectionState():
-    prog_items: typing.Counter[Tuple[str, int]]
+    prog_items: ChangeTrackingCounter
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
     blocked_connections: Dict[int, Set[Entrance]]
-    events: Set[Location]
-    path: Dict[Union[Region, Entrance], PathValue]
-    locations_checked: Set[Location]
+    events_by_player: Dict[int, Set[Location]]
+    paths_by_player: Dict[int, Dict[Union[Region, Entrance], PathValue]]
+    locations_checked_by_player: Dict[int, Set[Location]]
     stale: Dict[int, bool]
+    connection_dependencies: Dict[int, Dict[Tuple[str, int], Set[Entrance]]]
+    """per item owner, blocked connections whose access rule only read these item keys when it last failed"""
+    owned_dependencies: Dict[int, Set[Tuple[str, int]]]
+    """per item owner, keys of connection_dependencies whose sets this state created and no other state shares"""
+    retry_connections: Dict[int, Set[Entrance]]
+    """blocked connections to evaluate again on the next reachability update"""
+    reachability_checkpoint: Dict[int, Optional[Tuple[int, int, int]]]
+    """sizes of reachable_regions and blocked_connections and the rule version after the last update"""
+    shared_players: Set[int]
+    """players whose per-player structures may still be shared with another state after copy()"""
+    incremental_reachability: bool = True
+    """only re-evaluate blocked connections whose recorded item dependencies changed, instead of all of them"""
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
     def __init__(self, parent: MultiWorld):
-        self.prog_items = Counter()
+        self.prog_items = ChangeTrackingCounter()
         self.multiworld = parent
         self.reachable_regions = {player: set() for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
-        self.events = set()
-        self.path = {}
-        self.locations_checked = set()
+        self.events_by_player = {player: set() for player in parent.get_all_ids()}
+        self.paths_by_player = {player: {} for player in parent.get_all_ids()}
+        self.locations_checked_by_player = {player: set() for player in parent.get_all_ids()}
         self.stale = {player: True for player in parent.get_all_ids()}
+        self.connection_dependencies = {player: {} for player in parent.get_all_ids()}
+        self.owned_dependencies = {player: set() for player in parent.get_all_ids()}
+        self.retry_connections = {player: set() for player in parent.get_all_ids()}
+        self.reachability_checkpoint = {player: None for player in parent.get_all_ids()}
+        self.shared_players = set()
         for function in self.additional_init_functions:
             function(self, parent)
         for items in parent.precollected_items.values():
             for item in items:
                 self.collect(item, True)
 
+    @property
+    def events(self) -> PerPlayerSetView:
+        return PerPlayerSetView(self, self.events_by_player)
+
+    @events.setter
+    def events(self, value: Iterable[Location]) -> None:
+        value = list(value)  # may be a view of this state
+        for player in self.events_by_player:
+            self.unshare(player)
+            self.events_by_player[player] = set()
+        view = self.events
+        for location in value:
+            view.add(location)
+
+    @property
+    def path(self) -> PerPlayerDictView:
+        return PerPlayerDictView(self, self.paths_by_player)
+
+    @path.setter
+    def path(self, value: Dict[Union[Region, Entrance], PathValue]) -> None:
+        value = dict(value)  # may be a view of this state
+        for player in self.paths_by_player:
+            self.unshare(player)
+            self.paths_by_player[player] = {}
+        self.path.update(value)
+
+    @property
+    def locations_checked(self) -> PerPlayerSetView:
+        return PerPlayerSetView(self, self.locations_checked_by_player)
+
+    @locations_checked.setter
+    def locations_checked(self, value: Iterable[Location]) -> None:
+        value = list(value)  # may be a view of this state
+        for player in self.locations_checked_by_player:
+            self.unshare(player)
+            self.locations_checked_by_player[player] = set()
+        view = self.locations_checked
+        for location in value:
+            view.add(location)
+
+    def unshare(self, player: int) -> None:
+        """Gives this state its own copy of player's structures before they are mutated.
+        copy() leaves them shared between both states, so code outside this class that mutates
+        reachable_regions[player] or blocked_connections[player] in place has to call this first."""
+        if player in self.shared_players:
+            self.shared_players.remove(player)
+            self.reachable_regions[player] = self.reachable_regions[player].copy()
+            self.blocked_connections[player] = self.blocked_connections[player].copy()
+            self.events_by_player[player] = self.events_by_player[player].copy()
+            self.paths_by_player[player] = self.paths_by_player[player].copy()
+            self.locations_checked_by_player[player] = self.locations_checked_by_player[player].copy()
+            self.connection_dependencies[player] = self.connection_dependencies[player].copy()
+            self.owned_dependencies[player] = set()  # the sets in it are still shared
+            self.retry_connections[player] = self.retry_connections[player].copy()
+
     def update_reachable_regions(self, player: int):
         self.stale[player] = False
+        incremental = self.incremental_reachability
+        if incremental:
+            self.release_connection_dependencies()
+        start = self.multiworld.get_region('Menu', player)
         rrp = self.reachable_regions[player]
         bc = self.blocked_connections[player]
-        queue = deque(self.blocked_connections[player])
-        start = self.multiworld.get_region('Menu', player)
+        up_to_date = incremental and start in rrp and \
+            self.reachability_checkpoint[player] == (len(rrp), len(bc), Entrance.rule_version)
+        if up_to_date and not self.retry_connections[player]:
+            return  # nothing could have changed, leave shared structures alone
+
+        self.unshare(player)
+        rrp = self.reachable_regions[player]
+        bc = self.blocked_connections[player]
+        retry = self.retry_connections[player]
+        path = self.paths_by_player[player]
 
         # init on first call - this can't be done on construction since the regions don't exist yet
         if start not in rrp:
             rrp.add(start)
             bc.update(start.exits)
-            queue.extend(start.exits)
+            queue = deque(bc)
+        elif up_to_date:
+            queue = deque(connection for connection in retry if connection in bc)
+        else:
+            # something other than this method changed reachability or rules, so retry everything
+            queue = deque(bc)
+        retry.clear()
 
         # run BFS on all connections, and keep track of those blocked by missing items
         while queue:
@@ -680,29 +948,106 @@ class CollectionState():
             new_region = connection.connected_region
             if new_region in rrp:
                 bc.remove(connection)
-            elif connection.can_reach(self):
+            elif self.can_traverse(connection) if incremental else connection.can_reach(self):
                 assert new_region, f"tried to search through an Entrance \"{connection}\" with no Region"
                 rrp.add(new_region)
                 bc.remove(connection)
                 bc.update(new_region.exits)
                 queue.extend(new_region.exits)
-                self.path[new_region] = (new_region.name, self.path.get(connection, None))
+                path[new_region] = (new_region.name, path.get(connection, None))
 
                 # Retry connections if the new region can unblock them
                 for new_entrance in self.multiworld.indirect_connections.get(new_region, set()):
                     if new_entrance in bc and new_entrance not in queue:
                         queue.append(new_entrance)
 
+        if incremental:
+            self.reachability_checkpoint[player] = (len(rrp), len(bc), Entrance.rule_version)
+
+    def release_connection_dependencies(self) -> None:
+        """Moves blocked connections that depend on changed item keys into the retry sets of their players."""
+        changed = self.prog_items.changed
+        if changed:
+            dependencies = self.connection_dependencies
+            retry_connections = self.retry_connections
+            for key in changed:
+                owner_dependencies = dependencies.get(key[1], None)
+                if owner_dependencies and key in owner_dependencies:
+                    self.unshare(key[1])
+                    self.owned_dependencies[key[1]].discard(key)
+                    for connection in dependencies[key[1]].pop(key):
+                        self.unshare(connection.player)
+                        retry_connections[connection.player].add(connection)
+            changed.clear()
+
+    def evaluate_recorded(self, rule: Callable[[CollectionState], bool]) -> Tuple[bool, Optional[Set[Tuple[str, int]]]]:
+        """Evaluates rule against this state and returns its result together with the item keys it read,
+        or None instead of the keys if the rule looked at anything but items."""
+        state_dict = self.__dict__
+        recorder = RuleReadRecorder(state_dict["prog_items"])
+        outer_recorder = state_dict.get("rule_recorder", None)
+        state_class = self.__class__
+        state_dict["rule_recorder"] = recorder
+        self.__class__ = _get_recording_state_class(state_class)
+        try:
+            result = rule(self)
+        finally:
+            self.__class__ = state_class
+            if outer_recorder is None:
+                del state_dict["rule_recorder"]
+            else:
+                state_dict["rule_recorder"] = outer_recorder
+        return result, None if recorder.untracked else recorder.keys
+
+    def can_traverse(self, connection: Entrance) -> bool:
+        """Entrance.can_reach for a blocked connection, remembering why it failed if it does."""
+        if type(connection).can_reach is not Entrance.can_reach:
+            result, keys = connection.can_reach(self), None
+        elif not connection.parent_region.can_reach(self):
+            result, keys = False, None
+        else:
+            result, keys = self.evaluate_recorded(connection.access_rule)
+            if result:
+                path = self.paths_by_player[connection.player]
+                if not connection.hide_path and connection not in path:
+                    parent_region = connection.parent_region
+                    path[connection] = (connection.name, path.get(parent_region, (parent_region.name, None)))
+                return True
+        if not result:
+            dependencies = self.connection_dependencies
+            if keys is not None and all(key[1] in dependencies for key in keys):
+                for key in keys:
+                    self.unshare(key[1])
+                    owned = self.owned_dependencies[key[1]]
+                    if key in owned:
+                        dependencies[key[1]][key].add(connection)
+                    else:
+                        owner_dependencies = dependencies[key[1]]
+                        owner_dependencies[key] = owner_dependencies.get(key, set()) | {connection}
+                        owned.add(key)
+            else:
+                self.retry_connections[connection.player].add(connection)
+        return result
+
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
+        """Returns a copy of this state. Per-player structures stay shared until either state mutates them."""
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         ret.prog_items = self.prog_items.copy()
-        ret.reachable_regions = {player: copy.copy(self.reachable_regions[player]) for player in
-                                 self.reachable_regions}
-        ret.blocked_connections = {player: copy.copy(self.blocked_connections[player]) for player in
-                                   self.blocked_connections}
-        ret.events = copy.copy(self.events)
-        ret.path = copy.copy(self.path)
-        ret.locations_checked = copy.copy(self.locations_checked)
+        ret.reachable_regions = self.reachable_regions.copy()
+        ret.blocked_connections = self.blocked_connections.copy()
+        ret.events_by_player = self.events_by_player.copy()
+        ret.paths_by_player = self.paths_by_player.copy()
+        ret.locations_checked_by_player = self.locations_checked_by_player.copy()
+        ret.stale = self.stale.copy()
+        ret.connection_dependencies = self.connection_dependencies.copy()
+        ret.owned_dependencies = self.owned_dependencies.copy()
+        ret.retry_connections = self.retry_connections.copy()
+        ret.reachability_checkpoint = self.reachability_checkpoint.copy()
+        ret.shared_players = set(self.reachable_regions)
+        self.shared_players = set(self.reachable_regions)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
@@ -728,16 +1073,67 @@ class CollectionState():
             locations = self.multiworld.get_filled_locations()
         reachable_events = True
         # since the loop has a good chance to run more than once, only filter the events once
-        locations = {location for location in locations if location.event and location not in self.events and
-                     not key_only or getattr(location.item, "locked_dungeon_item", False)}
+        events = self.events_by_player
+        locations = {location for location in locations if location not in events[location.player] and
+                     (location.event and not key_only or getattr(location.item, "locked_dungeon_item", False))}
+        if self.incremental_reachability:
+            self.sweep_for_events_incremental(locations)
+            return
         while reachable_events:
             reachable_events = {location for location in locations if location.can_reach(self)}
             locations -= reachable_events
             for event in reachable_events:
-                self.events.add(event)
+                self.unshare(event.player)
+                self.events_by_player[event.player].add(event)
+                assert isinstance(event.item, Item), "tried to collect Event with no Item"
+                self.collect(event.item, True, event)
+
+    def sweep_for_events_incremental(self, locations: Set[Location]) -> None:
+        """Same as the loop in sweep_for_events, but after the first pass only locations whose rule read a changed
+        item or whose region became reachable are tested again."""
+        for reachable_events in self.iter_spheres(locations):
+            for event in reachable_events:
+                self.unshare(event.player)
+                self.events_by_player[event.player].add(event)
                 assert isinstance(event.item, Item), "tried to collect Event with no Item"
                 self.collect(event.item, True, event)
 
+    def iter_spheres(self, locations: Iterable[Location]) -> typing.Iterator[Set[Location]]:
+        """Yields the spheres of locations reachable from this state until one would be empty.
+        The caller is expected to collect each sphere before asking for the next one,
+        which then only tests locations whose rule read a changed item or whose region became reachable,
+        plus those whose rule looked at something else than items."""
+        locations = set(locations)
+        if not self.incremental_reachability:
+            while locations:
+                sphere = {location for location in locations if location.can_reach(self)}
+                if not sphere:
+                    return
+                locations -= sphere
+                yield sphere
+            return
+
+        search = SphereSearch(self, locations)
+        try:
+            sphere = search.next_sphere()
+            while sphere:
+                yield sphere
+                sphere = search.next_sphere()
+        finally:
+            search.close()
+
+    def location_reachable_recorded(self, location: Location) -> Tuple[bool, Union[Set[Tuple[str, int]], bool, None]]:
+        """Location.can_reach, also returning why it failed: the item keys its rule read,
+        True if only its region is unreachable or None if it can't be told."""
+        if type(location).can_reach is not Location.can_reach:
+            return location.can_reach(self), None
+        result, keys = self.evaluate_recorded(location.access_rule)
+        if not result:
+            return False, keys
+        if location.parent_region.can_reach(self):
+            return True, None
+        return False, True
+
     def has(self, item: str, player: int, count: int = 1) -> bool:
         return self.prog_items[item, player] >= count
 
@@ -769,7 +1165,8 @@ class CollectionState():
 
     def collect(self, item: Item, event: bool = False, location: Optional[Location] = None) -> bool:
         if location:
-            self.locations_checked.add(location)
+            self.unshare(location.player)
+            self.locations_checked_by_player[location.player].add(location)
 
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
@@ -784,15 +1181,115 @@ class CollectionState():
 
         return changed
 
-    def remove(self, item: Item):
+    def remove(self, item: Item, event: bool = False):
         changed = self.multiworld.worlds[item.player].remove(self, item)
+
+        if not changed and event:
+            # mirrors collect, which counts events the world itself does not consider relevant
+            self.prog_items[item.name, item.player] -= 1
+            if self.prog_items[item.name, item.player] < 1:
+                del self.prog_items[item.name, item.player]
+            changed = True
+
         if changed:
             # invalidate caches, nothing can be trusted anymore now
+            self.unshare(item.player)
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
+            self.retry_connections[item.player] = set()
             self.stale[item.player] = True
 
 
+class SphereSearch:
+    """The incremental search behind CollectionState.iter_spheres. Kept as an object so a search can be copied
+    along with its state and continued from there, sparing the tests done so far."""
+    state: CollectionState
+    locations: Set[Location]
+    """locations to test for the next sphere"""
+    changed: Set[Tuple[str, int]]
+    """item keys written since the last sphere"""
+    waiting_for_items: Dict[Tuple[str, int], Set[Location]]
+    waiting_for_region: Dict[Region, Set[Location]]
+    retry: Set[Location]
+    found: Set[Location]
+    pending_players: typing.Counter[int]
+    player_regions: Dict[int, Region]
+    started: bool
+
+    def __init__(self, state: CollectionState, locations: Iterable[Location]):
+        self.state = state
+        self.locations = set(locations)
+        self.changed = set()
+        self.waiting_for_items = {}
+        self.waiting_for_region = {}
+        self.retry = set()
+        self.found = set()
+        self.pending_players = Counter(location.player for location in self.locations)
+        self.player_regions = {location.player: location.parent_region for location in self.locations}
+        self.started = False
+        state.prog_items.observers.append(self.changed)
+
+    def close(self) -> None:
+        """Stops following item changes of the state."""
+        self.state.prog_items.remove_observer(self.changed)
+
+    def copy(self, state: CollectionState) -> SphereSearch:
+        """Returns a copy of this search that continues on state, a copy of this search's state."""
+        ret = SphereSearch.__new__(SphereSearch)
+        ret.state = state
+        ret.locations = self.locations.copy()
+        ret.changed = self.changed.copy()
+        ret.waiting_for_items = {key: locations.copy() for key, locations in self.waiting_for_items.items()}
+        ret.waiting_for_region = {region: locations.copy() for region, locations in self.waiting_for_region.items()}
+        ret.retry = self.retry.copy()
+        ret.found = self.found.copy()
+        ret.pending_players = self.pending_players.copy()
+        ret.player_regions = self.player_regions
+        ret.started = self.started
+        state.prog_items.observers.append(ret.changed)
+        return ret
+
+    def next_sphere(self) -> Set[Location]:
+        """Returns the locations that are reachable now, but weren't when the last sphere was returned.
+        The caller is expected to collect each sphere before asking for the next one, which then only tests
+        locations whose rule read a changed item or whose region became reachable, plus those whose rule looked at
+        something else than items. Returns an empty set once nothing new is reachable."""
+        state = self.state
+        if self.started:
+            # testing every location used to update the regions of each player with locations left once per
+            # sphere, keep doing that so paths are recorded at the same point of the search
+            for player, pending in self.pending_players.items():
+                if pending and state.stale[player]:
+                    self.player_regions[player].can_reach(state)
+            locations, self.retry = self.retry, set()
+            for key in self.changed:
+                locations.update(self.waiting_for_items.pop(key, ()))
+            self.changed.clear()
+            waiting_for_region = self.waiting_for_region
+            for region in [region for region in waiting_for_region if region.can_reach(state)]:
+                locations.update(waiting_for_region.pop(region))
+            locations -= self.found  # may have waited for more than one item
+            self.locations = locations
+        self.started = True
+
+        sphere = set()
+        for location in self.locations:
+            result, keys = state.location_reachable_recorded(location)
+            if result:
+                sphere.add(location)
+            elif keys is None:
+                self.retry.add(location)
+            elif keys is True:
+                self.waiting_for_region.setdefault(location.parent_region, set()).add(location)
+            else:
+                for key in keys:
+                    self.waiting_for_items.setdefault(key, set()).add(location)
+        self.locations = set()
+        self.found |= sphere
+        self.pending_players.subtract(location.player for location in sphere)
+        return sphere
+
+
 class Region:
     name: str
     _hint_text: str
@@ -853,12 +1350,19 @@ class Entrance:
     # LttP specific, TODO: should make a LttPEntrance
     addresses = None
     target = None
+    rule_version: typing.ClassVar[int] = 0
+    """increased whenever any Entrance changes its rule or target, invalidating recorded rule dependencies"""
 
     def __init__(self, player: int, name: str = '', parent: Region = None):
         self.name = name
         self.parent_region = parent
         self.player = player
 
+    def __setattr__(self, key: str, value: Any) -> None:
+        if key == "access_rule" or key == "connected_region":
+            Entrance.rule_version += 1
+        super().__setattr__(key, value)
+
     def can_reach(self, state: CollectionState) -> bool:
         if self.parent_region.can_reach(state) and self.access_rule(state):
             if not self.hide_path and not self in state.path:
@@ -1121,13 +1625,12 @@ class Spoiler():
         state = CollectionState(multiworld)
         sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
-
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
 
+        # build up spheres of collection radius.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+        for sphere in state.iter_spheres(sphere_candidates):
+            # the culling below tries locations in iteration order, keep the one of sphere_candidates
+            sphere = {location for location in sphere_candidates if location in sphere}
             for location in sphere:
                 state.collect(location.item, True, location)
 
@@ -1138,37 +1641,26 @@ class Spoiler():
             logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
                           len(sphere),
                           len(prog_locations))
-            if not sphere:
-                logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
-                    location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if any([multiworld.accessibility[location.item.player] != 'minimal' for location in sphere_candidates]):
-                    raise RuntimeError(f'Not all progression items reachable ({sphere_candidates}). '
-                                       f'Something went terribly wrong here.')
-                else:
-                    self.unreachables = sphere_candidates
-                    break
+
+        if sphere_candidates:
+            logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
+                location.item.name, location.item.player, location.name, location.player) for location in
+                                                                           sphere_candidates])
+            if any([multiworld.accessibility[location.item.player] != 'minimal' for location in sphere_candidates]):
+                raise RuntimeError(f'Not all progression items reachable ({sphere_candidates}). '
+                                   f'Something went terribly wrong here.')
+            else:
+                self.unreachables = sphere_candidates
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
         restore_later = {}
         for num, sphere in reversed(tuple(enumerate(collection_spheres))):
-            to_delete = set()
-            for location in sphere:
-                # we remove the item at location and check if game is still beatable
-                logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
-                              location.item.player)
-                old_item = location.item
-                location.item = None
-                if multiworld.can_beat_game(state_cache[num]):
-                    to_delete.add(location)
-                    restore_later[location] = old_item
-                else:
-                    # still required, got to keep it around
-                    location.item = old_item
+            to_delete = self.cull_sphere(sphere, state_cache[num], prog_locations)
+            restore_later.update(to_delete)
 
             # cull entries in spheres for spoiler walkthrough at end
-            sphere -= to_delete
+            sphere.difference_update(to_delete)
 
         # second phase, sphere 0
         removed_precollected = []
@@ -1190,11 +1682,9 @@ class Spoiler():
         required_locations = {item for sphere in collection_spheres for item in sphere}
         state = CollectionState(multiworld)
         collection_spheres = []
-        while required_locations:
-            state.sweep_for_events(key_only=True)
-
-            sphere = set(filter(state.can_reach, required_locations))
-
+        state.sweep_for_events(key_only=True)
+        for sphere in state.iter_spheres(required_locations):
+            sphere = {location for location in required_locations if location in sphere}
             for location in sphere:
                 state.collect(location.item, True, location)
 
@@ -1204,8 +1694,11 @@ class Spoiler():
 
             logging.debug('Calculated final sphere %i, containing %i of %i progress items.', len(collection_spheres),
                           len(sphere), len(required_locations))
-            if not sphere:
-                raise RuntimeError(f'Not all required items reachable. Unreachable locations: {required_locations}')
+            if required_locations:
+                state.sweep_for_events(key_only=True)
+
+        if required_locations:
+            raise RuntimeError(f'Not all required items reachable. Unreachable locations: {required_locations}')
 
         # we can finally output our playthrough
         self.playthrough = {"0": sorted([self.multiworld.get_name_string_for_object(item) for item in
@@ -1225,6 +1718,85 @@ class Spoiler():
         for item in removed_precollected:
             multiworld.push_precollected(item)
 
+    def cull_sphere(self, sphere: Set[Location], state: Optional[CollectionState],
+                    prog_locations: Set[Location]) -> Dict[Location, Item]:
+        """Removes the items in sphere that are not required to beat the game from state, trying the locations
+        in iteration order and keeping every removal that leaves the game beatable. Returns the removed items.
+        As more items never make a game less beatable, runs of locations are tried at once, about as long as the
+        run of removable items expected from this sphere so far, and a failed run is bisected for its first
+        required item. prog_locations are all locations that held advancement items before culling."""
+        multiworld = self.multiworld
+        if state:
+            beaten = multiworld.has_beaten_game(state)
+        else:
+            beaten = multiworld.has_beaten_game(multiworld.state)
+            state = CollectionState(multiworld)
+        # every check starts out from state with the same locations to search, so the first sphere,
+        # which is all of this sphere that is left, and the reasons why the others aren't reachable yet are shared
+        first_search = SphereSearch(state, (location for location in prog_locations if location.item
+                                            and location not in state.locations_checked))
+        try:
+            first_sphere = first_search.next_sphere()
+        finally:
+            first_search.close()
+
+        def still_beatable() -> bool:
+            # same as MultiWorld.can_beat_game(state)
+            if beaten:
+                return True
+            search_state = state.copy()
+            search = first_search.copy(search_state)
+            try:
+                sphere = {location for location in first_sphere if location.item}
+                while sphere:
+                    for location in sphere:
+                        search_state.collect(location.item, True, location)
+                    if multiworld.has_beaten_game(search_state):
+                        return True
+                    sphere = search.next_sphere()
+                return False
+            finally:
+                search.close()
+
+        candidates = list(sphere)
+        removed: Dict[Location, Item] = {}
+
+        def try_removal(start: int, end: int) -> bool:
+            # we remove the items in the range and check if game is still beatable
+            locations = candidates[start:end]
+            items = [location.item for location in locations]
+            logging.debug('Checking if %s are required to beat the game.',
+                          ', '.join(f'{item.name} (Player {item.player})' for item in items))
+            for location in locations:
+                location.item = None
+            if still_beatable():
+                removed.update(zip(locations, items))
+                return True
+            # still required, got to keep them around
+            for location, item in zip(locations, items):
+                location.item = item
+            return False
+
+        index = 0
+        required = 0
+        while index < len(candidates):
+            expected_run = 0.69 * (index + 2) / (required + 1)
+            end = index + (1 << int(math.log2(expected_run)) if expected_run >= 1 else 1)
+            if try_removal(index, end):
+                index = end
+                continue
+            # the first location in index..end that is required is the only one kept from the range
+            end = min(end, len(candidates))
+            while end - index > 1:
+                middle = (index + end) // 2
+                if try_removal(index, middle):
+                    index = middle
+                else:
+                    end = middle
+            required += 1
+            index += 1
+        return removed
+
     def create_paths(self, state: CollectionState, collection_spheres: List[Set[Location]]):
         from itertools import zip_longest
         multiworld = self.multiworld
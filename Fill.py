@@ -1,10 +1,12 @@
+import bisect
 import collections
 import itertools
 import logging
 import typing
 from collections import Counter, deque
 
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, SphereSearch
+from GenerationProfile import measure, profiled
 from worlds.AutoWorld import call_all
 from worlds.generic.Rules import add_item_rule
 
@@ -21,6 +23,217 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+class _FirstWriteRecorder(set):
+    """Observer for ChangeTrackingCounter that remembers the value each key had before it was first written."""
+
+    def __init__(self, counter: typing.Counter[typing.Tuple[str, int]]):
+        super().__init__()
+        self.counter = counter
+        self.old: typing.Dict[typing.Tuple[str, int], int] = {}
+
+    def add(self, key: typing.Tuple[str, int]) -> None:
+        if key not in self.old:
+            self.old[key] = self.counter.get(key, 0)
+        super().add(key)
+
+
+def _remove_from_pool(state: CollectionState, item: Item) -> bool:
+    """
+    Removes an item that was collected as an event by sweep_from_pool.
+    Checks that collect undoes the removal again, returns False if the world's remove is not precise,
+    in which case the state can't be trusted anymore.
+    """
+    prog_items = state.prog_items
+    removed = _FirstWriteRecorder(prog_items)
+    prog_items.observers.append(removed)
+    try:
+        state.remove(item, True)
+    finally:
+        prog_items.remove_observer(removed)
+
+    restored = _FirstWriteRecorder(prog_items)
+    prog_items.observers.append(restored)
+    try:
+        state.collect(item, True)
+    finally:
+        prog_items.remove_observer(restored)
+
+    for key, value in restored.old.items():
+        if prog_items.get(key, 0) != removed.old.get(key, value):
+            return False
+    for key, value in removed.old.items():
+        if prog_items.get(key, 0) != value:
+            return False
+
+    state.remove(item, True)
+    return True
+
+
+def _update_pool_state(pool_state: typing.Optional[CollectionState], pooled: typing.Counter[Item],
+                       base_state: CollectionState, itempool: typing.Sequence[Item]) -> CollectionState:
+    """
+    Brings pool_state, which has pooled collected on top of base_state, to having itempool collected instead.
+    Only the difference is collected or removed, falling back to collecting everything anew if that can't be done
+    precisely. Updates pooled to match.
+    """
+    new_pool = Counter(itempool)
+    if pool_state is not None:
+        for item in (pooled - new_pool).elements():
+            if not _remove_from_pool(pool_state, item):
+                pool_state = None
+                break
+    if pool_state is None:
+        pool_state = base_state.copy()
+        for item in itempool:
+            pool_state.collect(item, True)
+    else:
+        for item in (new_pool - pooled).elements():
+            pool_state.collect(item, True)
+    pooled.clear()
+    pooled.update(new_pool)
+    return pool_state
+
+
+def _sweep_pool_state(pool_state: CollectionState, events: typing.List[Location]) -> CollectionState:
+    """
+    Same as sweep_from_pool(pool_state), but first tries the events of the previous sweep in the order they were
+    collected, which mostly succeeds and leaves only new events for the sweep. Updates events to the new order.
+    """
+    state = pool_state.copy()
+    collected: typing.List[Location] = []
+    for location in events:
+        if location.event and location.item and location not in state.events and location.can_reach(state):
+            state.events.add(location)
+            state.collect(location.item, True, location)
+            collected.append(location)
+    previous = set(collected)
+    state.sweep_for_events()
+    collected += [location for location in state.events if location not in previous]
+    events[:] = collected
+    return state
+
+
+class _PlacementIndex:
+    """
+    Unfilled locations of a fill in their original order, for finding the first one that can take an item.
+    Locations are bucketed by everything except reachability that decides whether they take an item, so each bucket
+    only has to be asked once. Buckets are visited in the order of their first location, and reachability is
+    remembered for as long as the same state is asked about.
+    """
+    def __init__(self, locations: typing.Iterable[Location], by_player: bool = False, item_rule_only: bool = False):
+        """
+        :param by_player: if true, only locations of the item's player are candidates for it
+        :param item_rule_only: if true, only Location.item_rule decides, like in remaining_fill
+        """
+        self.locations = list(locations)
+        self.by_player = by_player
+        self.item_rule_only = item_rule_only
+        self.position: typing.Dict[Location, int] = {}
+        self.filled: typing.List[bool] = [False] * len(self.locations)
+        self.unfilled = len(self.locations)
+        # buckets hold positions, starts point to the first unfilled one of each bucket
+        self.bucket_of: typing.List[int] = []
+        self.buckets: typing.List[typing.List[int]] = []
+        self.starts: typing.List[int] = []
+        # per player, or None for all, (position, bucket) of each bucket's first unfilled location in order
+        self.heads: typing.Dict[typing.Optional[int], typing.List[typing.Tuple[int, int]]] = {}
+        self.reachable: typing.Dict[int, bool] = {}
+        self.reachable_state: typing.Optional[CollectionState] = None
+
+        bucket_ids: typing.Dict[typing.Hashable, int] = {}
+        for position, location in enumerate(self.locations):
+            self.position[location] = position
+            key = self._bucket_key(location)
+            bucket_id = bucket_ids.get(key)
+            if bucket_id is None:
+                bucket_id = bucket_ids[key] = len(self.buckets)
+                self.buckets.append([])
+                self.starts.append(0)
+                self.heads.setdefault(self._partition(location.player), []).append((position, bucket_id))
+            self.buckets[bucket_id].append(position)
+            self.bucket_of.append(bucket_id)
+
+    def __len__(self) -> int:
+        return self.unfilled
+
+    def _partition(self, player: int) -> typing.Optional[int]:
+        return player if self.by_player else None
+
+    def _bucket_key(self, location: Location) -> typing.Hashable:
+        if self.item_rule_only:
+            return location.player if self.by_player else None, location.item_rule
+        if type(location).can_fill is not Location.can_fill:
+            return location  # can't tell what it depends on
+        return location.player if self.by_player else None, location.item_rule, location.always_allow, \
+            location.progress_type == LocationProgressType.EXCLUDED
+
+    def _can_reach(self, position: int, state: CollectionState) -> bool:
+        if state is not self.reachable_state:
+            self.reachable = {}
+            self.reachable_state = state
+        reachable = self.reachable.get(position)
+        if reachable is None:
+            reachable = self.reachable[position] = self.locations[position].can_reach(state)
+        return reachable
+
+    def _first_fit(self, bucket_id: int, state: typing.Optional[CollectionState], item: Item, check_access: bool,
+                   before: int) -> typing.Optional[int]:
+        bucket = self.buckets[bucket_id]
+        start = self.starts[bucket_id]
+        head = self.locations[bucket[start]]
+        if self.item_rule_only:
+            return bucket[start] if head.item_rule(item) else None
+        if type(head).can_fill is not Location.can_fill:
+            return bucket[start] if head.can_fill(state, item, check_access) else None
+        # Location.can_fill, with reachability looked up for as many locations of the bucket as needed
+        if head.always_allow(state, item) and item.name not in state.multiworld.non_local_items[item.player]:
+            return bucket[start]
+        if (head.progress_type == LocationProgressType.EXCLUDED and (item.advancement or item.useful)) \
+                or not head.item_rule(item):
+            return None
+        if not check_access:
+            return bucket[start]
+        for position in itertools.islice(bucket, start, None):
+            if position >= before:
+                break
+            if not self.filled[position] and self._can_reach(position, state):
+                return position
+        return None
+
+    def find(self, state: typing.Optional[CollectionState], item: Item,
+             check_access: bool = True) -> typing.Optional[Location]:
+        """Returns the first location, in the original order, that can_fill would accept the item for."""
+        found = len(self.locations)
+        for head, bucket_id in self.heads.get(self._partition(item.player), ()):
+            if head >= found:
+                break
+            position = self._first_fit(bucket_id, state, item, check_access, found)
+            if position is not None:
+                found = position
+        return self.locations[found] if found < len(self.locations) else None
+
+    def remove(self, location: Location) -> None:
+        position = self.position[location]
+        self.filled[position] = True
+        self.unfilled -= 1
+        bucket_id = self.bucket_of[position]
+        bucket = self.buckets[bucket_id]
+        start = self.starts[bucket_id]
+        if bucket[start] != position:
+            return
+        heads = self.heads[self._partition(location.player)]
+        del heads[bisect.bisect_left(heads, (position, bucket_id))]
+        while start < len(bucket) and self.filled[bucket[start]]:
+            start += 1
+        self.starts[bucket_id] = start
+        if start < len(bucket):
+            bisect.insort(heads, (bucket[start], bucket_id))
+
+    def remaining(self) -> typing.List[Location]:
+        return [location for location, filled in zip(self.locations, self.filled) if not filled]
+
+
+@profiled("fill", "fill_restrictive")
 def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -44,21 +257,26 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
     reachable_items: typing.Dict[int, typing.Deque[Item]] = {}
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
+    pool_state: typing.Optional[CollectionState] = None
+    pooled: typing.Counter[Item] = Counter()
+    swept_events: typing.List[Location] = []
+    candidates = _PlacementIndex(locations, single_player_placement)
 
-    while any(reachable_items.values()) and locations:
+    while any(reachable_items.values()) and candidates:
         # grab one item per player
         items_to_place = [items.pop()
                           for items in reachable_items.values() if items]
         for item in items_to_place:
             item_pool.remove(item)
-        maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items)
+        # keep everything but the items being placed collected, instead of collecting the whole pool every time
+        pool_state = _update_pool_state(pool_state, pooled, base_state, item_pool + unplaced_items)
+        maximum_exploration_state = _sweep_pool_state(pool_state, swept_events)
 
         has_beaten_game = world.has_beaten_game(maximum_exploration_state)
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
-            if not locations:
+            if not candidates:
                 unplaced_items += items_to_place
                 break
             item_to_place = items_to_place.pop(0)
@@ -73,14 +291,9 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
-                    break
-
+            spot_to_fill = candidates.find(maximum_exploration_state, item_to_place, perform_access_check)
+            if spot_to_fill is not None:
+                candidates.remove(spot_to_fill)
             else:
                 # we filled all reachable spots.
                 if swap:
@@ -144,6 +357,8 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
             if on_place:
                 on_place(spot_to_fill)
 
+    locations[:] = candidates.remaining()
+
     if allow_excluded:
         # check if partial fill is the result of excluded locations, in which case retry
         excluded_locations = [
@@ -171,23 +386,19 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
     item_pool.extend(unplaced_items)
 
 
+@profiled("fill", "remaining_fill")
 def remaining_fill(world: MultiWorld,
                    locations: typing.List[Location],
                    itempool: typing.List[Item]) -> None:
     unplaced_items: typing.List[Item] = []
     placements: typing.List[Location] = []
     swapped_items: typing.Counter[typing.Tuple[int, str]] = Counter()
-    while locations and itempool:
+    candidates = _PlacementIndex(locations, item_rule_only=True)
+    while candidates and itempool:
         item_to_place = itempool.pop()
-        spot_to_fill: typing.Optional[Location] = None
-
-        for i, location in enumerate(locations):
-            if location.item_rule(item_to_place):
-                # popping by index is faster than removing by content,
-                spot_to_fill = locations.pop(i)
-                # skipping a scan for the element
-                break
-
+        spot_to_fill = candidates.find(None, item_to_place)
+        if spot_to_fill is not None:
+            candidates.remove(spot_to_fill)
         else:
             # we filled all reachable spots.
             # try swapping this item with previously placed items
@@ -227,6 +438,8 @@ def remaining_fill(world: MultiWorld,
         world.push_item(spot_to_fill, item_to_place, False)
         placements.append(spot_to_fill)
 
+    locations[:] = candidates.remaining()
+
     if unplaced_items and locations:
         # There are leftover unplaceable items and locations that won't accept them
         raise FillError(f'No more spots to place {unplaced_items}, locations {locations} are invalid. '
@@ -244,6 +457,7 @@ def fast_fill(world: MultiWorld,
     return item_pool[placing:], fill_locations[placing:]
 
 
+@profiled("fill", "accessibility_corrections")
 def accessibility_corrections(world: MultiWorld, state: CollectionState, locations, pool=[]):
     maximum_exploration_state = sweep_from_pool(state, pool)
     minimal_players = {player for player in world.player_ids if world.accessibility[player] == "minimal"}
@@ -275,6 +489,7 @@ def inaccessible_location_rules(world: MultiWorld, state: CollectionState, locat
             add_item_rule(location, forbid_important_item_rule)
 
 
+@profiled("fill", "distribute_early_items")
 def distribute_early_items(world: MultiWorld,
                            fill_locations: typing.List[Location],
                            itempool: typing.List[Item]) -> typing.Tuple[typing.List[Location], typing.List[Item]]:
@@ -359,6 +574,7 @@ def distribute_early_items(world: MultiWorld,
     return fill_locations, itempool
 
 
+@profiled("fill", "distribute_items_restrictive")
 def distribute_items_restrictive(world: MultiWorld) -> None:
     fill_locations = sorted(world.get_unfilled_locations())
     world.random.shuffle(fill_locations)
@@ -401,17 +617,21 @@ def distribute_items_restrictive(world: MultiWorld) -> None:
 
     if prioritylocations:
         # "priority fill"
-        fill_restrictive(world, world.state, prioritylocations, progitempool, swap=False, on_place=mark_for_locking)
-        accessibility_corrections(world, world.state, prioritylocations, progitempool)
+        with measure("fill", "phases", "priority fill"):
+            fill_restrictive(world, world.state, prioritylocations, progitempool, swap=False,
+                             on_place=mark_for_locking)
+            accessibility_corrections(world, world.state, prioritylocations, progitempool)
         defaultlocations = prioritylocations + defaultlocations
 
     if progitempool:
         # "progression fill"
-        fill_restrictive(world, world.state, defaultlocations, progitempool)
+        with measure("fill", "phases", "progression fill"):
+            fill_restrictive(world, world.state, defaultlocations, progitempool)
         if progitempool:
             raise FillError(
                 f'Not enough locations for progress items. There are {len(progitempool)} more items than locations')
-        accessibility_corrections(world, world.state, defaultlocations)
+        with measure("fill", "phases", "accessibility corrections"):
+            accessibility_corrections(world, world.state, defaultlocations)
 
     for location in lock_later:
         if location.item:
@@ -420,14 +640,16 @@ def distribute_items_restrictive(world: MultiWorld) -> None:
 
     inaccessible_location_rules(world, world.state, defaultlocations)
 
-    remaining_fill(world, excludedlocations, filleritempool)
+    with measure("fill", "phases", "excluded fill"):
+        remaining_fill(world, excludedlocations, filleritempool)
     if excludedlocations:
         raise FillError(
             f"Not enough filler items for excluded locations. There are {len(excludedlocations)} more locations than items")
 
     restitempool = usefulitempool + filleritempool
 
-    remaining_fill(world, defaultlocations, restitempool)
+    with measure("fill", "phases", "remaining fill"):
+        remaining_fill(world, defaultlocations, restitempool)
 
     unplaced = restitempool
     unfilled = defaultlocations
@@ -443,6 +665,7 @@ def distribute_items_restrictive(world: MultiWorld) -> None:
         logging.info(f'Per-Player counts: {print_data})')
 
 
+@profiled("fill", "flood_items")
 def flood_items(world: MultiWorld) -> None:
     # get items to distribute
     world.random.shuffle(world.itempool)
@@ -504,6 +727,53 @@ def flood_items(world: MultiWorld) -> None:
                 break
 
 
+class _SphereTracker:
+    """Finds the reachable locations among a set of unchecked locations for a state that only gains items,
+    continuing one SphereSearch instead of testing every unchecked location again each time."""
+    state: CollectionState
+    search: SphereSearch
+    reachable: typing.Set[Location]
+    """locations found reachable that were not returned yet"""
+
+    def __init__(self, state: CollectionState, locations: typing.Iterable[Location]) -> None:
+        self.state = state
+        self.search = SphereSearch(state, locations)
+        self.reachable = set()
+
+    def copy(self, state: CollectionState) -> "_SphereTracker":
+        ret = _SphereTracker.__new__(_SphereTracker)
+        ret.state = state
+        ret.search = self.search.copy(state)
+        ret.reachable = self.reachable.copy()
+        return ret
+
+    def close(self) -> None:
+        self.search.close()
+
+    def get_sphere_locations(self, locations: typing.Set[Location],
+                             key_locations: typing.Set[Location]) -> typing.Set[Location]:
+        """Sweeps for the locked dungeon items in locations, then returns the locations in it that are reachable.
+        locations may only lack locations returned before, key_locations are all locations with locked dungeon items."""
+        self.state.sweep_for_events(key_only=True, locations=key_locations & locations)
+        self.reachable |= self.search.next_sphere()
+        sphere = self.reachable & locations
+        self.reachable -= sphere
+        return sphere
+
+
+def _sweep_search(state: CollectionState, search: SphereSearch) -> None:
+    """sweep_for_events over the locations of search, after which search.found holds all of them that are reachable."""
+    events = state.events
+    sphere = search.next_sphere()
+    while sphere:
+        for location in sphere:
+            if location not in events and (location.event or getattr(location.item, "locked_dungeon_item", False)):
+                events.add(location)
+                state.collect(location.item, True, location)
+        sphere = search.next_sphere()
+
+
+@profiled("fill", "balance_multiworld_progression")
 def balance_multiworld_progression(world: MultiWorld) -> None:
     # A system to reduce situations where players have no checks remaining, popularly known as "BK mode."
     # Overall progression balancing algorithm:
@@ -542,11 +812,8 @@ def balance_multiworld_progression(world: MultiWorld) -> None:
         }
         sphere_num: int = 1
         moved_item_count: int = 0
-
-        def get_sphere_locations(sphere_state: CollectionState,
-                                 locations: typing.Set[Location]) -> typing.Set[Location]:
-            sphere_state.sweep_for_events(key_only=True, locations=locations)
-            return {loc for loc in locations if sphere_state.can_reach(loc)}
+        key_locations: typing.Set[Location] = {location for location in world.get_filled_locations()
+                                               if getattr(location.item, "locked_dungeon_item", False)}
 
         def item_percentage(player: int, num: int) -> float:
             return num / total_locations_count[player]
@@ -555,146 +822,182 @@ def balance_multiworld_progression(world: MultiWorld) -> None:
         if len(total_locations_count) == 0:
             return
 
-        while True:
-            # Gather non-locked locations.
-            # This ensures that only shuffled locations get counted for progression balancing,
-            #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
-            for location in sphere_locations:
-                unchecked_locations.remove(location)
-                if not location.locked:
-                    reachable_locations_count[location.player] += 1
-
-            logging.debug(f"Sphere {sphere_num}")
-            logging.debug(f"Reachable locations: {reachable_locations_count}")
-            debug_percentages = {
-                player: round(item_percentage(player, num), 2)
-                for player, num in reachable_locations_count.items()
-            }
-            logging.debug(f"Reachable percentages: {debug_percentages}\n")
-            sphere_num += 1
-
-            if checked_locations:
-                max_percentage = max(map(lambda p: item_percentage(p, reachable_locations_count[p]),
-                                         reachable_locations_count))
-                threshold_percentages = {
-                    player: max_percentage * balanceable_players[player]
-                    for player in balanceable_players
-                }
-                logging.debug(f"Thresholds: {threshold_percentages}")
-                balancing_players = {
-                    player
-                    for player, reachables in reachable_locations_count.items()
-                    if (player in threshold_percentages
-                        and item_percentage(player, reachables) < threshold_percentages[player])
+        tracker = _SphereTracker(state, unchecked_locations)
+        try:
+            while True:
+                # Gather non-locked locations.
+                # This ensures that only shuffled locations get counted for progression balancing,
+                #   i.e. the items the players will be checking.
+                sphere_locations = tracker.get_sphere_locations(unchecked_locations, key_locations)
+                for location in sphere_locations:
+                    unchecked_locations.remove(location)
+                    if not location.locked:
+                        reachable_locations_count[location.player] += 1
+
+                logging.debug(f"Sphere {sphere_num}")
+                logging.debug(f"Reachable locations: {reachable_locations_count}")
+                debug_percentages = {
+                    player: round(item_percentage(player, num), 2)
+                    for player, num in reachable_locations_count.items()
                 }
-                if balancing_players:
-                    balancing_state = state.copy()
-                    balancing_unchecked_locations = unchecked_locations.copy()
-                    balancing_reachables = reachable_locations_count.copy()
-                    balancing_sphere = sphere_locations.copy()
-                    candidate_items: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
-                    while True:
-                        # Check locations in the current sphere and gather progression items to swap earlier
-                        for location in balancing_sphere:
-                            if location.event:
-                                balancing_state.collect(location.item, True, location)
-                                player = location.item.player
-                                # only replace items that end up in another player's world
-                                if (not location.locked and not location.item.skip_in_prog_balancing and
-                                        player in balancing_players and
-                                        location.player != player and
-                                        location.progress_type != LocationProgressType.PRIORITY):
-                                    candidate_items[player].add(location)
-                                    logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
-                        for location in balancing_sphere:
-                            balancing_unchecked_locations.remove(location)
-                            if not location.locked:
-                                balancing_reachables[location.player] += 1
-                        if world.has_beaten_game(balancing_state) or all(
-                                item_percentage(player, reachables) >= threshold_percentages[player]
-                                for player, reachables in balancing_reachables.items()
-                                if player in threshold_percentages):
-                            break
-                        elif not balancing_sphere:
-                            raise RuntimeError('Not all required items reachable. Something went terribly wrong here.')
-                    # Gather a set of locations which we can swap items into
-                    unlocked_locations: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
-                    for l in unchecked_locations:
-                        if l not in balancing_unchecked_locations:
-                            unlocked_locations[l.player].add(l)
-                    items_to_replace: typing.List[Location] = []
-                    for player in balancing_players:
-                        locations_to_test = unlocked_locations[player]
-                        items_to_test = list(candidate_items[player])
-                        items_to_test.sort()
-                        world.random.shuffle(items_to_test)
-                        while items_to_test:
-                            testing = items_to_test.pop()
-                            reducing_state = state.copy()
-                            for location in itertools.chain((
-                                l for l in items_to_replace
-                                if l.item.player == player
-                            ), items_to_test):
-                                reducing_state.collect(location.item, True, location)
-
-                            reducing_state.sweep_for_events(locations=locations_to_test)
-
-                            if world.has_beaten_game(balancing_state):
-                                if not world.has_beaten_game(reducing_state):
-                                    items_to_replace.append(testing)
+                logging.debug(f"Reachable percentages: {debug_percentages}\n")
+                sphere_num += 1
+
+                if checked_locations:
+                    max_percentage = max(map(lambda p: item_percentage(p, reachable_locations_count[p]),
+                                             reachable_locations_count))
+                    threshold_percentages = {
+                        player: max_percentage * balanceable_players[player]
+                        for player in balanceable_players
+                    }
+                    logging.debug(f"Thresholds: {threshold_percentages}")
+                    balancing_players = {
+                        player
+                        for player, reachables in reachable_locations_count.items()
+                        if (player in threshold_percentages
+                            and item_percentage(player, reachables) < threshold_percentages[player])
+                    }
+                    if balancing_players:
+                        balancing_state = state.copy()
+                        balancing_tracker = tracker.copy(balancing_state)
+                        balancing_unchecked_locations = unchecked_locations.copy()
+                        balancing_reachables = reachable_locations_count.copy()
+                        balancing_sphere = sphere_locations.copy()
+                        candidate_items: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
+                        try:
+                            while True:
+                                # Check locations in the current sphere and gather progression items to swap earlier
+                                for location in balancing_sphere:
+                                    if location.event:
+                                        balancing_state.collect(location.item, True, location)
+                                        player = location.item.player
+                                        # only replace items that end up in another player's world
+                                        if (not location.locked and not location.item.skip_in_prog_balancing and
+                                                player in balancing_players and
+                                                location.player != player and
+                                                location.progress_type != LocationProgressType.PRIORITY):
+                                            candidate_items[player].add(location)
+                                            logging.debug(f"Candidate item: {location.name}, {location.item.name}")
+                                balancing_sphere = balancing_tracker.get_sphere_locations(balancing_unchecked_locations,
+                                                                                          key_locations)
+                                for location in balancing_sphere:
+                                    balancing_unchecked_locations.remove(location)
+                                    if not location.locked:
+                                        balancing_reachables[location.player] += 1
+                                if world.has_beaten_game(balancing_state) or all(
+                                        item_percentage(player, reachables) >= threshold_percentages[player]
+                                        for player, reachables in balancing_reachables.items()
+                                        if player in threshold_percentages):
+                                    break
+                                elif not balancing_sphere:
+                                    raise RuntimeError('Not all required items reachable. '
+                                                       'Something went terribly wrong here.')
+                        finally:
+                            balancing_tracker.close()
+                        # Gather a set of locations which we can swap items into
+                        unlocked_locations: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
+                        for l in unchecked_locations:
+                            if l not in balancing_unchecked_locations:
+                                unlocked_locations[l.player].add(l)
+                        items_to_replace: typing.List[Location] = []
+                        for player in balancing_players:
+                            locations_to_test = unlocked_locations[player]
+                            items_to_test = list(candidate_items[player])
+                            items_to_test.sort()
+                            world.random.shuffle(items_to_test)
+                            # the items left to test are always the first ones of items_to_test, so sweep each of
+                            # these prefixes once and only add the items to replace on top of them for each test
+                            prefix_state = state.copy()
+                            prefix_states: typing.List[typing.Tuple[CollectionState, SphereSearch]] = [
+                                (prefix_state, SphereSearch(prefix_state, locations_to_test))]
+                            try:
+                                _sweep_search(*prefix_states[-1])
+                                for location in items_to_test[:-1]:
+                                    prefix_state, prefix_search = prefix_states[-1]
+                                    prefix_state = prefix_state.copy()
+                                    prefix_states.append((prefix_state, prefix_search.copy(prefix_state)))
+                                    prefix_state.collect(location.item, True, location)
+                                    _sweep_search(*prefix_states[-1])
+                                while items_to_test:
+                                    testing = items_to_test.pop()
+                                    prefix_state, prefix_search = prefix_states[-1]
+                                    reducing_state = prefix_state.copy()
+                                    reducing_search = prefix_search.copy(reducing_state)
+                                    prefix_states.pop()
+                                    prefix_search.close()
+                                    try:
+                                        for location in items_to_replace:
+                                            if location.item.player == player:
+                                                reducing_state.collect(location.item, True, location)
+
+                                        _sweep_search(reducing_state, reducing_search)
+
+                                        if world.has_beaten_game(balancing_state):
+                                            if not world.has_beaten_game(reducing_state):
+                                                items_to_replace.append(testing)
+                                        else:
+                                            p = item_percentage(player, reachable_locations_count[player] +
+                                                                len(reducing_search.found))
+                                            if p < threshold_percentages[player]:
+                                                items_to_replace.append(testing)
+                                    finally:
+                                        reducing_search.close()
+                            finally:
+                                for _, prefix_search in prefix_states:
+                                    prefix_search.close()
+
+                        replaced_items = False
+
+                        # sort then shuffle to maintain deterministic behaviour,
+                        # while allowing use of set for better algorithm growth behaviour elsewhere
+                        replacement_locations = sorted(l for l in checked_locations if not l.event and not l.locked)
+                        world.random.shuffle(replacement_locations)
+                        items_to_replace.sort()
+                        world.random.shuffle(items_to_replace)
+
+                        # Start swapping items. Since we swap into earlier spheres, no need for accessibility checks. 
+                        while replacement_locations and items_to_replace:
+                            old_location = items_to_replace.pop()
+                            for new_location in replacement_locations:
+                                if new_location.can_fill(state, old_location.item, False) and \
+                                        old_location.can_fill(state, new_location.item, False):
+                                    replacement_locations.remove(new_location)
+                                    swap_location_item(old_location, new_location)
+                                    for location in (old_location, new_location):
+                                        if getattr(location.item, "locked_dungeon_item", False):
+                                            key_locations.add(location)
+                                        else:
+                                            key_locations.discard(location)
+                                    logging.debug(f"Progression balancing moved {new_location.item} to {new_location}, "
+                                                  f"displacing {old_location.item} into {old_location}")
+                                    moved_item_count += 1
+                                    state.collect(new_location.item, True, new_location)
+                                    replaced_items = True
+                                    break
                             else:
-                                reduced_sphere = get_sphere_locations(reducing_state, locations_to_test)
-                                p = item_percentage(player, reachable_locations_count[player] + len(reduced_sphere))
-                                if p < threshold_percentages[player]:
-                                    items_to_replace.append(testing)
-
-                    replaced_items = False
-
-                    # sort then shuffle to maintain deterministic behaviour,
-                    # while allowing use of set for better algorithm growth behaviour elsewhere
-                    replacement_locations = sorted(l for l in checked_locations if not l.event and not l.locked)
-                    world.random.shuffle(replacement_locations)
-                    items_to_replace.sort()
-                    world.random.shuffle(items_to_replace)
-
-                    # Start swapping items. Since we swap into earlier spheres, no need for accessibility checks. 
-                    while replacement_locations and items_to_replace:
-                        old_location = items_to_replace.pop()
-                        for new_location in replacement_locations:
-                            if new_location.can_fill(state, old_location.item, False) and \
-                                    old_location.can_fill(state, new_location.item, False):
-                                replacement_locations.remove(new_location)
-                                swap_location_item(old_location, new_location)
-                                logging.debug(f"Progression balancing moved {new_location.item} to {new_location}, "
-                                              f"displacing {old_location.item} into {old_location}")
-                                moved_item_count += 1
-                                state.collect(new_location.item, True, new_location)
-                                replaced_items = True
-                                break
-                        else:
-                            logging.warning(f"Could not Progression Balance {old_location.item}")
-
-                    if replaced_items:
-                        logging.debug(f"Moved {moved_item_count} items so far\n")
-                        unlocked = {fresh for player in balancing_players for fresh in unlocked_locations[player]}
-                        for location in get_sphere_locations(state, unlocked):
-                            unchecked_locations.remove(location)
-                            if not location.locked:
-                                reachable_locations_count[location.player] += 1
-                            sphere_locations.add(location)
-
-            for location in sphere_locations:
-                if location.event:
-                    state.collect(location.item, True, location)
-            checked_locations |= sphere_locations
-
-            if world.has_beaten_game(state):
-                break
-            elif not sphere_locations:
-                logging.warning("Progression Balancing ran out of paths.")
-                break
+                                logging.warning(f"Could not Progression Balance {old_location.item}")
+
+                        if replaced_items:
+                            logging.debug(f"Moved {moved_item_count} items so far\n")
+                            unlocked = {fresh for player in balancing_players for fresh in unlocked_locations[player]}
+                            for location in tracker.get_sphere_locations(unlocked, key_locations):
+                                unchecked_locations.remove(location)
+                                if not location.locked:
+                                    reachable_locations_count[location.player] += 1
+                                sphere_locations.add(location)
+
+                for location in sphere_locations:
+                    if location.event:
+                        state.collect(location.item, True, location)
+                checked_locations |= sphere_locations
+
+                if world.has_beaten_game(state):
+                    break
+                elif not sphere_locations:
+                    logging.warning("Progression Balancing ran out of paths.")
+                    break
+        finally:
+            tracker.close()
 
 
 def swap_location_item(location_1: Location, location_2: Location, check_locked: bool = True) -> None:
@@ -710,6 +1013,7 @@ def swap_location_item(location_1: Location, location_2: Location, check_locked:
     location_1.event, location_2.event = location_2.event, location_1.event
 
 
+@profiled("fill", "distribute_planned")
 def distribute_planned(world: MultiWorld) -> None:
     def warn(warning: str, force: typing.Union[bool, str]) -> None:
         if force in [True, 'fail', 'failure', 'none', False, 'warn', 'warning']:
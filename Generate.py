@@ -56,6 +56,8 @@ def mystery_argparse():
                         help='Output rolled mystery results to yaml up to specified number (made for async multiworld)')
     parser.add_argument('--plando', default=defaults["plando_options"],
                         help='List of options that can be set manually. Can be combined, for example "bosses, items"')
+    parser.add_argument('--profile', action='store_true',
+                        help='Write a JSON report of time spent per generation stage and world next to the output.')
     args = parser.parse_args()
     if not os.path.isabs(args.weights_file_path):
         args.weights_file_path = os.path.join(args.player_files_path, args.weights_file_path)
@@ -138,6 +140,7 @@ def main(args=None, callback=ERmain):
     erargs.glitch_triforce = options["generator"]["glitch_triforce_room"]
     erargs.spoiler = args.spoiler
     erargs.race = args.race
+    erargs.profile = args.profile
     erargs.outputname = seed_name
     erargs.outputpath = args.outputpath
 
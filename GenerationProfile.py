@@ -0,0 +1,199 @@
+"""
+Opt-in instrumentation of generation, enabled with Generate.py --profile. Records wall time and call counts of the
+generation stages, per world, of the fill and of the reachability checks, and is written as a JSON report next to the
+output zip.
+
+Hot methods of CollectionState, Region, Location and Entrance are only wrapped while a profile is active, so they cost
+nothing otherwise. Functions decorated with profiled only check whether a profile is active.
+"""
+from __future__ import annotations
+
+import contextlib
+import functools
+import json
+import threading
+import time
+import typing
+
+__all__ = ["GenerationProfile", "measure", "profiled"]
+
+Key = typing.Tuple[str, ...]
+F = typing.TypeVar("F", bound=typing.Callable[..., typing.Any])
+
+active: typing.Optional[GenerationProfile] = None
+"""the profile that is currently recording, if any"""
+
+_missing = object()
+
+
+class GenerationProfile:
+    """
+    Records how often and for how long each key was entered. Keys are tuples of names, the report nests them.
+    A key entered again while it is already running in the same thread is not counted a second time,
+    so the time of each key is the wall time spent inside it and calls are the outermost calls.
+    """
+    entries: typing.Dict[Key, typing.List[typing.Union[int, float]]]
+    """key -> [calls, seconds]"""
+    start: float
+    end: typing.Optional[float]
+
+    def __init__(self) -> None:
+        self.entries = {}
+        self.start = time.perf_counter()
+        self.end = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._patches: typing.List[typing.Tuple[typing.Any, str, typing.Any]] = []
+
+    def __enter__(self) -> GenerationProfile:
+        global active
+        assert active is None, "only one generation can be profiled at a time"
+        self.install()
+        active = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        global active
+        self.end = time.perf_counter()
+        active = None
+        self.uninstall()
+
+    def _active_keys(self) -> typing.Set[Key]:
+        try:
+            return self._local.keys
+        except AttributeError:
+            self._local.keys = keys = set()
+            return keys
+
+    def record(self, key: Key, seconds: float, calls: int = 1) -> None:
+        with self._lock:
+            entry = self.entries.get(key, None)
+            if entry is None:
+                self.entries[key] = [calls, seconds]
+            else:
+                entry[0] += calls
+                entry[1] += seconds
+
+    def call(self, key: Key, function: typing.Callable[..., typing.Any], *args: typing.Any, **kwargs: typing.Any) \
+            -> typing.Any:
+        """Calls function, timed as key."""
+        active_keys = self._active_keys()
+        if key in active_keys:
+            return function(*args, **kwargs)
+        active_keys.add(key)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            active_keys.discard(key)
+            self.record(key, seconds)
+
+    @contextlib.contextmanager
+    def measure(self, *key: str) -> typing.Iterator[None]:
+        """Times the block as key."""
+        active_keys = self._active_keys()
+        if key in active_keys:
+            yield
+            return
+        active_keys.add(key)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            active_keys.discard(key)
+            self.record(key, seconds)
+
+    def wrap(self, key: Key, function: F) -> F:
+        """Returns function timed as key."""
+        call = self.call
+
+        @functools.wraps(function)
+        def wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            return call(key, function, *args, **kwargs)
+        return typing.cast(F, wrapper)
+
+    def patch(self, owner: typing.Any, name: str, replacement: typing.Any) -> None:
+        """Replaces owner.name until uninstall."""
+        self._patches.append((owner, name, vars(owner).get(name, _missing)))
+        setattr(owner, name, replacement)
+
+    def _wrap_stage(self, function: typing.Callable[..., None]) -> typing.Callable[..., None]:
+        @functools.wraps(function)
+        def wrapper(multiworld: typing.Any, method_name: str, *args: typing.Any) -> None:
+            self.call(("stages", method_name), function, multiworld, method_name, *args)
+        return wrapper
+
+    def _wrap_call_single(self, call_single: typing.Callable[..., typing.Any]) -> typing.Callable[..., typing.Any]:
+        @functools.wraps(call_single)
+        def wrapper(multiworld: typing.Any, method_name: str, player: int, *args: typing.Any) -> typing.Any:
+            return self.call(("worlds", multiworld.worlds[player].game, method_name), call_single,
+                             multiworld, method_name, player, *args)
+        return wrapper
+
+    def install(self) -> None:
+        from BaseClasses import CollectionState, Entrance, Location, MultiWorld, Region, Spoiler
+        from worlds import AutoWorld
+
+        for name in ("call_all", "call_all_parallel", "call_stage"):
+            self.patch(AutoWorld, name, self._wrap_stage(getattr(AutoWorld, name)))
+        self.patch(AutoWorld, "call_single", self._wrap_call_single(AutoWorld.call_single))
+        # look up all stage methods first, subclassing worlds would see the wrapper of their parent otherwise
+        stage_methods = [(world_type, name, getattr(world_type, name))
+                         for world_type in AutoWorld.AutoWorldRegister.world_types.values()
+                         for name in dir(world_type) if name.startswith("stage_")]
+        for world_type, name, stage_method in stage_methods:
+            self.patch(world_type, name, staticmethod(self.wrap(("worlds", world_type.game, name), stage_method)))
+
+        for owner, names in ((CollectionState, ("sweep_for_events", "update_reachable_regions", "can_reach",
+                                                "evaluate_recorded")),
+                             (Region, ("can_reach",)), (Location, ("can_reach",)), (Entrance, ("can_reach",))):
+            for name in names:
+                self.patch(owner, name, self.wrap(("state", f"{owner.__name__}.{name}"), getattr(owner, name)))
+        self.patch(MultiWorld, "fulfills_accessibility",
+                   self.wrap(("output", "fulfills_accessibility"), MultiWorld.fulfills_accessibility))
+        self.patch(Spoiler, "create_playthrough",
+                   self.wrap(("output", "create_playthrough"), Spoiler.create_playthrough))
+
+    def uninstall(self) -> None:
+        for owner, name, original in reversed(self._patches):
+            if original is _missing:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._patches.clear()
+
+    def report(self) -> typing.Dict[str, typing.Any]:
+        end = time.perf_counter() if self.end is None else self.end
+        report: typing.Dict[str, typing.Any] = {"total": round(end - self.start, 6)}
+        for key, (calls, seconds) in sorted(self.entries.items()):
+            node = report
+            for part in key[:-1]:
+                node = node.setdefault(part, {})
+            node[key[-1]] = {"calls": calls, "time": round(seconds, 6)}
+        return report
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def measure(*key: str) -> typing.ContextManager[None]:
+    """Times the block as key in the active profile, if there is one."""
+    if active is None:
+        return contextlib.nullcontext()
+    return active.measure(*key)
+
+
+def profiled(*key: str) -> typing.Callable[[F], F]:
+    """Times calls of the decorated function as key in the active profile, if there is one."""
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            if active is None:
+                return function(*args, **kwargs)
+            return active.call(key, function, *args, **kwargs)
+        return typing.cast(F, wrapper)
+    return decorator
@@ -16,6 +16,7 @@ from worlds.alttp.Regions import is_main_entrance
 from Fill import distribute_items_restrictive, flood_items, balance_multiworld_progression, distribute_planned
 from worlds.alttp.Shops import FillDisabledShopSlots
 from Utils import output_path, get_options, __version__, version_tuple
+import GenerationProfile
 from worlds.generic.Rules import locality_rules, exclusion_rules
 from worlds import AutoWorld
 
@@ -33,6 +34,14 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         os.makedirs(args.outputpath, exist_ok=True)
         output_path.cached_path = args.outputpath
 
+    if args.profile and GenerationProfile.active is None:
+        with GenerationProfile.GenerationProfile() as profile:
+            world = main(args, seed, baked_server_options)
+        profile_path = output_path(f"AP_{world.seed_name}_profile.json")
+        profile.write(profile_path)
+        logging.info(f"Wrote generation profile to {profile_path}")
+        return world
+
     start = time.perf_counter()
     # initialize the world
     world = MultiWorld(args.multi)
@@ -107,7 +116,8 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
     AutoWorld.call_stage(world, "assert_generate")
 
-    AutoWorld.call_all(world, "generate_early")
+    # worlds that support it run the per slot setup stages concurrently
+    AutoWorld.call_all_parallel(world, "generate_early")
 
     logger.info('')
 
@@ -117,10 +127,10 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 world.push_precollected(world.create_item(item_name, player))
 
     logger.info('Creating World.')
-    AutoWorld.call_all(world, "create_regions")
+    AutoWorld.call_all_parallel(world, "create_regions")
 
     logger.info('Creating Items.')
-    AutoWorld.call_all(world, "create_items")
+    AutoWorld.call_all_parallel(world, "create_items")
 
     # All worlds should have finished creating all regions, locations, and entrances.
     # Recache to ensure that they are all visible for locality rules.
@@ -139,7 +149,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         world.non_local_items[1].value = set()
         world.local_items[1].value = set()
 
-    AutoWorld.call_all(world, "set_rules")
+    AutoWorld.call_all_parallel(world, "set_rules")
 
     for player in world.player_ids:
         exclusion_rules(world, player, world.exclude_locations[player].value)
@@ -147,7 +157,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         for location_name in world.priority_locations[player].value:
             world.get_location(location_name, player).progress_type = LocationProgressType.PRIORITY
 
-    AutoWorld.call_all(world, "generate_basic")
+    AutoWorld.call_all_parallel(world, "generate_basic")
 
     # temporary home for item links, should be moved out of Main
     for group_id, group in world.groups.items():
@@ -302,6 +312,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
             FillDisabledShopSlots(world)
 
+            @GenerationProfile.profiled("output", "write_multidata")
             def write_multidata():
                 import NetUtils
                 slot_data = {}
@@ -405,12 +416,13 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
             world.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
         if args.spoiler:
-            world.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+            with GenerationProfile.measure("output", "spoiler"):
+                world.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
 
         zipfilename = output_path(f"AP_{world.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
+        with GenerationProfile.measure("output", "zip"), \
+                zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
             for file in os.scandir(temp_dir):
                 zf.write(file.path, arcname=file.name)
 
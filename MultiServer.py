@@ -2,11 +2,14 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import bisect
+import contextlib
 import copy
 import functools
 import logging
 import zlib
 import collections
+import collections.abc
 import datetime
 import functools
 import hashlib
@@ -14,8 +17,10 @@ import inspect
 import itertools
 import logging
 import operator
+import os
 import pickle
 import random
+import struct
 import threading
 import time
 import typing
@@ -97,6 +102,184 @@ def get_saving_second(seed_name: str, interval: int = 60) -> int:
     return int(hashlib.sha256(seed_name.encode()).hexdigest(), 16) % interval
 
 
+def index_locations(locations: typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]) \
+        -> typing.Tuple[typing.Dict[typing.Tuple[int, int], typing.List[typing.Tuple[int, int, int]]],
+                        typing.Dict[int, typing.Dict[int, typing.List[int]]]]:
+    """Builds the reverse indexes of the multidata locations, so lookups by receiving slot don't scan every slot:
+    (receiving slot, item id) -> [(finding slot, location id, flags)] and receiving slot -> finding slot -> location ids.
+    Both keep the order of locations."""
+    item_locations: typing.Dict[typing.Tuple[int, int], typing.List[typing.Tuple[int, int, int]]] = {}
+    receiver_locations: typing.Dict[int, typing.Dict[int, typing.List[int]]] = {}
+    for finding_slot, location_data in locations.items():
+        for location_id, (item_id, receiving_slot, flags) in location_data.items():
+            item_locations.setdefault((receiving_slot, item_id), []).append((finding_slot, location_id, flags))
+            receiver_locations.setdefault(receiving_slot, {}).setdefault(finding_slot, []).append(location_id)
+    return item_locations, receiver_locations
+
+
+_invert_flags = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
+
+class CheckedLocations(collections.abc.MutableSet):
+    """
+    Checked location ids of a slot, stored as one flag byte per location id of the slot in sorted order.
+    The sorted location ids are shared by all teams and are indexed by offset when they are contiguous,
+    by bisection otherwise. Ids that aren't locations of the slot are not stored.
+    """
+    __slots__ = ("location_ids", "offset", "flags", "count")
+
+    location_ids: typing.Sequence[int]
+    offset: typing.Optional[int]
+    flags: bytearray
+    count: int
+
+    def __init__(self, location_ids: typing.Sequence[int], checked: typing.Iterable[int] = ()):
+        self.location_ids = location_ids
+        self.offset = location_ids[0] if location_ids and location_ids[-1] - location_ids[0] == len(location_ids) - 1 \
+            else None
+        self.flags = bytearray(len(location_ids))
+        self.count = 0
+        self.update(checked)
+
+    @classmethod
+    def _from_iterable(cls, iterable: typing.Iterable[int]) -> typing.Set[int]:
+        # results of set operators are plain sets
+        return set(iterable)
+
+    def _index(self, location_id: int) -> typing.Optional[int]:
+        if type(location_id) is not int:  # ids sent by clients may be anything
+            return None
+        if self.offset is not None:
+            index = location_id - self.offset
+            return index if 0 <= index < len(self.flags) else None
+        index = bisect.bisect_left(self.location_ids, location_id)
+        return index if index < len(self.location_ids) and self.location_ids[index] == location_id else None
+
+    def __contains__(self, location_id: object) -> bool:
+        index = self._index(location_id)
+        return index is not None and self.flags[index] == 1
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return itertools.compress(self.location_ids, self.flags)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({set(self)})"
+
+    def add(self, location_id: int):
+        index = self._index(location_id)
+        if index is not None and not self.flags[index]:
+            self.flags[index] = 1
+            self.count += 1
+
+    def discard(self, location_id: int):
+        index = self._index(location_id)
+        if index is not None and self.flags[index]:
+            self.flags[index] = 0
+            self.count -= 1
+
+    def update(self, location_ids: typing.Iterable[int]):
+        for location_id in location_ids:
+            self.add(location_id)
+
+    def checked(self) -> typing.List[int]:
+        """Returns the checked location ids, sorted."""
+        return list(itertools.compress(self.location_ids, self.flags))
+
+    def missing(self) -> typing.List[int]:
+        """Returns the unchecked location ids, sorted."""
+        return list(itertools.compress(self.location_ids, self.flags.translate(_invert_flags)))
+
+
+class LocationChecks(dict):
+    """(team, slot) -> CheckedLocations, created on first access like a defaultdict."""
+    slot_location_ids: typing.Dict[int, typing.Tuple[int, ...]]
+
+    def __init__(self, locations: typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
+        super().__init__()
+        self.slot_location_ids = {slot: tuple(sorted(location_data)) for slot, location_data in locations.items()}
+
+    def __missing__(self, key: team_slot) -> CheckedLocations:
+        checks = self[key] = CheckedLocations(self.slot_location_ids.get(key[1], ()))
+        return checks
+
+
+class SaveJournal:
+    """
+    Append-only file of save deltas, extending the save snapshot that carries the same journal id.
+    The file starts with the journal id, followed by length prefixed, zlib compressed pickled records.
+    A journal whose id doesn't match the snapshot is left over from before a compaction and is ignored.
+    """
+    length = struct.Struct("!I")
+    id_size = 16
+
+    filename: str
+    journal_id: typing.Optional[bytes]
+    size: int
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.journal_id = None
+        self.size = 0
+
+    def read(self, journal_id: typing.Optional[bytes]) -> typing.Optional[typing.List[dict]]:
+        """Returns the records of the journal extending the snapshot with journal_id,
+        or None if there is no such journal. Drops a partially written last record."""
+        try:
+            with open(self.filename, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if not journal_id or data[:self.id_size] != journal_id:
+            return None
+        records: typing.List[dict] = []
+        position = self.id_size
+        while position + self.length.size <= len(data):
+            start = position + self.length.size
+            end = start + self.length.unpack_from(data, position)[0]
+            if end > len(data):
+                break
+            try:
+                records.append(restricted_loads(zlib.decompress(data[start:end])))
+            except Exception as e:
+                logging.exception(e)
+                break
+            position = end
+        if position < len(data):
+            logging.warning(f"Dropping {len(data) - position} bytes of incomplete save journal.")
+            with open(self.filename, "r+b") as f:
+                f.truncate(position)
+        self.journal_id = journal_id
+        self.size = position
+        return records
+
+    def reset(self, journal_id: bytes):
+        """Starts an empty journal extending the snapshot with journal_id."""
+        with open(self.filename, "wb") as f:
+            f.write(journal_id)
+        self.journal_id = journal_id
+        self.size = len(journal_id)
+
+    def append(self, record: dict):
+        data = zlib.compress(pickle.dumps(record))
+        with open(self.filename, "ab") as f:
+            f.write(self.length.pack(len(data)) + data)
+        self.size += self.length.size + len(data)
+
+
+_missing = object()
+
+
+def dict_delta(current: typing.Dict[typing.Any, typing.Any], previous: typing.Dict[typing.Any, typing.Any]) \
+        -> typing.Tuple[typing.Dict[typing.Any, typing.Any], typing.List[typing.Any]]:
+    """Returns the entries of current that are new or differ from previous, and the keys removed from previous."""
+    changed = {key: value for key, value in current.items() if previous.get(key, _missing) != value}
+    removed = [key for key in previous if key not in current]
+    return changed, removed
+
+
 class Client(Endpoint):
     version = Version(0, 0, 0)
     tags: typing.List[str] = []
@@ -156,8 +339,14 @@ class Context:
     # team -> slot id -> list of clients authenticated to slot.
     clients: typing.Dict[int, typing.Dict[int, typing.List[Client]]]
     locations: typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
+    # (receiving slot, item id) -> [(finding slot, location id, flags)]
+    item_locations: typing.Dict[typing.Tuple[int, int], typing.List[typing.Tuple[int, int, int]]]
+    # receiving slot -> finding slot -> location ids
+    receiver_locations: typing.Dict[int, typing.Dict[int, typing.List[int]]]
     groups: typing.Dict[int, typing.Set[int]]
     save_version = 2
+    # the save journal is compacted into a new snapshot once it is larger than the snapshot and this
+    journal_min_compaction_size = 1024 * 1024
     stored_data: typing.Dict[str, object]
     read_data: typing.Dict[str, object]
     stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
@@ -192,6 +381,8 @@ class Context:
         self.allow_releases = {}
         #                          player          location_id     item_id  target_player_id
         self.locations = {}
+        self.item_locations = {}
+        self.receiver_locations = {}
         self.host = host
         self.port = port
         self.server_password = server_password
@@ -201,11 +392,14 @@ class Context:
         self.received_items = {}
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
-        self.location_checks = collections.defaultdict(set)
+        self.location_checks = LocationChecks({})
         self.hint_cost = hint_cost
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[NetUtils.Hint]] = collections.defaultdict(set)
+        # (team, finding player, location) -> the slots holding a not found hint for it, with that hint
+        self.unfound_hints: typing.Dict[typing.Tuple[int, int, int],
+                                        typing.List[typing.Tuple[team_slot, NetUtils.Hint]]] = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -224,6 +418,15 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread = None
         self.save_dirty = False
+        self.journal: typing.Optional[SaveJournal] = None
+        self.snapshot_size = 0
+        # journaled per slot state as of the last save, see get_save_delta
+        self.journaled: typing.Dict[str, typing.Dict[typing.Any, typing.Any]] = {}
+        self.journaled_received_items: typing.Dict[typing.Tuple[int, int, bool], int] = {}
+        # changes since the last save, only collected while there is a journal to write them to
+        self.unjournaled_location_checks: typing.Dict[team_slot, typing.Set[int]] = collections.defaultdict(set)
+        self.unjournaled_stored_data: typing.Set[str] = set()
+        self.unjournaled_hints: typing.Set[team_slot] = set()
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Utils.Version] = {}
@@ -234,6 +437,9 @@ class Context:
         self.stored_data = {}
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
         self.read_data = {}
+        self.outbound: typing.Dict[Endpoint, typing.List[dict]] = {}
+        self.outbound_received_items: typing.Dict[Client, dict] = {}  # ReceivedItems queued in the batch
+        self.outbound_batch_depth = 0
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -243,6 +449,14 @@ class Context:
         self.all_item_and_group_names = {}
         self.all_location_and_group_names = {}
         self.non_hintable_names = collections.defaultdict(frozenset)
+        # payloads that don't change while the room is up, encoded on first use
+        self.encoded_room_info: typing.Optional[str] = None
+        self.encoded_games: typing.Dict[str, str] = {}
+        # the slot_info and slot_data parts of Connected, encoded on first use after each load
+        self.encoded_slot_info: typing.Optional[str] = None
+        self.encoded_slot_data: typing.Dict[int, str] = {}
+        # the players part of Connected, along with the aliases it was encoded with
+        self.encoded_players: typing.Optional[typing.Tuple[typing.Dict[team_slot, str], str]] = None
 
         self._load_game_data()
 
@@ -270,6 +484,72 @@ class Context:
                 set(game_package["item_name_to_id"]) | set(self.item_name_groups[game_name])
             self.all_location_and_group_names[game_name] = \
                 set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, []))
+        self.encoded_room_info = None
+        self.encoded_games = {}
+
+    def _init_location_index(self):
+        self.item_locations, self.receiver_locations = index_locations(self.locations)
+        self.location_checks = LocationChecks(self.locations)
+
+    def get_encoded_room_info(self) -> str:
+        """Returns the RoomInfo packet. The games and their data package versions are only encoded once."""
+        if self.encoded_room_info is None:
+            games = {self.games[x] for x in range(1, len(self.games) + 1)}
+            games.add("Archipelago")
+            # only look up the packages of the room's games, the others may not even be loaded
+            packages = {game: self.gamespackage[game] for game in self.gamespackage if game in games}
+            self.encoded_room_info = self.dumper({
+                'games': games,
+                'version': Utils.version_tuple,
+                'datapackage_versions': {game: game_data["version"] for game, game_data in packages.items()},
+                'datapackage_checksums': {game: game_data["checksum"] for game, game_data in packages.items()
+                                          if "checksum" in game_data},
+                'seed_name': self.seed_name,
+            })[1:-1]
+        room_info = self.dumper({
+            'cmd': 'RoomInfo',
+            'password': bool(self.password),
+            # tags are for additional features in the communication.
+            # Name them by feature or fork, as you feel is appropriate.
+            'tags': self.tags,
+            'permissions': get_permissions(self),
+            'hint_cost': self.hint_cost,
+            'location_check_points': self.location_check_points,
+            'time': time.time(),
+        })
+        return f"[{room_info[:-1]},{self.encoded_room_info}}}]"
+
+    def get_encoded_data_package(self, games: typing.Iterable[str]) -> str:
+        """Returns the DataPackage packet for games. The package of each game is only encoded once."""
+        parts = []
+        for game in games:
+            encoded_game = self.encoded_games.get(game, None)
+            if encoded_game is None:
+                encoded_game = self.encoded_games[game] = self.dumper({game: self.gamespackage[game]})[1:-1]
+            parts.append(encoded_game)
+        # same as the dumper output for [{"cmd": "DataPackage", "data": {"games": games}}]
+        return f'[{{"cmd":"DataPackage","data":{{"games":{{{",".join(parts)}}}}}}}]'
+
+    def get_encoded_connected(self, team: int, slot: int, slot_data: bool) -> str:
+        """Returns the Connected packet of a slot, without the list around it. The players are only encoded again
+        after an alias changed, slot_info and the slot_data of each slot only once per load."""
+        if self.encoded_players is None or self.encoded_players[0] != self.name_aliases:
+            self.encoded_players = dict(self.name_aliases), self.dumper(self.get_players_package())
+        if self.encoded_slot_info is None:
+            self.encoded_slot_info = self.dumper(self.slot_info)
+        checks = self.dumper({
+            "missing_locations": get_missing_checks(self, team, slot),
+            "checked_locations": get_checked_checks(self, team, slot),
+        })[1:-1]
+        # same as the dumper output, so the keys keep their order
+        parts = [f'{{"cmd":"Connected","team":{team},"slot":{slot}', f'"players":{self.encoded_players[1]}',
+                 checks, f'"slot_info":{self.encoded_slot_info}']
+        if slot_data:
+            encoded_slot_data = self.encoded_slot_data.get(slot, None)
+            if encoded_slot_data is None:
+                encoded_slot_data = self.encoded_slot_data[slot] = self.dumper(self.slot_data[slot])
+            parts.append(f'"slot_data":{encoded_slot_data}')
+        return ",".join(parts) + "}"
 
     def item_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["item_name_to_id"] if game in self.gamespackage else None
@@ -319,9 +599,50 @@ class Context:
                 logging.info(f"Outgoing broadcast: {msg}")
             return True
 
+    @contextlib.contextmanager
+    def outbound_batch(self) -> typing.Iterator[None]:
+        """Holds back the messages broadcast or notified in the block and sends every endpoint a single frame with
+        all of its messages once the outermost batch ends. Each message is only encoded once for all recipients."""
+        self.outbound_batch_depth += 1
+        try:
+            yield
+        finally:
+            self.outbound_batch_depth -= 1
+            if not self.outbound_batch_depth:
+                self.flush_outbound()
+
+    def queue_msgs(self, endpoints: typing.Iterable[Endpoint], msgs: typing.List[dict]):
+        outbound = self.outbound
+        for endpoint in endpoints:
+            queued = outbound.get(endpoint, None)
+            if queued is None:
+                outbound[endpoint] = msgs.copy()
+            else:
+                queued.extend(msgs)
+
+    def flush_outbound(self):
+        outbound, self.outbound = self.outbound, {}
+        self.outbound_received_items = {}
+        encoded: typing.Dict[int, str] = {}  # id of msg -> msg encoded by itself
+        frames: typing.Dict[str, typing.List[Endpoint]] = {}
+        for endpoint, msgs in outbound.items():
+            parts = []
+            for msg in msgs:
+                part = encoded.get(id(msg), None)
+                if part is None:
+                    part = encoded[id(msg)] = self.dumper(msg)
+                parts.append(part)
+            # same as dumping the list, which has no whitespace between elements
+            frames.setdefault("[" + ",".join(parts) + "]", []).append(endpoint)
+        for frame, endpoints in frames.items():
+            async_start(self.broadcast_send_encoded_msgs(endpoints, frame))
+
     def broadcast_all(self, msgs: typing.List[dict]):
-        msgs = self.dumper(msgs)
         endpoints = (endpoint for endpoint in self.endpoints if endpoint.auth)
+        if self.outbound_batch_depth:
+            self.queue_msgs(endpoints, msgs)
+            return
+        msgs = self.dumper(msgs)
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
 
     def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
@@ -329,11 +650,17 @@ class Context:
         self.broadcast_all([{**{"cmd": "PrintJSON", "data": [{ "text": text }]}, **additional_arguments}])
 
     def broadcast_team(self, team: int, msgs: typing.List[dict]):
-        msgs = self.dumper(msgs)
         endpoints = (endpoint for endpoint in itertools.chain.from_iterable(self.clients[team].values()))
+        if self.outbound_batch_depth:
+            self.queue_msgs(endpoints, msgs)
+            return
+        msgs = self.dumper(msgs)
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
 
     def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
+        if self.outbound_batch_depth:
+            self.queue_msgs(endpoints, msgs)
+            return
         msgs = self.dumper(msgs)
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
 
@@ -348,14 +675,20 @@ class Context:
         if not client.auth:
             return
         logging.info("Notice (Player %s in team %d): %s" % (client.name, client.team + 1, text))
-        async_start(self.send_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}]))
+        msgs = [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}]
+        if self.outbound_batch_depth:
+            self.queue_msgs((client,), msgs)
+        else:
+            async_start(self.send_msgs(client, msgs))
 
     def notify_client_multiple(self, client: Client, texts: typing.List[str], additional_arguments: dict = {}):
         if not client.auth:
             return
-        async_start(self.send_msgs(client,
-                                   [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}
-                                    for text in texts]))
+        msgs = [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments} for text in texts]
+        if self.outbound_batch_depth:
+            self.queue_msgs((client,), msgs)
+        else:
+            async_start(self.send_msgs(client, msgs))
 
     # loading
     def load(self, multidatapath: str, use_embedded_server_options: bool = False):
@@ -409,15 +742,20 @@ class Context:
             self.player_names[0, slot_id] = slot_info.name
             self.player_name_lookup[slot_info.name] = 0, slot_id
             self.read_data[f"hints_{0}_{slot_id}"] = lambda local_team=0, local_player=slot_id: \
-                list(self.get_rechecked_hints(local_team, local_player))
+                list(self.hints[local_team, local_player])
 
         self.seed_name = decoded_obj["seed_name"]
         self.random.seed(self.seed_name)
         self.connect_names = decoded_obj['connect_names']
         self.locations = decoded_obj['locations']
+        self._init_location_index()
+        # any mapping, so that slot_data can be loaded on first use
         self.slot_data = decoded_obj['slot_data']
-        for slot, data in self.slot_data.items():
-            self.read_data[f"slot_data_{slot}"] = lambda data=data: data
+        self.encoded_slot_info = None
+        self.encoded_slot_data = {}
+        self.encoded_players = None
+        for slot in self.slot_data:
+            self.read_data[f"slot_data_{slot}"] = lambda slot=slot: self.slot_data[slot]
         self.er_hint_data = {int(player): {int(address): name for address, name in loc_data.items()}
                              for player, loc_data in decoded_obj["er_hint_data"].items()}
 
@@ -427,6 +765,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+        self._index_hints()
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -450,9 +789,9 @@ class Context:
                 del data["location_name_groups"]
             del data["item_name_groups"]  # remove from data package, but keep in self.item_name_groups
         self._init_game_data()
-        for game_name, data in self.item_name_groups.items():
+        for game_name in self.item_name_groups:
             self.read_data[f"item_name_groups_{game_name}"] = lambda lgame=game_name: self.item_name_groups[lgame]
-        for game_name, data in self.location_name_groups.items():
+        for game_name in self.location_name_groups:
             self.read_data[f"location_name_groups_{game_name}"] = lambda lgame=game_name: self.location_name_groups[lgame]
 
     # saving
@@ -470,15 +809,33 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            if exit_save or self.journal.journal_id is None or \
+                    self.journal.size >= max(self.snapshot_size, self.journal_min_compaction_size):
+                self._save_snapshot()
+            else:
+                delta = self.get_save_delta()
+                if delta:
+                    self.journal.append(delta)
         except Exception as e:
             logging.exception(e)
             return False
         else:
             return True
 
+    def _save_snapshot(self):
+        """Writes the full save and starts a new, empty journal extending it."""
+        self.get_save_delta()  # everything changed up to now is in the snapshot
+        journal_id = os.urandom(SaveJournal.id_size)
+        save = self.get_save()
+        save["journal_id"] = journal_id
+        encoded_save = zlib.compress(pickle.dumps(save))
+        temp_filename = self.save_filename + ".tmp"
+        with open(temp_filename, "wb") as f:
+            f.write(encoded_save)
+        os.replace(temp_filename, self.save_filename)
+        self.snapshot_size = len(encoded_save)
+        self.journal.reset(journal_id)
+
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
@@ -487,16 +844,29 @@ class Context:
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
-            try:
-                with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
-            except FileNotFoundError:
-                logging.error('No save data found, starting a new game')
-            except Exception as e:
-                logging.exception(e)
+            self._load_save_file()
             self._start_async_saving()
 
+    def _load_save_file(self):
+        self.journal = SaveJournal(self.save_filename + ".journal")
+        try:
+            with open(self.save_filename, 'rb') as f:
+                encoded_save = f.read()
+            save_data = restricted_loads(zlib.decompress(encoded_save))
+            self.set_save(save_data)
+            self.snapshot_size = len(encoded_save)
+            records = self.journal.read(save_data.get("journal_id", None))
+            if records:
+                for record in records:
+                    self.apply_save_delta(record)
+                self._index_hints()
+                logging.info(f"Replayed {len(records)} save journal records")
+        except FileNotFoundError:
+            logging.error('No save data found, starting a new game')
+        except Exception as e:
+            logging.exception(e)
+        self.get_save_delta()  # the loaded state is saved already
+
     def _start_async_saving(self):
         if not self.auto_saver_thread:
             def save_regularly():
@@ -525,14 +895,13 @@ class Context:
             atexit.register(self._save, True)  # make sure we save on exit too
 
     def get_save(self) -> dict:
-        self.recheck_hints()
         d = {
             "version": self.save_version,
             "connect_names": self.connect_names,
             "received_items": self.received_items,
             "hints_used": dict(self.hints_used),
             "hints": dict(self.hints),
-            "location_checks": dict(self.location_checks),
+            "location_checks": {key: set(checks) for key, checks in list(self.location_checks.items())},
             "name_aliases": self.name_aliases,
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
@@ -542,16 +911,29 @@ class Context:
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
             "stored_data": self.stored_data,
-            "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
-                             "server_password": self.server_password, "password": self.password,
-                             "forfeit_mode": self.release_mode, "release_mode": self.release_mode,  # TODO remove forfeit_mode around 0.4
-                             "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
-                             "item_cheat": self.item_cheat, "compatibility": self.compatibility}
-
+            "game_options": self.get_game_options()
         }
 
         return d
 
+    def get_game_options(self) -> dict:
+        return {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
+                "server_password": self.server_password, "password": self.password,
+                "forfeit_mode": self.release_mode, "release_mode": self.release_mode,  # TODO remove forfeit_mode around 0.4
+                "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
+                "item_cheat": self.item_cheat, "compatibility": self.compatibility}
+
+    def set_game_options(self, game_options: dict):
+        self.hint_cost = game_options["hint_cost"]
+        self.location_check_points = game_options["location_check_points"]
+        self.server_password = game_options["server_password"]
+        self.password = game_options["password"]
+        self.release_mode = game_options.get("release_mode", game_options.get("forfeit_mode", "goal"))
+        self.remaining_mode = game_options["remaining_mode"]
+        self.collect_mode = game_options["collect_mode"]
+        self.item_cheat = game_options["item_cheat"]
+        self.compatibility = game_options["compatibility"]
+
     def set_save(self, savedata: dict):
         if self.connect_names != savedata["connect_names"]:
             raise Exception("This savegame does not appear to match the loaded multiworld.")
@@ -569,30 +951,105 @@ class Context:
         self.client_activity_timers.update(
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
-        self.location_checks.update(savedata["location_checks"])
+        for key, checks in savedata["location_checks"].items():
+            self.location_checks[key].update(checks)
         self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
-            self.hint_cost = savedata["game_options"]["hint_cost"]
-            self.location_check_points = savedata["game_options"]["location_check_points"]
-            self.server_password = savedata["game_options"]["server_password"]
-            self.password = savedata["game_options"]["password"]
-            self.release_mode = savedata["game_options"].get("release_mode", savedata["game_options"].get("forfeit_mode", "goal"))
-            self.remaining_mode = savedata["game_options"]["remaining_mode"]
-            self.collect_mode = savedata["game_options"]["collect_mode"]
-            self.item_cheat = savedata["game_options"]["item_cheat"]
-            self.compatibility = savedata["game_options"]["compatibility"]
+            self.set_game_options(savedata["game_options"])
 
         if "group_collected" in savedata:
             self.group_collected = savedata["group_collected"]
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
+        self._index_hints()
         # count items and slots from lists for items_handling = remote
         logging.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
             f'for {sum(k[2] for k in self.received_items)} players')
 
+    def _get_journaled_state(self) -> typing.Dict[str, typing.Dict[typing.Any, typing.Any]]:
+        """Small per slot state, journaled as the entries that changed."""
+        return {
+            "hints_used": dict(self.hints_used),
+            "name_aliases": dict(self.name_aliases),
+            "client_game_state": dict(self.client_game_state),
+            "client_activity_timers": {key: value.timestamp() for key, value in
+                                       list(self.client_activity_timers.items())},
+            "client_connection_timers": {key: value.timestamp() for key, value in
+                                         list(self.client_connection_timers.items())},
+            "group_collected": {group: frozenset(players) for group, players in
+                                list(self.group_collected.items())},
+            "options": {"random_state": self.random.getstate(), "game_options": self.get_game_options()},
+        }
+
+    def get_save_delta(self) -> dict:
+        """Returns what changed since the last call as a save journal record, to be replayed by apply_save_delta.
+        New location checks, hints and stored_data keys are marked where they change, received items are append-only."""
+        delta: typing.Dict[str, typing.Any] = {}
+        location_checks, self.unjournaled_location_checks = \
+            self.unjournaled_location_checks, collections.defaultdict(set)
+        if location_checks:
+            delta["location_checks"] = dict(location_checks)
+
+        received_items = {}
+        for key, items in list(self.received_items.items()):
+            start = self.journaled_received_items.get(key, 0)
+            if len(items) != start:
+                received_items[key] = start, items[start:]
+                self.journaled_received_items[key] = len(items)
+        if received_items:
+            delta["received_items"] = received_items
+
+        stored_data_keys, self.unjournaled_stored_data = self.unjournaled_stored_data, set()
+        if stored_data_keys:
+            delta["stored_data"] = {key: self.stored_data[key] for key in stored_data_keys}
+
+        hint_keys, self.unjournaled_hints = self.unjournaled_hints, set()
+        if hint_keys:
+            delta["hints"] = {key: frozenset(self.hints[key]) for key in hint_keys}, []
+
+        state = self._get_journaled_state()
+        for name, current in state.items():
+            changed, removed = dict_delta(current, self.journaled.get(name, {}))
+            if changed or removed:
+                delta[name] = changed, removed
+        self.journaled = state
+        return delta
+
+    def apply_save_delta(self, delta: dict):
+        for key, locations in delta.get("location_checks", {}).items():
+            self.location_checks[key].update(locations)
+        for key, (start, items) in delta.get("received_items", {}).items():
+            self.received_items.setdefault(key, [])[start:] = items
+        self.stored_data.update(delta.get("stored_data", {}))
+
+        def update(name: str, target: typing.Dict[typing.Any, typing.Any],
+                   convert: typing.Callable[[typing.Any], typing.Any] = lambda value: value):
+            changed, removed = delta.get(name, ({}, ()))
+            for key in removed:
+                target.pop(key, None)
+            for key, value in changed.items():
+                target[key] = convert(value)
+
+        def from_timestamp(timestamp: float) -> datetime.datetime:
+            return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+
+        update("hints_used", self.hints_used)
+        update("hints", self.hints, set)
+        update("name_aliases", self.name_aliases)
+        update("client_game_state", self.client_game_state)
+        update("client_activity_timers", self.client_activity_timers, from_timestamp)
+        update("client_connection_timers", self.client_connection_timers, from_timestamp)
+        update("group_collected", self.group_collected, set)
+        options: typing.Dict[str, typing.Any] = {}
+        update("options", options)
+        if "random_state" in options:
+            self.random.setstate(options["random_state"])
+        if "game_options" in options:
+            self.set_game_options(options["game_options"])
+
     # rest
 
     def get_hint_cost(self, slot):
@@ -600,17 +1057,41 @@ class Context:
             return max(1, int(self.hint_cost * 0.01 * len(self.locations[slot])))
         return 0
 
-    def recheck_hints(self, team: typing.Optional[int] = None, slot: typing.Optional[int] = None):
-        for hint_team, hint_slot in self.hints:
-            if (team is None or team == hint_team) and (slot is None or slot == hint_slot):
-                self.hints[hint_team, hint_slot] = {
-                    hint.re_check(self, hint_team) for hint in
-                    self.hints[hint_team, hint_slot]
-                }
-
-    def get_rechecked_hints(self, team: int, slot: int):
-        self.recheck_hints(team, slot)
-        return self.hints[team, slot]
+    def _index_hints(self):
+        """Rebuilds unfound_hints from all hints, marking hints found whose location has been checked."""
+        self.unfound_hints = {}
+        for (team, slot), hints in self.hints.items():
+            for hint in list(hints):
+                if not hint.found:
+                    if hint.location in self.location_checks[team, hint.finding_player]:
+                        hints.discard(hint)
+                        hints.add(hint._replace(found=True))
+                    else:
+                        self.unfound_hints.setdefault((team, hint.finding_player, hint.location), []).append(
+                            ((team, slot), hint))
+
+    def add_hint(self, team: int, slot: int, hint: NetUtils.Hint):
+        """Remembers hint for slot, it is marked found once its location gets checked."""
+        self.hints[team, slot].add(hint)
+        if self.journal:
+            self.unjournaled_hints.add((team, slot))
+        if not hint.found:
+            self.unfound_hints.setdefault((team, hint.finding_player, hint.location), []).append(((team, slot), hint))
+
+    def find_hints(self, team: int, finding_player: int, locations: typing.Iterable[int]) -> typing.Set[int]:
+        """Marks the hints for the newly checked locations of finding_player found.
+        Returns the slots whose hints changed."""
+        changed: typing.Set[int] = set()
+        for location in locations:
+            for key, hint in self.unfound_hints.pop((team, finding_player, location), ()):
+                hints = self.hints[key]
+                if hint in hints:
+                    hints.remove(hint)
+                    hints.add(hint._replace(found=True))
+                    if self.journal:
+                        self.unjournaled_hints.add(key)
+                    changed.add(key[1])
+        return changed
 
     def get_players_package(self):
         return [NetworkPlayer(t, p, self.get_aliased_name(t, p), n) for (t, p), n in self.player_names.items()]
@@ -666,10 +1147,10 @@ class Context:
                 # since hints are bidirectional, finding player and receiving player,
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
-                    self.hints[team, hint.finding_player].add(hint)
+                    self.add_hint(team, hint.finding_player, hint)
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
-                        self.hints[team, player].add(hint)
+                        self.add_hint(team, player, hint)
                         new_hint_events.add(player)
 
             logging.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
@@ -680,8 +1161,11 @@ class Context:
             if not clients:
                 continue
             client_hints = [datum[1] for datum in sorted(hint_data, key=lambda x: x[0].finding_player == slot)]
-            for client in clients:
-                async_start(self.send_msgs(client, client_hints))
+            if self.outbound_batch_depth:
+                self.queue_msgs(clients, client_hints)
+            else:
+                for client in clients:
+                    async_start(self.send_msgs(client, client_hints))
 
     # "events"
 
@@ -695,6 +1179,14 @@ class Context:
             release_player(self, client.team, client.slot)
         self.save()  # save goal completion flag
 
+    def on_new_location_checks(self, team: int, slot: int, locations: typing.Set[int]):
+        """Called after locations were checked by team, slot for the first time."""
+        pass
+
+    def on_client_status_change(self, team: int, slot: int, status: ClientStatus):
+        """Called after the client status of team, slot changed."""
+        pass
+
     def on_new_hint(self, team: int, slot: int):
         key: str = f"_read_hints_{team}_{slot}"
         targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
@@ -745,26 +1237,7 @@ async def on_client_connected(ctx: Context, client: Client):
                     NetworkPlayer(team, slot,
                                   ctx.name_aliases.get((team, slot), name), name)
                 )
-    games = {ctx.games[x] for x in range(1, len(ctx.games) + 1)}
-    games.add("Archipelago")
-    await ctx.send_msgs(client, [{
-        'cmd': 'RoomInfo',
-        'password': bool(ctx.password),
-        'games': games,
-        # tags are for additional features in the communication.
-        # Name them by feature or fork, as you feel is appropriate.
-        'tags': ctx.tags,
-        'version': Utils.version_tuple,
-        'permissions': get_permissions(ctx),
-        'hint_cost': ctx.hint_cost,
-        'location_check_points': ctx.location_check_points,
-        'datapackage_versions': {game: game_data["version"] for game, game_data
-                                 in ctx.gamespackage.items() if game in games},
-        'datapackage_checksums': {game: game_data["checksum"] for game, game_data
-                                  in ctx.gamespackage.items() if game in games and "checksum" in game_data},
-        'seed_name': ctx.seed_name,
-        'time': time.time(),
-    }])
+    await ctx.send_encoded_msgs(client, ctx.get_encoded_room_info())
 
 
 def get_permissions(ctx) -> typing.Dict[str, Permission]:
@@ -865,20 +1338,31 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
     return ctx.start_inventory.setdefault(player, []) if remote_start_inventory else []
 
 
-def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
+def send_new_items(ctx: Context, team: typing.Optional[int] = None, slots: typing.Optional[typing.Iterable[int]] = None):
+    """Sends clients the items they did not receive yet. Only looks at the given slots of team if they are given."""
+    teams = ctx.clients.items() if team is None else ((team, ctx.clients[team]),)
+    for team, team_clients in teams:
+        for slot in team_clients if slots is None else slots:
+            for client in team_clients.get(slot, ()):
                 if client.no_items:
                     continue
                 start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
                 items = get_received_items(ctx, team, slot, client.remote_items)
                 if len(start_inventory) + len(items) > client.send_index:
                     first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+                    new_items = start_inventory[client.send_index:] + items[first_new_item:]
+                    if not ctx.outbound_batch_depth:
+                        async_start(ctx.send_msgs(client, [{
+                            "cmd": "ReceivedItems",
+                            "index": client.send_index,
+                            "items": new_items}]))
+                    elif client in ctx.outbound_received_items:
+                        # items received since the queued packet continue where it ends
+                        ctx.outbound_received_items[client]["items"] += new_items
+                    else:
+                        msg = {"cmd": "ReceivedItems", "index": client.send_index, "items": new_items}
+                        ctx.outbound_received_items[client] = msg
+                        ctx.queue_msgs((client,), [msg])
                     client.send_index = len(start_inventory) + len(items)
 
 
@@ -890,27 +1374,25 @@ def update_checked_locations(ctx: Context, team: int, slot: int):
 def release_player(ctx: Context, team: int, slot: int):
     """register any locations that are in the multidata"""
     all_locations = set(ctx.locations[slot])
-    ctx.broadcast_text_all("%s (Team #%d) has released all remaining items from their world."
-                           % (ctx.player_names[(team, slot)], team + 1),
-                           {"type": "Release", "team": team, "slot": slot})
-    register_location_checks(ctx, team, slot, all_locations)
-    update_checked_locations(ctx, team, slot)
+    with ctx.outbound_batch():
+        ctx.broadcast_text_all("%s (Team #%d) has released all remaining items from their world."
+                               % (ctx.player_names[(team, slot)], team + 1),
+                               {"type": "Release", "team": team, "slot": slot})
+        register_location_checks(ctx, team, slot, all_locations)
+        update_checked_locations(ctx, team, slot)
 
 
 def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
     """register any locations that are in the multidata, pointing towards this player"""
-    all_locations = collections.defaultdict(set)
-    for source_slot, location_data in ctx.locations.items():
-        for location_id, values in location_data.items():
-            if values[1] == slot:
-                all_locations[source_slot].add(location_id)
-
-    ctx.broadcast_text_all("%s (Team #%d) has collected their items from other worlds."
-                           % (ctx.player_names[(team, slot)], team + 1),
-                           {"type": "Collect", "team": team, "slot": slot})
-    for source_player, location_ids in all_locations.items():
-        register_location_checks(ctx, team, source_player, location_ids, count_activity=False)
-        update_checked_locations(ctx, team, source_player)
+    all_locations = ctx.receiver_locations.get(slot, {})
+
+    with ctx.outbound_batch():
+        ctx.broadcast_text_all("%s (Team #%d) has collected their items from other worlds."
+                               % (ctx.player_names[(team, slot)], team + 1),
+                               {"type": "Collect", "team": team, "slot": slot})
+        for source_player, location_ids in all_locations.items():
+            register_location_checks(ctx, team, source_player, location_ids, count_activity=False)
+            update_checked_locations(ctx, team, source_player)
 
     if not is_group:
         for group, group_players in ctx.groups.items():
@@ -922,11 +1404,8 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
 
 
 def get_remaining(ctx: Context, team: int, slot: int) -> typing.List[int]:
-    items = []
-    for location_id in ctx.locations[slot]:
-        if location_id not in ctx.location_checks[team, slot]:
-            items.append(ctx.locations[slot][location_id][0])  # item ID
-    return sorted(items)
+    location_data = ctx.locations[slot]
+    return sorted(location_data[location_id][0] for location_id in ctx.location_checks[team, slot].missing())
 
 
 def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem):
@@ -944,24 +1423,32 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
     if new_locations:
         if count_activity:
             ctx.client_activity_timers[team, slot] = datetime.datetime.now(datetime.timezone.utc)
-        for location in new_locations:
-            item_id, target_player, flags = ctx.locations[slot][location]
-            new_item = NetworkItem(item_id, location, slot, flags)
-            send_items_to(ctx, team, target_player, new_item)
-
-            logging.info('(Team #%d) %s sent %s to %s (%s)' % (
-                team + 1, ctx.player_names[(team, slot)], ctx.item_names[item_id],
-                ctx.player_names[(team, target_player)], ctx.location_names[location]))
-            info_text = json_format_send_event(new_item, target_player)
-            ctx.broadcast_team(team, [info_text])
-
-        ctx.location_checks[team, slot] |= new_locations
-        send_new_items(ctx)
-        ctx.broadcast(ctx.clients[team][slot], [{
-            "cmd": "RoomUpdate",
-            "hint_points": get_slot_points(ctx, team, slot),
-            "checked_locations": new_locations,  # send back new checks only
-        }])
+        receiving_slots: typing.Set[int] = set()
+        with ctx.outbound_batch():
+            for location in new_locations:
+                item_id, target_player, flags = ctx.locations[slot][location]
+                new_item = NetworkItem(item_id, location, slot, flags)
+                send_items_to(ctx, team, target_player, new_item)
+                receiving_slots |= ctx.slot_set(target_player)
+
+                logging.info('(Team #%d) %s sent %s to %s (%s)' % (
+                    team + 1, ctx.player_names[(team, slot)], ctx.item_names[item_id],
+                    ctx.player_names[(team, target_player)], ctx.location_names[location]))
+                info_text = json_format_send_event(new_item, target_player)
+                ctx.broadcast_team(team, [info_text])
+
+            ctx.location_checks[team, slot].update(new_locations)
+            if ctx.journal:
+                ctx.unjournaled_location_checks[team, slot] |= new_locations
+            ctx.on_new_location_checks(team, slot, new_locations)
+            for hint_slot in ctx.find_hints(team, slot, new_locations):
+                ctx.on_new_hint(team, hint_slot)
+            send_new_items(ctx, team, receiving_slots)
+            ctx.broadcast(ctx.clients[team][slot], [{
+                "cmd": "RoomUpdate",
+                "hint_points": get_slot_points(ctx, team, slot),
+                "checked_locations": new_locations,  # send back new checks only
+            }])
 
         ctx.save()
 
@@ -974,13 +1461,12 @@ def collect_hints(ctx: Context, team: int, slot: int, item: typing.Union[int, st
             slots.add(group_id)
 
     seeked_item_id = item if isinstance(item, int) else ctx.item_names_for_game(ctx.games[slot])[item]
-    for finding_player, check_data in ctx.locations.items():
-        for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-            if receiving_player in slots and item_id == seeked_item_id:
-                found = location_id in ctx.location_checks[team, finding_player]
-                entrance = ctx.er_hint_data.get(finding_player, {}).get(location_id, "")
-                hints.append(NetUtils.Hint(receiving_player, finding_player, location_id, item_id, found, entrance,
-                                           item_flags))
+    for receiving_player in slots:
+        for finding_player, location_id, item_flags in ctx.item_locations.get((receiving_player, seeked_item_id), ()):
+            found = location_id in ctx.location_checks[team, finding_player]
+            entrance = ctx.er_hint_data.get(finding_player, {}).get(location_id, "")
+            hints.append(NetUtils.Hint(receiving_player, finding_player, location_id, seeked_item_id, found, entrance,
+                                       item_flags))
 
     return hints
 
@@ -1402,7 +1888,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
                     {"type": "ItemCheat", "team": self.client.team, "receiving": self.client.slot, "item": new_item})
-                send_new_items(self.ctx)
+                send_new_items(self.ctx, self.client.team, (self.client.slot,))
                 return True
             else:
                 self.output(response)
@@ -1416,10 +1902,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         cost = self.ctx.get_hint_cost(self.client.slot)
 
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
-            self.ctx.notify_hints(self.client.team, list(hints))
+            self.ctx.notify_hints(self.client.team, list(self.ctx.hints[self.client.team, self.client.slot]))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
             return True
@@ -1552,15 +2035,11 @@ class ClientMessageProcessor(CommonCommandProcessor):
 
 
 def get_checked_checks(ctx: Context, team: int, slot: int) -> typing.List[int]:
-    return [location_id for
-            location_id in ctx.locations[slot] if
-            location_id in ctx.location_checks[team, slot]]
+    return ctx.location_checks[team, slot].checked()
 
 
 def get_missing_checks(ctx: Context, team: int, slot: int) -> typing.List[int]:
-    return [location_id for
-            location_id in ctx.locations[slot] if
-            location_id not in ctx.location_checks[team, slot]]
+    return ctx.location_checks[team, slot].missing()
 
 
 def get_client_points(ctx: Context, client: Client) -> int:
@@ -1634,47 +2113,29 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             client.version = args['version']
             client.tags = args['tags']
             client.no_locations = 'TextOnly' in client.tags or 'Tracker' in client.tags
-            connected_packet = {
-                "cmd": "Connected",
-                "team": client.team, "slot": client.slot,
-                "players": ctx.get_players_package(),
-                "missing_locations": get_missing_checks(ctx, team, slot),
-                "checked_locations": get_checked_checks(ctx, team, slot),
-                "slot_info": ctx.slot_info
-            }
-            reply = [connected_packet]
+            reply = [ctx.get_encoded_connected(team, slot, args.get("slot_data", True))]
             start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
             items = get_received_items(ctx, client.team, client.slot, client.remote_items)
             if (start_inventory or items) and not client.no_items:
-                reply.append({"cmd": 'ReceivedItems', "index": 0, "items": start_inventory + items})
+                reply.append(ctx.dumper({"cmd": 'ReceivedItems', "index": 0, "items": start_inventory + items}))
                 client.send_index = len(start_inventory) + len(items)
             if not client.auth:  # if this was a Re-Connect, don't print to console
                 client.auth = True
                 await on_client_joined(ctx, client)
-            if args.get("slot_data", True):
-                connected_packet["slot_data"] = ctx.slot_data[client.slot]
-            await ctx.send_msgs(client, reply)
+            await ctx.send_encoded_msgs(client, f"[{','.join(reply)}]")
 
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            requested_games = set(args.get("games", []))
+            games = [name for name in ctx.gamespackage if name in requested_games]
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
-
+            games = [name for name in ctx.gamespackage if name not in exclusions]
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            games = list(ctx.gamespackage)
+        await ctx.send_encoded_msgs(client, ctx.get_encoded_data_package(games))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -1745,7 +2206,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             await ctx.send_msgs(client, [{'cmd': 'LocationInfo', 'locations': locs}])
 
         elif cmd == 'StatusUpdate':
-            update_client_status(ctx, client, args["status"])
+            with ctx.outbound_batch():
+                update_client_status(ctx, client, args["status"])
 
         elif cmd == 'Say':
             if "text" not in args or type(args["text"]) is not str or not args["text"].isprintable():
@@ -1753,7 +2215,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                                               "original_cmd": cmd}])
                 return
 
-            client.messageprocessor(args["text"])
+            with ctx.outbound_batch():
+                client.messageprocessor(args["text"])
 
         elif cmd == "Bounce":
             games = set(args.get("games", []))
@@ -1795,6 +2258,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
             ctx.stored_data[args["key"]] = args["value"] = value
+            if ctx.journal:
+                ctx.unjournaled_stored_data.add(args["key"])
             targets = set(ctx.stored_data_notification_clients[args["key"]])
             if args.get("want_reply", True):
                 targets.add(client)
@@ -1817,6 +2282,8 @@ def update_client_status(ctx: Context, client: Client, new_status: ClientStatus)
             ctx.on_goal_achieved(client)
 
         ctx.client_game_state[client.team, client.slot] = new_status
+        if new_status != current:
+            ctx.on_client_status_change(client.team, client.slot, new_status)
 
 
 class ServerCommandProcessor(CommonCommandProcessor):
@@ -1970,7 +2437,7 @@ class ServerCommandProcessor(CommonCommandProcessor):
                 new_items = [NetworkItem(names[item_name], -1, 0) for _ in range(int(amount))]
                 send_items_to(self.ctx, team, slot, *new_items)
 
-                send_new_items(self.ctx)
+                send_new_items(self.ctx, team, self.ctx.slot_set(slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending ' + ('' if amount == 1 else f'{amount} of ') +
                     f'"{item_name}" to {self.ctx.get_aliased_name(team, slot)}')
@@ -2129,7 +2596,8 @@ async def console(ctx: Context):
                 await asyncio.sleep(0.05)
             input_text = await queue.get()
             queue.task_done()
-            ctx.commandprocessor(input_text)
+            with ctx.outbound_batch():
+                ctx.commandprocessor(input_text)
         except:
             import traceback
             traceback.print_exc()
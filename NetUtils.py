@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import itertools
 import typing
 import enum
 from json import JSONEncoder, JSONDecoder
 
 import websockets
+try:
+    # optional, speeds up encoding and decoding plain JSON
+    import orjson
+except ImportError:
+    orjson = None
 
 from Utils import Version
 
@@ -81,27 +87,109 @@ class NetworkItem(typing.NamedTuple):
     flags: int = 0
 
 
-def _scan_for_TypedTuples(obj: typing.Any) -> typing.Any:
-    if isinstance(obj, tuple) and hasattr(obj, "_fields"):  # NamedTuple is not actually a parent class
-        data = obj._asdict()
-        data["class"] = obj.__class__.__name__
-        return data
-    if isinstance(obj, (tuple, list, set, frozenset)):
-        return tuple(_scan_for_TypedTuples(o) for o in obj)
-    if isinstance(obj, dict):
-        return {key: _scan_for_TypedTuples(value) for key, value in obj.items()}
-    return obj
-
-
 _encode = JSONEncoder(
     ensure_ascii=False,
     check_circular=False,
     separators=(',', ':'),
 ).encode
 
+_leaf_types = frozenset((str, int, float, bool, type(None)))
+_int_types = frozenset((int,))
+# orjson writes exponents of floats differently and doesn't write Infinity and NaN, so floats are left to json
+_orjson_types = frozenset((str, int, bool, type(None)))
+
+
+class _TypedTupleEncoder:
+    """Encodes NamedTuples of one type as objects of their fields plus their class name.
+    Fields are encoded as plain JSON, so NamedTuples nested in fields are arrays."""
+    keys: typing.Tuple[str, ...]
+    name: str
+    template: str
+
+    def __init__(self, typed_tuple: typing.Type[typing.NamedTuple]):
+        self.keys = (*typed_tuple._fields, "class")
+        self.name = typed_tuple.__name__
+        # used when all fields are int, which is the case for most NetworkItems
+        self.template = "{" + ",".join([_encode(field).replace("%", "%%") + ":%d" for field in typed_tuple._fields] +
+                                       ['"class":' + _encode(self.name).replace("%", "%%")]) + "}"
+
+    def as_dict(self, obj: typing.NamedTuple) -> typing.Dict[str, typing.Any]:
+        return dict(zip(self.keys, (*obj, self.name)))
+
+    def encode(self, obj: typing.NamedTuple) -> str:
+        if _int_types.issuperset(map(type, obj)):
+            return self.template % obj
+        return _encode(self.as_dict(obj))
+
+    def encode_all(self, objs: typing.Collection[typing.NamedTuple]) -> str:
+        if _int_types.issuperset(map(type, itertools.chain.from_iterable(objs))):
+            template = self.template
+            return "[" + ",".join([template % obj for obj in objs]) + "]"
+        return _encode([self.as_dict(obj) for obj in objs])
+
+
+_typed_tuple_encoders: typing.Dict[type, _TypedTupleEncoder] = {}
+
+
+def _get_typed_tuple_encoder(types: typing.AbstractSet[type]) -> typing.Optional[_TypedTupleEncoder]:
+    """Returns the encoder for types, if they are exactly one NamedTuple type."""
+    if len(types) != 1:
+        return None
+    (obj_type,) = types
+    encoder = _typed_tuple_encoders.get(obj_type, None)
+    if encoder is None:
+        if not issubclass(obj_type, tuple) or not hasattr(obj_type, "_fields"):  # NamedTuple is not a parent class
+            return None
+        encoder = _typed_tuple_encoders[obj_type] = _TypedTupleEncoder(obj_type)
+    return encoder
+
+
+def _encode_plain(obj: typing.Union[dict, list, tuple], types: typing.AbstractSet[type]) -> str:
+    """Encodes a dict, list or tuple that only holds values of types, which are all leaf types."""
+    if orjson and _orjson_types.issuperset(types):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:  # integers beyond 64 bit or strings with lone surrogates
+            pass
+    return _encode(obj)
+
+
+def _encode_key(key: typing.Any) -> str:
+    if type(key) is str:
+        return _encode(key)
+    return _encode({key: None})[1:-6]  # json turns int, float, bool and None keys into strings
+
+
+def _encode_value(obj: typing.Any) -> str:
+    obj_type = type(obj)
+    if obj_type in _leaf_types:
+        return _encode(obj)
+    if isinstance(obj, dict):
+        types = set(map(type, obj.values()))
+        if _leaf_types.issuperset(types):
+            return _encode_plain(obj, types.union(map(type, obj)))
+        typed_tuple_encoder = _get_typed_tuple_encoder(types)
+        if typed_tuple_encoder:
+            return _encode({key: typed_tuple_encoder.as_dict(value) for key, value in obj.items()})
+        return "{" + ",".join([_encode_key(key) + ":" + _encode_value(value) for key, value in obj.items()]) + "}"
+    if isinstance(obj, (tuple, list, set, frozenset)):
+        typed_tuple_encoder = _get_typed_tuple_encoder({obj_type})
+        if typed_tuple_encoder:
+            return typed_tuple_encoder.encode(obj)
+        types = set(map(type, obj))
+        if _leaf_types.issuperset(types):
+            return _encode_plain(obj if obj_type is list or obj_type is tuple else tuple(obj), types)
+        typed_tuple_encoder = _get_typed_tuple_encoder(types)
+        if typed_tuple_encoder:
+            return typed_tuple_encoder.encode_all(obj)
+        return "[" + ",".join([_encode_value(value) for value in obj]) + "]"
+    return _encode(obj)
+
 
 def encode(obj: typing.Any) -> str:
-    return _encode(_scan_for_TypedTuples(obj))
+    """Encodes obj as JSON, NamedTuples as objects of their fields with their class name and sets as arrays.
+    Containers of only plain values are left to the C encoder of json, or orjson if it is installed."""
+    return _encode_value(obj)
 
 
 def get_any_version(data: dict) -> Version:
@@ -121,21 +209,37 @@ custom_hooks = {
 
 
 def _object_hook(o: typing.Any) -> typing.Any:
-    if isinstance(o, dict):
-        hook = custom_hooks.get(o.get("class", None), None)
-        if hook:
-            return hook(o)
-        cls = allowlist.get(o.get("class", None), None)
-        if cls:
-            for key in tuple(o):
-                if key not in cls._fields:
-                    del (o[key])
-            return cls(**o)
+    class_name = o.get("class", None)
+    if class_name is None:
+        return o
+    hook = custom_hooks.get(class_name, None)
+    if hook:
+        return hook(o)
+    cls = allowlist.get(class_name, None)
+    if cls:
+        for key in tuple(o):
+            if key not in cls._fields:
+                del (o[key])
+        return cls(**o)
 
     return o
 
 
-decode = JSONDecoder(object_hook=_object_hook).decode
+_decode = JSONDecoder(object_hook=_object_hook).decode
+# orjson reads integers beyond 64 bit as floats, so anything with 19 digits in a row is left to json
+_digits_table = bytes(0x30 if 0x30 <= byte <= 0x39 else 0x20 for byte in range(256))
+_long_number = b"0" * 19
+
+
+def decode(s: str) -> typing.Any:
+    """Decodes JSON, turning objects with an allowed class into that class.
+    Without any class in s, orjson is used if it is installed."""
+    if orjson and '"class"' not in s and _long_number not in s.encode(errors="surrogatepass").translate(_digits_table):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:  # not strict JSON, like NaN or lone surrogates
+            pass
+    return _decode(s)
 
 
 class Endpoint:
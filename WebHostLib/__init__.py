@@ -23,7 +23,14 @@ app.jinja_env.filters['all'] = all
 
 app.config["SELFHOST"] = True  # application process is in charge of running the websites
 app.config["GENERATORS"] = 8  # maximum concurrent world gens
+# MB of estimated memory concurrent world gens may use together, 0 is limited by GENERATORS only
+app.config["GENERATOR_MEMORY"] = 0
+# world gens a generator process runs before it is replaced, releasing memory it leaked. 0 never replaces them.
+# Only used where generations can't run in a forked process of their own, which is everywhere but Linux
+app.config["GENERATOR_MAX_JOBS"] = 20
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
+# processes that each host many Rooms on one event loop, 0 runs every Room in a process of its own
+app.config["HOSTERS"] = 0
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
 app.config["SELFGEN"] = True  # application process is in charge of scheduling Generations.
@@ -50,6 +57,12 @@ app.config["PONY"] = {
 }
 app.config["MAX_ROLL"] = 20
 app.config["CACHE_TYPE"] = "flask_caching.backends.SimpleCache"
+# approximate bytes of memory each web worker may use to cache the seed data of trackers
+app.config["TRACKER_CACHE_SIZE"] = 256 * 1024 * 1024
+# also keep the seed data of trackers in the CACHE_TYPE backend, for backends shared by web workers
+app.config["TRACKER_CACHE_SHARED"] = False
+# seconds /api/tracker/<tracker>/events may hold a request open to wait for new events, 0 always answers right away
+app.config["TRACKER_EVENTS_WAIT"] = 0
 app.config["JSON_AS_ASCII"] = False
 app.config["HOST_ADDRESS"] = ""
 
@@ -0,0 +1,118 @@
+import time
+import typing
+from uuid import UUID
+
+from flask import Response, abort, jsonify, request
+from pony.orm import rollback
+
+from WebHostLib import app
+from WebHostLib.customserver import get_tracker_events_end, get_tracker_events_path, read_tracker_events
+from WebHostLib.models import Room
+from WebHostLib.tracker import get_room_save, get_static_room_data
+from . import api_endpoints
+
+
+max_events_per_response = 1000
+
+
+def get_tracker_etag(room: Room) -> str:
+    """Changes with every save of the room, as saves update its last_activity, and with every tracker event."""
+    return f"{room.last_activity.timestamp()}-{get_tracker_events_end(get_tracker_events_path(room.id))}"
+
+
+@api_endpoints.route('/tracker/<suuid:tracker>')
+def get_tracker_data(tracker: UUID):
+    """The state of every player of a room, as of its last save and the tracker events after it.
+    events_offset is where to continue with /api/tracker/<tracker>/events."""
+    for attempt in range(3):
+        room = Room.get(tracker=tracker)
+        if not room:
+            return abort(404)
+        etag = get_tracker_etag(room)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        multisave: typing.Dict[str, typing.Any] = get_room_save(room)
+        events, events_offset = read_tracker_events(get_tracker_events_path(room.id),
+                                                    multisave.get("tracker", {}).get("events_offset", 0))
+        if events is not None:
+            break
+        rollback()  # the room saved and dropped the events after the save read here, read the new one
+    else:
+        return {"text": "The room is saving, try again."}, 503
+
+    locations, names, _, _, _, _, games, _, groups, _, _, _ = get_static_room_data(room)
+    location_checks = {key: set(checks) for key, checks in multisave.get("location_checks", {}).items()}
+    activity = dict(multisave.get("client_activity_timers", ()))
+    states = dict(multisave.get("client_game_state", {}))
+    hints = {key: [hint._asdict() for hint in slot_hints] for key, slot_hints in multisave.get("hints", {}).items()}
+    aliases = multisave.get("name_aliases", {})
+
+    for event in events:
+        key = event["team"], event["slot"]
+        if event["type"] == "check":
+            location_checks.setdefault(key, set()).update(event["locations"])
+            activity[key] = event["time"]
+        elif event["type"] == "status":
+            states[key] = event["status"]
+        elif event["type"] == "hint":
+            hints[key] = event["hints"]
+
+    players = []
+    for team, team_names in enumerate(names):
+        for player, name in enumerate(team_names, 1):
+            if player in groups:
+                continue
+            players.append({
+                "team": team,
+                "player": player,
+                "name": name,
+                "alias": aliases.get((team, player), name),
+                "game": games[player],
+                "status": states.get((team, player), 0),
+                "checks_done": len(location_checks.get((team, player), ())),
+                "checks_total": len(locations[player]),
+                "last_activity": activity.get((team, player), None),
+            })
+    # every hint is known to its finding and receiving player
+    unique_hints = {(team, tuple(hint.values())): hint for (team, _), slot_hints in hints.items()
+                    for hint in slot_hints}
+    response = jsonify({
+        "players": players,
+        "hints": [{"team": team, **hint} for (team, _), hint in unique_hints.items()],
+        "events_offset": events_offset,
+    })
+    response.set_etag(etag)
+    return response
+
+
+@api_endpoints.route('/tracker/<suuid:tracker>/events')
+def get_tracker_events(tracker: UUID):
+    """Up to max_events_per_response check, status and hint events of a room from the offset since on, as written by
+    the room as they happen. Waits up to TRACKER_EVENTS_WAIT seconds for new events if there are none.
+    The room drops the events its saves cover, since has to be reloaded from /api/tracker/<tracker> once they are."""
+    room = Room.get(tracker=tracker)
+    if not room:
+        return abort(404)
+    path = get_tracker_events_path(room.id)
+    since = request.args.get("since", 0, type=int)
+    if since < 0:
+        return {"text": "since has to be an offset from /api/tracker or a previous response."}, 400
+    deadline = time.monotonic() + app.config["TRACKER_EVENTS_WAIT"]
+    rollback()  # don't keep a database transaction open while waiting
+    events, offset = read_tracker_events(path, since, max_events_per_response)
+    while events == [] and time.monotonic() < deadline:
+        time.sleep(0.5)
+        events, offset = read_tracker_events(path, since, max_events_per_response)
+    if events is None:
+        return {"text": "The events from since on are saved and no longer available, "
+                        "get the tracker again for a new offset."}, 410
+    return {"events": events, "next": offset}
+
+
+@api_endpoints.route('/tracker_cache')
+def get_tracker_cache_stats():
+    from ..tracker import _multidata_cache
+    return _multidata_cache.stats()
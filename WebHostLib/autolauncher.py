@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import copy
 import json
 import logging
 import multiprocessing
+import multiprocessing.connection
 import os
+import queue
+import signal
+import socket
 import sys
 import threading
 import time
+import traceback
 import typing
 from datetime import timedelta, datetime
+from uuid import UUID
 
 from pony.orm import db_session, select, commit
 
@@ -64,6 +71,26 @@ else:  # unix
             self.fp.close()
 
 
+def get_command_socket_path(room_id) -> typing.Optional[str]:
+    """Path of the socket a room's server process listens on for new commands, None if the platform has none."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    return os.path.join(CommonLocker.lock_folder, f"{room_id}.sock")
+
+
+def notify_room(room_id):
+    """Wakes up the server process of a room to run its commands, which have to be committed to the database already.
+    Rooms not reached this way still find them when they next poll the database."""
+    path = get_command_socket_path(room_id)
+    if path:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            try:
+                sock.sendto(b"\0", path)
+            except OSError:  # not running on this host, or already woken up often enough
+                pass
+
+
 def launch_room(room: Room, config: dict):
     # requires db_session!
     if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout):
@@ -85,22 +112,314 @@ def handle_generation_failure(result: BaseException):
         logging.exception(e)
 
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation):
+generation_base_memory = 80
+"""MB of a generator process before it generates, mostly the imported worlds"""
+generation_player_memory = 0.5
+"""MB a generation takes per player, in addition to generation_location_memory"""
+generation_location_memory = 0.004
+"""MB a generation takes per location of each player's game"""
+
+
+def estimate_generation_memory(options: typing.Dict[str, typing.Dict[str, typing.Any]]) -> float:
+    """Estimates the peak memory in MB of generating from rolled options by the location counts of the games."""
+    from worlds.AutoWorld import AutoWorldRegister
+    memory = generation_base_memory
+    for settings in options.values():
+        world = AutoWorldRegister.world_types.get(settings.get("game"), None)
+        locations = len(world.location_name_to_id) if world else 500
+        memory += generation_player_memory + locations * generation_location_memory
+    return memory
+
+
+class GenerationJob(typing.NamedTuple):
+    sid: UUID
+    options: typing.Dict[str, typing.Dict[str, typing.Any]]
+    meta: typing.Dict[str, typing.Any]
+    owner: UUID
+    memory: float
+    queued: float
+    """time.monotonic() it was queued at"""
+
+
+GenerationResult = typing.Tuple[UUID, typing.Optional[UUID], typing.Optional[typing.Tuple[str, str]]]
+"""sid, seed id and (error, traceback) of a finished generation"""
+
+
+class WorldClassState():
+    """Snapshot of the class attributes of every world, to undo what a generation changed on them
+    before the next one runs in the same process. Attributes holding a dict, list or set are restored to a deep copy
+    of their contents, other values are only restored as the same object, so changes made inside those are kept.
+    Nothing outside of the world classes is restored, like module globals of the worlds or Generate, which is why
+    generations run in a forked process of their own wherever they can, see generation_fork."""
+    def __init__(self):
+        from worlds.AutoWorld import AutoWorldRegister
+        self.attributes: typing.Dict[type, typing.Dict[str, typing.Any]] = {}
+        self.contents: typing.Dict[type, typing.Dict[str, typing.Any]] = {}
+        for world_type in set(AutoWorldRegister.world_types.values()):
+            attributes = dict(vars(world_type))
+            self.attributes[world_type] = attributes
+            self.contents[world_type] = {name: self.copy_contents(value) for name, value in attributes.items()
+                                         if type(value) in (dict, list, set)}
+
+    @staticmethod
+    def copy_contents(value: typing.Union[dict, list, set]) -> typing.Union[dict, list, set]:
+        try:
+            return copy.deepcopy(value)
+        except Exception:  # holds something that can't be copied, like a lock
+            return copy.copy(value)
+
+    def restore(self):
+        for world_type, attributes in self.attributes.items():
+            for name in set(vars(world_type)) - attributes.keys():
+                delattr(world_type, name)
+            for name, value in attributes.items():
+                if vars(world_type).get(name, None) is not value:
+                    setattr(world_type, name, value)
+            for name, contents in self.contents[world_type].items():
+                value = attributes[name]
+                if value != contents:
+                    # copied again, so that the next generation can't change the snapshot
+                    contents = self.copy_contents(contents)
+                    if isinstance(value, list):
+                        value[:] = contents
+                    else:
+                        value.clear()
+                        value.update(contents)
+
+
+def run_generation_job(job: typing.Tuple[UUID, dict, dict, UUID],
+                       results: multiprocessing.connection.Connection):
+    sid, options, meta, owner = job
     try:
-        meta = json.loads(generation.meta)
-        options = restricted_loads(generation.options)
-        logging.info(f"Generating {generation.id} for {len(options)} players")
-        pool.apply_async(gen_game, (options,),
-                         {"meta": meta,
-                          "sid": generation.id,
-                          "owner": generation.owner},
-                         handle_generation_success, handle_generation_failure)
-    except Exception as e:
-        generation.state = STATE_ERROR
-        commit()
-        logging.exception(e)
+        seed_id = generate_seed(options, meta, owner, sid)
+    except BaseException as e:
+        results.send((sid, None, (e.__class__.__name__ + ": " + str(e), traceback.format_exc())))
     else:
-        generation.state = STATE_STARTED
+        results.send((sid, seed_id, None))
+
+
+generation_fork = sys.platform.startswith("linux")
+"""Whether generator workers fork a process per generation, fork being unavailable on Windows and unsafe on macOS"""
+
+
+def run_generator_worker(worker_id: int, pony_config: dict, job_queue: multiprocessing.Queue,
+                         results: multiprocessing.connection.Connection):
+    """Runs the generations from job_queue one after another until it gets None,
+    sending (sid, seed id, (error, traceback)) through results for each.
+    The worlds are imported once, with this module. Where generation_fork is set, each generation runs in a process
+    forked from this one, so that it starts from the freshly imported worlds and takes nothing along to the next.
+    Otherwise they run in this process, which resets the class attributes of the worlds after each."""
+    init_db(pony_config)
+    db.disconnect()  # generations connect on their own, a connection can't be shared with forked processes
+    if generation_fork:
+        generation_context = multiprocessing.get_context("fork")
+        generation: typing.Optional[multiprocessing.Process] = None
+
+        def terminate(signum, frame):
+            if generation:
+                generation.terminate()
+            sys.exit(1)
+
+        def run_forked_generation_job(job, generation_results: multiprocessing.connection.Connection):
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            run_generation_job(job, generation_results)
+
+        signal.signal(signal.SIGTERM, terminate)
+    else:
+        world_state = WorldClassState()
+
+    while True:
+        job = job_queue.get()
+        if job is None:
+            return
+        if generation_fork:
+            # the result goes through this process, so that it is only passed on once the generation process is
+            # gone and isn't followed by an error when that process fails after sending it
+            generation_receiver, generation_sender = generation_context.Pipe(duplex=False)
+            generation = generation_context.Process(target=run_forked_generation_job, args=(job, generation_sender),
+                                                    name=f"Generation{worker_id}")
+            generation.start()
+            generation_sender.close()
+            try:
+                result = generation_receiver.recv()
+            except EOFError:  # ended without a result
+                result = None
+            generation.join()
+            generation_receiver.close()
+            if result:
+                results.send(result)
+            else:
+                results.send((job[0], None, ("Generation process ended unexpectedly.",
+                                             f"Exit code {generation.exitcode}")))
+            generation = None
+        else:
+            run_generation_job(job, results)
+            world_state.restore()
+
+
+class GeneratorWorker():
+    """A process generating one job at a time, replaced when one exceeds JOB_TIME, and without generation_fork
+    also after max_jobs of them.
+    Its replacement is started right away, to have imported the worlds by the time the next job comes.
+    Each process gets a pipe of its own for its results, which terminating it may leave half written."""
+    def __init__(self, worker_id: int, config: dict):
+        self.worker_id = worker_id
+        self.ponyconfig = config["PONY"]
+        self.max_jobs: int = config["GENERATOR_MAX_JOBS"]
+        self.process: typing.Optional[multiprocessing.Process] = None
+        self.job_queue: typing.Optional[multiprocessing.Queue] = None
+        self.results: typing.Optional[multiprocessing.connection.Connection] = None
+        self.job: typing.Optional[GenerationJob] = None
+        self.job_start = 0.0
+        self.jobs_done = 0
+
+    def alive(self) -> bool:
+        return bool(self.process and self.process.is_alive())
+
+    def start(self):
+        self.close_results()
+        self.job_queue = multiprocessing.Queue()
+        self.results, results_sender = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(group=None, target=run_generator_worker,
+                                               args=(self.worker_id, self.ponyconfig, self.job_queue,
+                                                     results_sender),
+                                               name=f"Generator{self.worker_id}")
+        self.process.start()
+        results_sender.close()  # only held by the process from here on
+        self.jobs_done = 0
+
+    def receive(self) -> typing.List[GenerationResult]:
+        """Returns the results sent by the process since the last call."""
+        received = []
+        try:
+            while self.results and self.results.poll():
+                received.append(self.results.recv())
+        except (EOFError, OSError):  # the process ended
+            self.close_results()
+        return received
+
+    def close_results(self):
+        if self.results:
+            self.results.close()
+            self.results = None
+
+    def stop(self):
+        """Lets the process exit after its current job."""
+        if self.alive():
+            self.job_queue.put(None)
+        self.process = None
+
+    def terminate(self):
+        if self.process:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+        self.close_results()
+
+    def run(self, job: GenerationJob):
+        if not self.alive():
+            self.start()
+        self.job = job
+        self.job_start = time.monotonic()
+        self.job_queue.put((job.sid, job.options, job.meta, job.owner))
+
+    def done(self):
+        self.job = None
+        self.jobs_done += 1
+        if self.max_jobs and self.jobs_done >= self.max_jobs and not generation_fork:
+            logging.info(f"Recycling generator {self.worker_id} after {self.jobs_done} generations")
+            self.stop()
+            self.start()
+
+
+class GenerationScheduler():
+    """Runs queued generations on GENERATORS worker processes, smallest estimated memory first. Starts no more than
+    fit into GENERATOR_MEMORY MB together, unless none is running. Generations waiting for longer than JOB_TIME
+    go first, so that large ones can not be held back forever."""
+    worker_type: typing.Type[GeneratorWorker] = GeneratorWorker
+
+    def __init__(self, config: dict):
+        self.workers = [self.worker_type(worker_id, config) for worker_id in range(config["GENERATORS"])]
+        self.memory_budget: float = config["GENERATOR_MEMORY"]
+        self.job_time: typing.Optional[float] = config["JOB_TIME"]
+        self.queue: typing.Dict[UUID, GenerationJob] = {}
+        for worker in self.workers:
+            worker.start()
+
+    def add(self, generation: Generation):
+        # requires db_session!
+        try:
+            meta = json.loads(generation.meta)
+            options = restricted_loads(generation.options)
+            memory = estimate_generation_memory(options)
+        except Exception as e:
+            generation.state = STATE_ERROR
+            commit()
+            logging.exception(e)
+        else:
+            logging.info(f"Queued generation {generation.id} for {len(options)} players, estimated {memory:.0f} MB")
+            self.queue[generation.id] = GenerationJob(generation.id, options, meta, generation.owner, memory,
+                                                      time.monotonic())
+            generation.state = STATE_STARTED
+
+    def collect(self):
+        """Handles finished generations and ends those that ran too long or whose process died."""
+        now = time.monotonic()
+        for worker in self.workers:
+            # checked before receiving, as the results of a process are all sent by the time it ended
+            alive = worker.alive()
+            for sid, seed_id, error in worker.receive():
+                if worker.job and worker.job.sid == sid:
+                    worker.done()
+                if error:
+                    message, error_traceback = error
+                    logging.error(f"Generation {sid} failed:\n{error_traceback}")
+                    set_generation_error(sid, message)
+                else:
+                    handle_generation_success(seed_id)
+
+            if not worker.job:
+                continue
+            if self.job_time is not None and now - worker.job_start > self.job_time:
+                logging.info(f"Generation {worker.job.sid} exceeded {self.job_time} seconds, "
+                             f"terminating generator {worker.worker_id}")
+                worker.terminate()
+                set_generation_error(worker.job.sid, generation_timeout_error)
+                worker.job = None
+                worker.start()
+            elif not alive:
+                logging.error(f"Generator {worker.worker_id} ended during generation {worker.job.sid}")
+                set_generation_error(worker.job.sid, "Generation process ended unexpectedly.")
+                worker.job = None
+                worker.start()
+
+    def schedule(self):
+        """Starts queued generations on idle workers, as far as they fit into the memory budget."""
+        # running processes last, to be used first
+        idle = sorted((worker for worker in self.workers if not worker.job), key=GeneratorWorker.alive)
+        if not idle or not self.queue:
+            return
+        running_memory = sum(worker.job.memory for worker in self.workers if worker.job)
+        now = time.monotonic()
+
+        def priority(job: GenerationJob):
+            overdue = self.job_time is not None and now - job.queued > self.job_time
+            return not overdue, job.memory, job.queued
+
+        for job in sorted(self.queue.values(), key=priority):
+            if not idle:
+                break
+            if self.memory_budget and running_memory and running_memory + job.memory > self.memory_budget:
+                break  # wait for memory to free up instead of letting smaller jobs overtake
+            del self.queue[job.sid]
+            running_memory += job.memory
+            worker = idle.pop()
+            logging.info(f"Generating {job.sid} on generator {worker.worker_id}")
+            worker.run(job)
+
+    def close(self):
+        for worker in self.workers:
+            worker.terminate()
 
 
 def init_db(pony_config: dict):
@@ -109,12 +428,20 @@ def init_db(pony_config: dict):
 
 
 def autohost(config: dict):
+    global room_host_pool
+    if config["HOSTERS"] and not room_host_pool:
+        room_host_pool = RoomHostPool(config)
+
     def keep_running():
         try:
             with Locker("autohost"):
                 run_guardian()
+                next_prune = 0.0
                 while 1:
                     time.sleep(0.1)
+                    if time.monotonic() > next_prune:
+                        prune_seed_caches()
+                        next_prune = time.monotonic() + 24 * 60 * 60
                     with db_session:
                         rooms = select(
                             room for room in Room if
@@ -133,9 +460,8 @@ def autogen(config: dict):
     def keep_running():
         try:
             with Locker("autogen"):
-
-                with multiprocessing.Pool(config["GENERATORS"], initializer=init_db,
-                                          initargs=(config["PONY"],)) as generator_pool:
+                scheduler = GenerationScheduler(config)
+                try:
                     with db_session:
                         to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
 
@@ -146,7 +472,7 @@ def autogen(config: dict):
                                 if sid:
                                     generation.delete()
                                 else:
-                                    launch_generator(generator_pool, generation)
+                                    scheduler.add(generation)
 
                             commit()
                         select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
@@ -159,7 +485,11 @@ def autogen(config: dict):
                                 generation for generation in Generation
                                 if generation.state == STATE_QUEUED).for_update()
                             for generation in to_start:
-                                launch_generator(generator_pool, generation)
+                                scheduler.add(generation)
+                        scheduler.collect()
+                        scheduler.schedule()
+                finally:
+                    scheduler.close()
         except AlreadyRunningException:
             logging.info("Autogen reports as already running, not starting another.")
 
@@ -170,10 +500,76 @@ def autogen(config: dict):
 multiworlds: typing.Dict[type(Room.id), MultiworldInstance] = {}
 
 
+class RoomHost():
+    """A process hosting many Rooms on one event loop, see run_room_host."""
+    def __init__(self, host_id: int, config: dict, done_queue: multiprocessing.Queue):
+        self.host_id = host_id
+        self.done_queue = done_queue
+        self.process: typing.Optional[multiprocessing.Process] = None
+        self.room_queue: typing.Optional[multiprocessing.Queue] = None
+        self.rooms: typing.Dict[type(Room.id), int] = {}  # room id -> load
+        self.ponyconfig = config["PONY"]
+        self.cert = config["SELFLAUNCHCERT"]
+        self.key = config["SELFLAUNCHKEY"]
+        self.host = config["HOST_ADDRESS"]
+
+    @property
+    def load(self) -> int:
+        return sum(self.rooms.values())
+
+    def alive(self) -> bool:
+        return bool(self.process and self.process.is_alive())
+
+    def start(self):
+        logging.info(f"Spinning up room host {self.host_id}")
+        # rooms of a previous process are gone with it and get launched again, possibly on another host
+        self.rooms.clear()
+        self.room_queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(group=None, target=run_room_host,
+                                               args=(self.host_id, self.ponyconfig, get_static_server_data_path(),
+                                                     self.cert, self.key, self.host,
+                                                     self.room_queue, self.done_queue),
+                                               name=f"RoomHost{self.host_id}")
+        self.process.start()
+
+    def launch(self, room_id, load: int):
+        if not self.alive():
+            self.start()
+        self.rooms[room_id] = load
+        self.room_queue.put(room_id)
+
+
+class RoomHostPool():
+    """Spreads Rooms over HOSTERS room hosts by their load, which is the number of slots of the Rooms they host."""
+    def __init__(self, config: dict):
+        self.done_queue = multiprocessing.Queue()
+        self.hosts = [RoomHost(host_id, config, self.done_queue) for host_id in range(config["HOSTERS"])]
+
+    def launch(self, room_id, load: int) -> RoomHost:
+        host = min(self.hosts, key=lambda host: host.load if host.alive() else 0)
+        host.launch(room_id, load)
+        return host
+
+    def collect(self):
+        """Forgets the Rooms that shut down since the last call."""
+        while True:
+            try:
+                room_id = self.done_queue.get_nowait()
+            except queue.Empty:
+                return
+            for host in self.hosts:
+                host.rooms.pop(room_id, None)
+
+
+room_host_pool: typing.Optional[RoomHostPool] = None
+
+
 class MultiworldInstance():
     def __init__(self, room: Room, config: dict):
         self.room_id = room.id
         self.process: typing.Optional[multiprocessing.Process] = None
+        self.room_host: typing.Optional[RoomHost] = None
+        self.load = room.seed.slots.count() if room_host_pool else 0
         with guardian_lock:
             multiworlds[self.room_id] = self
         self.ponyconfig = config["PONY"]
@@ -184,10 +580,16 @@ class MultiworldInstance():
     def start(self):
         if self.process and self.process.is_alive():
             return False
+        if self.room_host and not self.done():
+            return False
 
+        if room_host_pool:
+            self.room_host = room_host_pool.launch(self.room_id, max(1, self.load))
+            logging.info(f"Spinning up {self.room_id} on room host {self.room_host.host_id}")
+            return
         logging.info(f"Spinning up {self.room_id}")
         process = multiprocessing.Process(group=None, target=run_server_process,
-                                          args=(self.room_id, self.ponyconfig, get_static_server_data(),
+                                          args=(self.room_id, self.ponyconfig, get_static_server_data_path(),
                                                 self.cert, self.key, self.host),
                                           name="MultiHost")
         process.start()
@@ -200,9 +602,15 @@ class MultiworldInstance():
             self.process = None
 
     def done(self):
+        if self.room_host:
+            return self.room_id not in self.room_host.rooms or not self.room_host.alive()
         return self.process and not self.process.is_alive()
 
     def collect(self):
+        if self.room_host:
+            self.room_host.rooms.pop(self.room_id, None)
+            self.room_host = None
+            return
         self.process.join()  # wait for process to finish
         self.process = None
 
@@ -231,6 +639,8 @@ def run_guardian():
                     time.sleep(1)
                     done = []
                     with guardian_lock:
+                        if room_host_pool:
+                            room_host_pool.collect()
                         for key, instance in multiworlds.items():
                             if instance.done():
                                 instance.collect()
@@ -242,5 +652,5 @@ def run_guardian():
 
 
 from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed
-from .customserver import run_server_process, get_static_server_data
-from .generate import gen_game
+from .customserver import run_room_host, run_server_process, get_static_server_data_path, prune_seed_caches
+from .generate import generate_seed, generation_timeout_error, set_generation_error
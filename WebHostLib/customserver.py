@@ -1,15 +1,26 @@
 from __future__ import annotations
 
+import array
 import asyncio
+import atexit
+import bisect
 import collections
+import collections.abc
+import contextvars
 import datetime
 import functools
+import hashlib
+import itertools
+import json
 import logging
+import mmap
+import multiprocessing
+import os
 import pickle
 import random
 import socket
+import struct
 import threading
-import time
 import typing
 
 import websockets
@@ -19,7 +30,11 @@ import Utils
 
 from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
 from Utils import get_public_ipv4, get_public_ipv6, restricted_loads, cache_argsless
-from .models import Command, GameDataPackage, Room, db
+from NetUtils import ClientStatus, encode
+from .models import Command, GameDataPackage, Room, Seed, db
+
+if typing.TYPE_CHECKING:
+    import ssl
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -52,36 +67,125 @@ class DBCommandProcessor(ServerCommandProcessor):
         logging.info(text)
 
 
+class CommandSocketProtocol(asyncio.DatagramProtocol):
+    def __init__(self, on_notify: typing.Callable[[], None]):
+        self.on_notify = on_notify
+
+    def datagram_received(self, data: bytes, addr: typing.Any) -> None:
+        self.on_notify()
+
+
 class WebHostContext(Context):
     room_id: int
-
-    def __init__(self, static_server_data: dict):
+    tracker_summary: TrackerSummary
+    tracker_events_path: str
+    tracker_events_base: int
+    """offset of the first event kept in tracker_events_path, see read_tracker_events"""
+    tracker_events_size: int
+    """offset after the last event written to tracker_events_path"""
+    tracker_events_lock: threading.Lock
+    save_lock: threading.Lock
+    """held while saving, which the auto save thread does as well"""
+    saves_closed: bool
+    """set by the exit save, after which the room may run elsewhere and must not be saved from here anymore"""
+    db_command_task: typing.Optional[asyncio.Task]
+    db_command_poll_interval: float = 60
+    """seconds between reads of the database for commands, in addition to the reads when notified of new ones"""
+
+    def __init__(self, static_server_data: StaticServerData):
         # static server data is used during _load_game_data to load required data,
         # without needing to import worlds system, which takes quite a bit of memory
         self.static_server_data = static_server_data
         super(WebHostContext, self).__init__("", 0, "", "", 1, 40, True, "enabled", "enabled", "enabled", 0, 2)
-        del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
         self.tags = ["AP", "WebHost"]
+        self.db_command_task = None
+        self.save_lock = threading.Lock()
+        self.saves_closed = False
 
     def _load_game_data(self):
-        for key, value in self.static_server_data.items():
-            setattr(self, key, value)
-        self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
-
-    def listen_to_db_commands(self):
+        static = self.static_server_data
+        # the room's embedded data packages go into the first maps, the static data is shared by all rooms of a host
+        self.gamespackage = collections.ChainMap({}, static.gamespackage)
+        self.item_name_groups = collections.ChainMap({}, static.item_name_groups)
+        self.location_name_groups = collections.ChainMap({}, static.location_name_groups)
+        self.non_hintable_names = collections.defaultdict(frozenset, static.non_hintable_names)
+
+    def _init_game_data(self):
+        static = self.static_server_data
+        embedded = self.gamespackage.maps[0]
+        self.checksums = {**static.checksums, **{game_name: game_package["checksum"] for game_name, game_package
+                                                 in embedded.items() if "checksum" in game_package}}
+        item_names: typing.Dict[int, str] = {}
+        location_names: typing.Dict[int, str] = {}
+        for game_package in embedded.values():
+            for item_name, item_id in game_package["item_name_to_id"].items():
+                item_names[item_id] = item_name
+            for location_name, location_id in game_package["location_name_to_id"].items():
+                location_names[location_id] = location_name
+        self.item_names = GameNames(item_names, static.item_names, "Unknown item (ID:{})")
+        self.location_names = GameNames(location_names, static.location_names, "Unknown location (ID:{})")
+        self.all_item_and_group_names = LazyMapping(self.gamespackage, lambda game_name: set(
+            self.gamespackage[game_name]["item_name_to_id"]) | set(self.item_name_groups[game_name]))
+        self.all_location_and_group_names = LazyMapping(self.gamespackage, lambda game_name: set(
+            self.gamespackage[game_name]["location_name_to_id"]) | set(self.location_name_groups.get(game_name, [])))
+        self.encoded_room_info = None
+        # the static data packages are stored encoded already
+        self.encoded_games = collections.ChainMap({}, LazyMapping(
+            [game_name for game_name in static.encoded_games if game_name not in embedded],
+            static.encoded_games.__getitem__))
+
+    async def listen_to_db_commands(self):
+        """Runs the commands added to this room in the database, whenever the web frontend notifies about new ones
+        through the command socket and every db_command_poll_interval seconds in case a notification got lost."""
         cmdprocessor = DBCommandProcessor(self)
+        wakeup = asyncio.Event()
+        from .autolauncher import get_command_socket_path
+        path = get_command_socket_path(self.room_id)
+        transport = None
+        bound: typing.Optional[typing.Tuple[int, int]] = None
+        if path:
+            try:  # left behind by a previous process, the room is locked to this one
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            try:
+                transport, _ = await self.main_loop.create_datagram_endpoint(
+                    functools.partial(CommandSocketProtocol, wakeup.set), local_addr=path, family=socket.AF_UNIX)
+                stat = os.stat(path)
+                bound = stat.st_dev, stat.st_ino
+            except OSError:
+                logging.exception("Could not open command socket, only polling the database for commands.")
+        try:
+            while not self.exit_event.is_set():
+                wakeup.clear()
+                for commandtext in await self.main_loop.run_in_executor(None, self.pop_db_commands):
+                    cmdprocessor(commandtext)
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.db_command_poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if transport:
+                transport.close()
+            if bound:
+                # a process hosting the room after this one may have bound its own socket to the path already
+                try:
+                    stat = os.stat(path)
+                    if (stat.st_dev, stat.st_ino) == bound:
+                        os.unlink(path)
+                except FileNotFoundError:
+                    pass
 
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            time.sleep(5)
+    @db_session
+    def pop_db_commands(self) -> typing.List[str]:
+        commands = select(command for command in Command if command.room.id == self.room_id).order_by(Command.id)
+        commandtexts = [command.commandtext for command in commands]
+        if commandtexts:
+            commands.delete()
+            commit()
+        return commandtexts
 
     @db_session
     def load(self, room_id: int):
@@ -92,12 +196,12 @@ class WebHostContext(Context):
         else:
             self.port = get_random_port()
 
-        multidata = self.decompress(room.seed.multidata)
+        multidata = self.load_multidata(room.seed)
         game_data_packages = {}
         for game in list(multidata.get("datapackage", {})):
             game_data = multidata["datapackage"][game]
             if "checksum" in game_data:
-                if self.gamespackage.get(game, {}).get("checksum") == game_data["checksum"]:
+                if self.static_server_data.checksums.get(game) == game_data["checksum"]:
                     # non-custom. remove from multidata
                     # games package could be dropped from static data once all rooms embed data package
                     del multidata["datapackage"][game]
@@ -108,35 +212,540 @@ class WebHostContext(Context):
 
         return self._load(multidata, game_data_packages, True)
 
+    def load_multidata(self, seed: Seed) -> dict:
+        """Loads the multidata of seed from its seed cache, which is created from the database on the first load."""
+        path = get_seed_cache_path(seed.id)
+        try:
+            with open(path, "rb") as f:
+                multidata = load_seed_cache(f.read())
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logging.exception(f"Could not read seed cache {path}, creating it again.")
+        else:
+            os.utime(path)  # still in use, see prune_seed_caches
+            return multidata
+
+        multidata = self.decompress(seed.multidata)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(dump_seed_cache(multidata))
+        os.replace(temp_path, path)
+        return multidata
+
+    def _load(self, decoded_obj: dict, game_data_packages: typing.Dict[str, typing.Any],
+              use_embedded_server_options: bool):
+        super(WebHostContext, self)._load(decoded_obj, game_data_packages, use_embedded_server_options)
+        self.tracker_summary = TrackerSummary(
+            self.locations, self.groups, TrackerSummary.get_location_areas(decoded_obj.get("checks_in_area", {})),
+            decoded_obj["precollected_items"], [team_slot for team_slot in self.player_names
+                                                if team_slot[1] not in self.groups])
+
     @db_session
     def init_save(self, enabled: bool = True):
         self.saving = enabled
+        events_offset = 0
         if self.saving:
             savegame_data = Room.get(id=self.room_id).multisave
             if savegame_data:
-                self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
+                savegame = restricted_loads(savegame_data)
+                self.set_save(savegame)
+                for (team, slot), locations in self.location_checks.items():
+                    self.tracker_summary.count_checks(team, slot, locations)
+                events_offset = savegame.get("tracker", {}).get("events_offset", 0)
+        self.open_tracker_events(events_offset)
+        if self.saving:
+            # spinning up the room updated its last_activity, which makes the previous tracker save look outdated
+            self.write_tracker_save(self.get_save())
             self._start_async_saving()
-        threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
+        self.db_command_task = asyncio.create_task(self.listen_to_db_commands())
 
-    @db_session
     def _save(self, exit_save: bool = False) -> bool:
+        with self.save_lock:
+            # the auto save thread of a room hosted in a room host may only notice that the room stopped after it did
+            if self.saves_closed:
+                return False
+            save = self.get_save()
+            self._save_room(pickle.dumps(save), exit_save)
+            # committed, so the events before the save are not needed anymore
+            self.rotate_tracker_events(save["tracker"]["events_offset"])
+            self.write_tracker_save(save)
+            if exit_save:
+                self.saves_closed = True
+            return True
+
+    def write_tracker_save(self, save: dict):
+        """Writes the parts of save the trackers read to the tracker save of this room, see load_tracker_save."""
+        path = get_tracker_save_path(self.room_id)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(dump_tracker_save(save))
+            os.replace(temp_path, path)
+        except OSError:  # trackers read the multisave instead
+            logging.exception("Could not write tracker save.")
+
+    @db_session
+    def _save_room(self, multisave: bytes, exit_save: bool):
         room = Room.get(id=self.room_id)
-        room.multisave = pickle.dumps(self.get_save())
+        room.multisave = multisave
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = datetime.datetime.utcnow()
-        return True
 
     def get_save(self) -> dict:
+        # events written while saving may be in the save as well, applying them is idempotent
+        events_offset = self.tracker_events_size
         d = super(WebHostContext, self).get_save()
         d["video"] = [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()]
+        d["tracker"] = self.tracker_summary.dump(d["client_activity_timers"])
+        d["tracker"]["events_offset"] = events_offset
         return d
 
+    def open_tracker_events(self, events_offset: int):
+        """Continues the tracker events of this room, or starts them at events_offset of its save if there are none."""
+        self.tracker_events_path = get_tracker_events_path(self.room_id)
+        self.tracker_events_lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.tracker_events_path), exist_ok=True)
+        try:
+            with open(self.tracker_events_path, "rb") as f:
+                self.tracker_events_base, header_size = read_tracker_events_header(f)
+                self.tracker_events_size = self.tracker_events_base + os.fstat(f.fileno()).st_size - header_size
+        except FileNotFoundError:
+            self.tracker_events_base = self.tracker_events_size = events_offset
+            self._replace_tracker_events(events_offset, b"")
+
+    def _replace_tracker_events(self, base: int, events: bytes):
+        temp_path = f"{self.tracker_events_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(tracker_events_header % base)
+            f.write(events)
+        os.replace(temp_path, self.tracker_events_path)
+
+    def rotate_tracker_events(self, offset: int):
+        """Drops the tracker events before offset, which a committed save covers."""
+        with self.tracker_events_lock:
+            if offset <= self.tracker_events_base:
+                return
+            try:
+                with open(self.tracker_events_path, "rb") as f:
+                    base, header_size = read_tracker_events_header(f)
+                    f.seek(offset - base + header_size)
+                    events = f.read()
+                self._replace_tracker_events(offset, events)
+            except OSError:  # still open on windows, try again on the next save
+                logging.debug("Could not rotate tracker events.", exc_info=True)
+            else:
+                self.tracker_events_base = offset
+
+    def write_tracker_event(self, event: typing.Dict[str, typing.Any]):
+        """Appends event to the tracker events of this room, which the tracker API reads."""
+        event["time"] = datetime.datetime.now(datetime.timezone.utc).timestamp()
+        line = json.dumps(event, separators=(",", ":")).encode() + b"\n"
+        with self.tracker_events_lock:
+            try:
+                with open(self.tracker_events_path, "ab") as f:
+                    f.write(line)
+            except OSError:
+                logging.exception("Could not write tracker event.")
+            else:
+                self.tracker_events_size += len(line)
+
+    def on_new_location_checks(self, team: int, slot: int, locations: typing.Set[int]):
+        self.tracker_summary.count_checks(team, slot, locations)
+        self.write_tracker_event({"type": "check", "team": team, "slot": slot, "locations": sorted(locations)})
+
+    def on_client_status_change(self, team: int, slot: int, status: ClientStatus):
+        self.write_tracker_event({"type": "status", "team": team, "slot": slot, "status": int(status)})
+
+    def on_new_hint(self, team: int, slot: int):
+        super(WebHostContext, self).on_new_hint(team, slot)
+        self.write_tracker_event({"type": "hint", "team": team, "slot": slot,
+                                  "hints": [hint._asdict() for hint in self.hints[team, slot]]})
+
+
+seed_cache_magic = b"APSeedCache2"
+seed_cache_max_age = datetime.timedelta(days=7)
+
+
+def get_seed_cache_path(seed_id) -> str:
+    return Utils.cache_path("webhost", "seeds", f"{seed_id}.bin")
+
+
+def dump_seed_cache(multidata: dict) -> bytes:
+    """Serializes decompressed multidata for load_seed_cache as a plain pickle, with the slot_data of every slot
+    pickled on its own."""
+    data = {key: value for key, value in multidata.items() if key != "slot_data"}
+    slot_data = {slot: pickle.dumps(data, pickle.HIGHEST_PROTOCOL) for slot, data in multidata["slot_data"].items()}
+    return seed_cache_magic + pickle.dumps((data, slot_data), pickle.HIGHEST_PROTOCOL)
+
+
+def load_seed_cache(dump: bytes) -> dict:
+    """Returns the multidata of a seed cache, the slot_data of each slot is only unpickled on first access."""
+    if not dump.startswith(seed_cache_magic):
+        raise ValueError("Not a seed cache of this version.")
+    # the seed cache is written from restricted_loads multidata, so it is read with the same restrictions
+    multidata, slot_data = restricted_loads(memoryview(dump)[len(seed_cache_magic):])
+    multidata["slot_data"] = LazyMapping(slot_data, lambda slot: restricted_loads(slot_data.pop(slot)))
+    return multidata
+
+
+tracker_save_magic = b"APTrackerSave1"
+tracker_save_keys = ("version", "hints", "name_aliases", "client_game_state", "client_activity_timers", "video",
+                     "tracker")
+tracker_save_slot_keys = ("location_checks", "received_items")
+"""multisave entries of a tracker save that are kept per slot, see dump_tracker_save"""
+
+
+def get_tracker_save_path(room_id) -> str:
+    return Utils.cache_path("webhost", "tracker_saves", f"{room_id}.bin")
+
+
+def dump_tracker_save(save: dict) -> bytes:
+    """Serializes the parts of a multisave the trackers read for load_tracker_save, with the entries of every slot in
+    tracker_save_slot_keys pickled on their own."""
+    data = {key: save[key] for key in tracker_save_keys if key in save}
+    slots = {key: {slot: pickle.dumps(value, pickle.HIGHEST_PROTOCOL) for slot, value in save.get(key, {}).items()}
+             for key in tracker_save_slot_keys}
+    return tracker_save_magic + pickle.dumps((data, slots), pickle.HIGHEST_PROTOCOL)
+
+
+def load_tracker_save(dump: bytes) -> dict:
+    """Returns the multisave of a tracker save, without what only the room server uses. The entries of each slot
+    are only unpickled on first access, so a tracker of one player doesn't load those of everyone."""
+    if not dump.startswith(tracker_save_magic):
+        raise ValueError("Not a tracker save of this version.")
+    # read by the web frontend instead of the multisave, so not allowed to load anything the multisave may not
+    data, slots = restricted_loads(memoryview(dump)[len(tracker_save_magic):])
+    for key, values in slots.items():
+        data[key] = LazyMapping(values, lambda slot, values=values: restricted_loads(values.pop(slot)))
+    return data
+
+
+def get_tracker_events_path(room_id) -> str:
+    return Utils.cache_path("webhost", "tracker_events", f"{room_id}.jsonl")
+
+
+tracker_events_header = b'{"base":%d}\n'
+"""first line of a tracker events file, with the offset of the first event in it"""
+
+
+def read_tracker_events_header(f: typing.BinaryIO) -> typing.Tuple[int, int]:
+    """Returns the offset of the first event in an open tracker events file and the size of its header."""
+    header = f.readline()
+    if header.startswith(b'{"base":'):
+        return json.loads(header)["base"], len(header)
+    f.seek(0)  # written before events were rotated
+    return 0, 0
+
+
+def read_tracker_events(path: str, offset: int, max_events: typing.Optional[int] = None) \
+        -> typing.Tuple[typing.Optional[typing.List[typing.Dict[str, typing.Any]]], int]:
+    """Returns up to max_events tracker events written to path from offset on and the offset after them.
+    Offsets count the bytes of all events of a room, including those its server dropped after saving them, so they
+    stay valid for the life of the room. An offset within an event continues with the next one.
+    Returns None instead of the events, together with the offset of the first event kept, if offset is before it
+    or past the last event, because the file was rotated or pruned and written anew in the meantime."""
+    try:
+        with open(path, "rb") as f:
+            base, header_size = read_tracker_events_header(f)
+            size = os.fstat(f.fileno()).st_size
+            if not base <= offset <= base + size - header_size:
+                return None, base
+            start = offset - base + header_size
+            if start > header_size:
+                f.seek(start - 1)
+                if f.read(1) != b"\n":
+                    rest_of_event = f.readline()
+                    if not rest_of_event.endswith(b"\n"):
+                        return [], offset
+                    start += len(rest_of_event)
+            f.seek(start)
+            data = f.read(size - start)
+    except FileNotFoundError:
+        return [], offset
+    events = []
+    end = 0
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n") or len(events) == max_events:
+            break  # a line may still be getting written
+        events.append(json.loads(line))
+        end += len(line)
+    return events, base + start - header_size + end
+
+
+def get_tracker_events_end(path: str) -> int:
+    """Returns the offset after the last tracker event written to path."""
+    try:
+        with open(path, "rb") as f:
+            base, header_size = read_tracker_events_header(f)
+            return base + os.fstat(f.fileno()).st_size - header_size
+    except FileNotFoundError:
+        return 0
+
+
+def prune_seed_caches():
+    """Deletes the seed caches of rooms that have not been loaded for seed_cache_max_age
+    and the tracker events and saves of rooms without events or saves for as long."""
+    oldest = (datetime.datetime.now() - seed_cache_max_age).timestamp()
+    for folder in (os.path.dirname(get_seed_cache_path("")), os.path.dirname(get_tracker_events_path("")),
+                   os.path.dirname(get_tracker_save_path(""))):
+        if not os.path.isdir(folder):
+            continue
+        for file in os.scandir(folder):
+            try:
+                if file.stat().st_mtime < oldest:
+                    os.unlink(file.path)
+            except OSError:  # removed by someone else or still open on windows
+                pass
+
+
+class TrackerSummary:
+    """Tracker data aggregated from the location checks of a room: the items received by each team and slot,
+    starting items included, and the checks they did per area. The room server updates it as checks arrive and saves
+    it with the multisave, so the trackers do not have to go through all checks of the room on every view."""
+    version = 1
+    default_area = "Light World"
+    """area of all locations missing from location_areas, which is where checks_in_area puts every non-LttP one"""
+
+    def __init__(self, locations: typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]],
+                 groups: typing.Dict[int, typing.Iterable[int]],
+                 location_areas: typing.Dict[int, typing.Dict[int, str]],
+                 precollected_items: typing.Dict[int, typing.Iterable[int]],
+                 slots: typing.Iterable[typing.Tuple[int, int]]):
+        self.locations = locations
+        self.groups = groups
+        self.location_areas = location_areas
+        self.inventory: typing.Dict[typing.Tuple[int, int], typing.Counter[int]] = \
+            {(team, slot): collections.Counter(precollected_items.get(slot, ())) for team, slot in slots}
+        self.checks_done: typing.Dict[typing.Tuple[int, int], typing.Counter[str]] = \
+            {team_slot: collections.Counter() for team_slot in self.inventory}
+
+    @staticmethod
+    def get_location_areas(checks_in_area: typing.Dict[int, typing.Dict[str, typing.Any]]) \
+            -> typing.Dict[int, typing.Dict[int, str]]:
+        """Location -> area of each slot from the checks_in_area of a multidata, leaving out the default area."""
+        location_areas = {}
+        for slot, areas in checks_in_area.items():
+            slot_areas = {location: area for area, area_locations in areas.items()
+                          if area not in ("Total", TrackerSummary.default_area) for location in area_locations}
+            if slot_areas:
+                location_areas[slot] = slot_areas
+        return location_areas
+
+    def count_checks(self, team: int, slot: int, locations: typing.Iterable[int]):
+        """Adds newly checked locations of team, slot."""
+        checks_done = self.checks_done.get((team, slot), None)
+        if checks_done is None:  # groups have no locations
+            return
+        slot_locations = self.locations[slot]
+        areas = self.location_areas.get(slot, {})
+        for location in locations:
+            if location not in slot_locations:
+                continue
+            item, recipient, flags = slot_locations[location]
+            for recipient in self.groups.get(recipient, (recipient,)):
+                self.inventory[team, recipient][item] += 1
+            checks_done[areas.get(location, self.default_area)] += 1
+            checks_done["Total"] += 1
+
+    def dump(self, activity_timers: typing.Iterable[typing.Tuple[typing.Tuple[int, int], float]]) \
+            -> typing.Dict[str, typing.Any]:
+        """Returns the summary as builtins, along with the timestamp of the last activity of each team, slot."""
+        return {
+            "version": self.version,
+            "inventory": {team_slot: dict(items) for team_slot, items in list(self.inventory.items())},
+            "checks_done": {team_slot: dict(areas) for team_slot, areas in list(self.checks_done.items())},
+            "activity": dict(activity_timers),
+        }
+
 
 def get_random_port():
     return random.randint(49152, 65535)
 
 
+class LazyMapping(collections.abc.Mapping):
+    """Read-only mapping over known keys that creates each value on first access."""
+    def __init__(self, keys: typing.Iterable[typing.Any], factory: typing.Callable[[typing.Any], typing.Any]):
+        self._keys = dict.fromkeys(keys)
+        self._factory = factory
+        self._values: typing.Dict[typing.Any, typing.Any] = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            if key not in self._keys:
+                raise
+            value = self._values[key] = self._factory(key)
+            return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class NameTable(collections.abc.Mapping):
+    """Read-only id -> name mapping over sorted ids and the end offsets of their utf-8 names, as mapped from a file."""
+    def __init__(self, ids: memoryview, name_ends: memoryview, names: memoryview):
+        self.ids = ids
+        self.name_ends = name_ends
+        self.names = names
+
+    def _index(self, code: int) -> int:
+        index = bisect.bisect_left(self.ids, code)
+        if index < len(self.ids) and self.ids[index] == code:
+            return index
+        return -1
+
+    def __getitem__(self, code: int) -> str:
+        index = self._index(code) if type(code) is int else -1
+        if index < 0:
+            raise KeyError(code)
+        start = self.name_ends[index - 1] if index else 0
+        return str(self.names[start:self.name_ends[index]], "utf-8")
+
+    def __contains__(self, code) -> bool:
+        return type(code) is int and self._index(code) >= 0
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class GameNames(collections.abc.Mapping):
+    """id -> name of the room's own data packages first, then of the static server data.
+    Unknown ids get a placeholder name, but are not contained."""
+    def __init__(self, names: typing.Dict[int, str], static_names: NameTable, unknown: str):
+        self.names = names
+        self.static_names = static_names
+        self.unknown = unknown
+
+    def __getitem__(self, code: int) -> str:
+        name = self.names.get(code, None)
+        if name is None:
+            try:
+                return self.static_names[code]
+            except KeyError:
+                return self.unknown.format(code)
+        return name
+
+    def __contains__(self, code) -> bool:
+        return code in self.names or code in self.static_names
+
+    def __iter__(self):
+        return iter(set(self.names) | set(self.static_names))
+
+    def __len__(self) -> int:
+        return len(set(self.names) | set(self.static_names))
+
+
+class StaticServerData:
+    """
+    The static server data of get_static_server_data, written once into a file by get_static_server_data_path and
+    memory mapped read-only by every room process. The page cache is shared between processes and rooms only read the
+    games they host: data packages are stored as the JSON the server sends and the groups as pickles per game,
+    all id -> name lookups are binary searches in the mapped file.
+    """
+    magic = b"APStaticServerData1"
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if view[:len(self.magic)] != self.magic:
+            raise ValueError(f"{path} is not a static server data file.")
+        header_offset, = struct.unpack_from("!Q", self._mmap, len(self.magic))
+        header = pickle.loads(view[header_offset:])
+        self._sections: typing.Dict[typing.Tuple[str, ...], typing.Tuple[int, int]] = header["sections"]
+        self.checksums: typing.Dict[str, str] = header["checksums"]
+        self.non_hintable_names: typing.Dict[str, typing.FrozenSet[str]] = {
+            game: frozenset(names) for game, names in header["non_hintable_names"].items()}
+        games = header["games"]
+        self.encoded_games = LazyMapping(games, lambda game: str(self._section("package", game), "utf-8"))
+        """game -> the game's part of an encoded DataPackage, '"game":{...}'"""
+        self.gamespackage = LazyMapping(games, lambda game: json.loads(f"{{{self.encoded_games[game]}}}")[game])
+        self.item_name_groups = LazyMapping(games, functools.partial(self._groups, "item_name_groups"))
+        self.location_name_groups = LazyMapping(games, functools.partial(self._groups, "location_name_groups"))
+        self.item_names = NameTable(*self._name_table("item"))
+        self.location_names = NameTable(*self._name_table("location"))
+
+    def _section(self, *key: str) -> memoryview:
+        offset, size = self._sections[key]
+        return memoryview(self._mmap)[offset:offset + size]
+
+    def _groups(self, kind: str, game: str) -> typing.Dict[str, typing.Set[str]]:
+        return {name: set(names) for name, names in pickle.loads(self._section(kind, game)).items()}
+
+    def _name_table(self, kind: str) -> typing.Tuple[memoryview, memoryview, memoryview]:
+        return self._section(kind, "ids").cast("q"), self._section(kind, "name_ends").cast("q"), \
+            self._section(kind, "names")
+
+
+def dump_static_server_data(data: dict) -> bytes:
+    """Serializes data as returned by get_static_server_data into the format StaticServerData maps.
+    The result only depends on the content, sets are stored sorted."""
+    sections: typing.List[typing.Tuple[typing.Tuple[str, ...], bytes]] = []
+    for game, package in data["gamespackage"].items():
+        sections.append((("package", game), encode({game: package})[1:-1].encode("utf-8")))
+        for kind in ("item_name_groups", "location_name_groups"):
+            groups = data[kind].get(game, {})
+            sections.append(((kind, game), pickle.dumps({name: sorted(groups[name]) for name in sorted(groups)})))
+    for kind in ("item", "location"):
+        names: typing.Dict[int, str] = {}
+        for package in data["gamespackage"].values():
+            for name, code in package[f"{kind}_name_to_id"].items():
+                names[code] = name
+        ids = array.array("q", sorted(names))
+        encoded_names = [names[code].encode("utf-8") for code in ids]
+        name_ends = array.array("q", itertools.accumulate(map(len, encoded_names)))
+        sections += [((kind, "ids"), ids.tobytes()), ((kind, "name_ends"), name_ends.tobytes()),
+                     ((kind, "names"), b"".join(encoded_names))]
+
+    header = {
+        "games": list(data["gamespackage"]),
+        "checksums": {game: package["checksum"] for game, package in data["gamespackage"].items()
+                      if "checksum" in package},
+        "non_hintable_names": {game: sorted(names) for game, names in data["non_hintable_names"].items()},
+        "sections": {},
+    }
+    parts = [StaticServerData.magic, bytes(8)]
+    offset = len(StaticServerData.magic) + 8
+    for key, section in sections:
+        padding = -offset % 8  # keep the arrays aligned
+        header["sections"][key] = offset + padding, len(section)
+        parts += [bytes(padding), section]
+        offset += padding + len(section)
+    # the header follows the sections, as it holds their offsets
+    parts[1] = struct.pack("!Q", offset)
+    parts.append(pickle.dumps(header))
+    return b"".join(parts)
+
+
+@cache_argsless
+def get_static_server_data_path() -> str:
+    """Writes the static server data of this installation once, named by its content so that a file still mapped by
+    running rooms is never replaced."""
+    dump = dump_static_server_data(get_static_server_data())
+    path = Utils.cache_path("webhost", f"static_server_data_{hashlib.sha1(dump).hexdigest()[:16]}.bin")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(dump)
+        os.replace(temp_path, path)
+    return path
+
+
 @cache_argsless
 def get_static_server_data() -> dict:
     import worlds
@@ -155,48 +764,63 @@ def get_static_server_data() -> dict:
     return data
 
 
-def run_server_process(room_id, ponyconfig: dict, static_server_data: dict,
+async def start_room(ctx: WebHostContext, room_id, ssl_context: typing.Optional["ssl.SSLContext"], host: str):
+    """Loads the room into ctx and starts serving it, returns once its shutdown_task is running."""
+    ctx.load(room_id)
+    ctx.init_save()
+    try:
+        ctx.server = websockets.serve(functools.partial(server, ctx=ctx), ctx.host, ctx.port, ping_timeout=None,
+                                      ping_interval=None, ssl=ssl_context)
+
+        await ctx.server
+    except Exception:  # likely port in use - in windows this is OSError, but I didn't check the others
+        ctx.server = websockets.serve(functools.partial(server, ctx=ctx), ctx.host, 0, ping_timeout=None,
+                                      ping_interval=None, ssl=ssl_context)
+
+        await ctx.server
+    port = 0
+    for wssocket in ctx.server.ws_server.sockets:
+        socketname = wssocket.getsockname()
+        if wssocket.family == socket.AF_INET6:
+            # Prefer IPv4, as most users seem to not have working ipv6 support
+            if not port:
+                port = socketname[1]
+        elif wssocket.family == socket.AF_INET:
+            port = socketname[1]
+    if port:
+        logging.info(f'Hosting game at {host}:{port}')
+        with db_session:
+            room = Room.get(id=ctx.room_id)
+            room.last_port = port
+    else:
+        logging.exception("Could not determine port. Likely hosting failure.")
+    with db_session:
+        ctx.auto_shutdown = Room.get(id=room_id).timeout
+    ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, []))
+
+
+def stop_room(room_id, errored: bool):
+    with db_session:
+        room = Room.get(id=room_id)
+        if errored:
+            room.last_port = -1
+        # ensure the Room does not spin up again on its own, minute of safety buffer
+        room.last_activity = datetime.datetime.utcnow() - datetime.timedelta(minutes=1, seconds=room.timeout)
+
+
+def run_server_process(room_id, ponyconfig: dict, static_server_data_path: str,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
                        host: str):
     # establish DB connection for multidata and multisave
     db.bind(**ponyconfig)
     db.generate_mapping(check_tables=False)
+    static_server_data = StaticServerData(static_server_data_path)
 
     async def main():
         Utils.init_logging(str(room_id), write_mode="a")
-        ctx = WebHostContext(static_server_data)
-        ctx.load(room_id)
-        ctx.init_save()
         ssl_context = load_server_cert(cert_file, cert_key_file) if cert_file else None
-        try:
-            ctx.server = websockets.serve(functools.partial(server, ctx=ctx), ctx.host, ctx.port, ping_timeout=None,
-                                          ping_interval=None, ssl=ssl_context)
-
-            await ctx.server
-        except Exception:  # likely port in use - in windows this is OSError, but I didn't check the others
-            ctx.server = websockets.serve(functools.partial(server, ctx=ctx), ctx.host, 0, ping_timeout=None,
-                                          ping_interval=None, ssl=ssl_context)
-
-            await ctx.server
-        port = 0
-        for wssocket in ctx.server.ws_server.sockets:
-            socketname = wssocket.getsockname()
-            if wssocket.family == socket.AF_INET6:
-                # Prefer IPv4, as most users seem to not have working ipv6 support
-                if not port:
-                    port = socketname[1]
-            elif wssocket.family == socket.AF_INET:
-                port = socketname[1]
-        if port:
-            logging.info(f'Hosting game at {host}:{port}')
-            with db_session:
-                room = Room.get(id=ctx.room_id)
-                room.last_port = port
-        else:
-            logging.exception("Could not determine port. Likely hosting failure.")
-        with db_session:
-            ctx.auto_shutdown = Room.get(id=room_id).timeout
-        ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, []))
+        ctx = WebHostContext(static_server_data)
+        await start_room(ctx, room_id, ssl_context, host)
         await ctx.shutdown_task
         logging.info("Shutting down")
 
@@ -205,14 +829,113 @@ def run_server_process(room_id, ponyconfig: dict, static_server_data: dict,
         try:
             asyncio.run(main())
         except KeyboardInterrupt:
-            with db_session:
-                room = Room.get(id=room_id)
-                # ensure the Room does not spin up again on its own, minute of safety buffer
-                room.last_activity = datetime.datetime.utcnow() - datetime.timedelta(minutes=1, seconds=room.timeout)
+            stop_room(room_id, False)
         except:
-            with db_session:
-                room = Room.get(id=room_id)
-                room.last_port = -1
-                # ensure the Room does not spin up again on its own, minute of safety buffer
-                room.last_activity = datetime.datetime.utcnow() - datetime.timedelta(minutes=1, seconds=room.timeout)
+            stop_room(room_id, True)
             raise
+
+
+current_room: contextvars.ContextVar = contextvars.ContextVar("current_room", default=None)
+"""id of the room the running task belongs to, in a room host process"""
+
+
+class RoomLogHandler(logging.Handler):
+    """Writes records into the log of the room they are logged for, as each room of a host has its own log."""
+    files: typing.Dict[typing.Any, logging.FileHandler]
+
+    def __init__(self, log_format: str):
+        super().__init__()
+        self.files = {}
+        self.formatter = logging.Formatter(log_format)
+
+    def open(self, room_id):
+        file_handler = logging.FileHandler(os.path.join(Utils.user_path("logs"), f"{room_id}.txt"), "a",
+                                           encoding="utf-8-sig")
+        file_handler.setFormatter(self.formatter)
+        self.files[room_id] = file_handler
+
+    def close_room(self, room_id):
+        self.files.pop(room_id).close()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        file_handler = self.files.get(current_room.get(), None)
+        if file_handler:
+            file_handler.emit(record)
+
+
+def run_room_host(host_id: int, ponyconfig: dict, static_server_data_path: str,
+                  cert_file: typing.Optional[str], cert_key_file: typing.Optional[str], host: str,
+                  room_queue: multiprocessing.Queue, done_queue: multiprocessing.Queue):
+    """Hosts many rooms in one process and event loop, all sharing the same static server data.
+    Starts the room of each id put into room_queue, None stops the host, and puts the id into done_queue again
+    once that room shut down."""
+    db.bind(**ponyconfig)
+    db.generate_mapping(check_tables=False)
+    log_format = "[%(name)s at %(asctime)s]: %(message)s"
+    Utils.init_logging(f"RoomHost{host_id}", write_mode="a", log_format=log_format)
+    room_log = RoomLogHandler(log_format)
+    logging.getLogger().addHandler(room_log)
+    static_server_data = StaticServerData(static_server_data_path)
+    from .autolauncher import AlreadyRunningException, Locker
+
+    async def run_room(room_id, ssl_context: typing.Optional["ssl.SSLContext"]):
+        current_room.set(room_id)
+        room_log.open(room_id)
+        try:
+            with Locker(room_id):
+                ctx = WebHostContext(static_server_data)
+                try:
+                    await start_room(ctx, room_id, ssl_context, host)
+                    try:
+                        await ctx.shutdown_task
+                    except asyncio.CancelledError:
+                        if not ctx.exit_event.is_set():  # the host is stopping, not the room
+                            raise
+                    logging.info("Shutting down")
+                except asyncio.CancelledError:
+                    stop_room(room_id, False)
+                    raise
+                except Exception:
+                    logging.exception(f"Room {room_id} failed.")
+                    stop_room(room_id, True)
+                finally:
+                    if not ctx.exit_event.is_set():
+                        ctx.exit_event.set()
+                        if ctx.server:
+                            ctx.server.ws_server.close()
+                    if ctx.shutdown_task:
+                        ctx.shutdown_task.cancel()
+                    if ctx.db_command_task:
+                        ctx.db_command_task.cancel()
+                    if ctx.saving:
+                        # the host keeps running, so save now instead of at exit and let go of the room
+                        atexit.unregister(ctx._save)
+                        ctx.save_dirty = False
+                        ctx._save(True)
+        except AlreadyRunningException:
+            logging.info(f"Room {room_id} is already running elsewhere.")
+        finally:
+            room_log.close_room(room_id)
+            done_queue.put(room_id)
+
+    async def main():
+        ssl_context = load_server_cert(cert_file, cert_key_file) if cert_file else None
+        loop = asyncio.get_running_loop()
+        rooms: typing.Dict[typing.Any, asyncio.Task] = {}
+
+        def start(room_id):
+            if room_id not in rooms:
+                task = asyncio.create_task(run_room(room_id, ssl_context), name=f"Room {room_id}")
+                rooms[room_id] = task
+                task.add_done_callback(lambda _: rooms.pop(room_id))
+
+        while True:
+            room_id = await loop.run_in_executor(None, room_queue.get)
+            if room_id is None:
+                break
+            start(room_id)
+        for task in list(rooms.values()):
+            task.cancel()
+        await asyncio.gather(*rooms.values(), return_exceptions=True)
+
+    asyncio.run(main())
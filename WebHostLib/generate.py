@@ -92,80 +92,82 @@ def generate(race=False):
     return render_template("generate.html", race=race, version=__version__)
 
 
-def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=None, sid=None):
+def generate_seed(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=None, sid=None):
+    """Generates a multiworld from rolled options and uploads it, returning the id of the new Seed."""
     if not meta:
         meta: Dict[str, Any] = {}
 
     meta.setdefault("server_options", {}).setdefault("hint_cost", 10)
     race = meta.setdefault("race", False)
 
-    def task():
-        target = tempfile.TemporaryDirectory()
-        playercount = len(gen_options)
-        seed = get_seed()
+    target = tempfile.TemporaryDirectory()
+    playercount = len(gen_options)
+    seed = get_seed()
+
+    if race:
+        random.seed()  # use time-based random source
+    else:
+        random.seed(seed)
+
+    seedname = "W" + (f"{random.randint(0, pow(10, seeddigits) - 1)}".zfill(seeddigits))
+
+    erargs = parse_arguments(['--multi', str(playercount)])
+    erargs.seed = seed
+    erargs.name = {x: "" for x in range(1, playercount + 1)}  # only so it can be overwritten in mystery
+    erargs.spoiler = 0 if race else 3
+    erargs.race = race
+    erargs.outputname = seedname
+    erargs.outputpath = target.name
+    erargs.teams = 1
+    erargs.plando_options = PlandoOptions.from_set(meta.setdefault("plando_options",
+                                                                    {"bosses", "items", "connections", "texts"}))
+
+    name_counter = Counter()
+    for player, (playerfile, settings) in enumerate(gen_options.items(), 1):
+        for k, v in settings.items():
+            if v is not None:
+                if hasattr(erargs, k):
+                    getattr(erargs, k)[player] = v
+                else:
+                    setattr(erargs, k, {player: v})
+
+        if not erargs.name[player]:
+            erargs.name[player] = os.path.splitext(os.path.split(playerfile)[-1])[0]
+        erargs.name[player] = handle_name(erargs.name[player], player, name_counter)
+    if len(set(erargs.name.values())) != len(erargs.name):
+        raise Exception(f"Names have to be unique. Names: {Counter(erargs.name.values())}")
+    ERmain(erargs, seed, baked_server_options=meta["server_options"])
 
-        if race:
-            random.seed()  # use time-based random source
-        else:
-            random.seed(seed)
-
-        seedname = "W" + (f"{random.randint(0, pow(10, seeddigits) - 1)}".zfill(seeddigits))
-
-        erargs = parse_arguments(['--multi', str(playercount)])
-        erargs.seed = seed
-        erargs.name = {x: "" for x in range(1, playercount + 1)}  # only so it can be overwritten in mystery
-        erargs.spoiler = 0 if race else 3
-        erargs.race = race
-        erargs.outputname = seedname
-        erargs.outputpath = target.name
-        erargs.teams = 1
-        erargs.plando_options = PlandoOptions.from_set(meta.setdefault("plando_options",
-                                                                        {"bosses", "items", "connections", "texts"}))
-
-        name_counter = Counter()
-        for player, (playerfile, settings) in enumerate(gen_options.items(), 1):
-            for k, v in settings.items():
-                if v is not None:
-                    if hasattr(erargs, k):
-                        getattr(erargs, k)[player] = v
-                    else:
-                        setattr(erargs, k, {player: v})
-
-            if not erargs.name[player]:
-                erargs.name[player] = os.path.splitext(os.path.split(playerfile)[-1])[0]
-            erargs.name[player] = handle_name(erargs.name[player], player, name_counter)
-        if len(set(erargs.name.values())) != len(erargs.name):
-            raise Exception(f"Names have to be unique. Names: {Counter(erargs.name.values())}")
-        ERmain(erargs, seed, baked_server_options=meta["server_options"])
-
-        return upload_to_db(target.name, sid, owner, race)
+    return upload_to_db(target.name, sid, owner, race)
+
+
+def set_generation_error(sid, error: str):
+    if sid:
+        with db_session:
+            gen = Generation.get(id=sid)
+            if gen is not None:
+                gen.state = STATE_ERROR
+                meta = json.loads(gen.meta)
+                meta["error"] = error
+                gen.meta = json.dumps(meta)
+                commit()
+
+
+generation_timeout_error = "Allowed time for Generation exceeded, please consider generating locally instead."
+
+
+def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=None, sid=None):
+    """Runs generate_seed, giving up on it after JOB_TIME. Generations scheduled by autogen run generate_seed
+    in a process of their own instead, which is terminated once it runs for too long."""
     thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-    thread = thread_pool.submit(task)
+    thread = thread_pool.submit(generate_seed, gen_options, meta, owner, sid)
 
     try:
         return thread.result(app.config["JOB_TIME"])
     except concurrent.futures.TimeoutError as e:
-        if sid:
-            with db_session:
-                gen = Generation.get(id=sid)
-                if gen is not None:
-                    gen.state = STATE_ERROR
-                    meta = json.loads(gen.meta)
-                    meta["error"] = (
-                            "Allowed time for Generation exceeded, please consider generating locally instead. " +
-                            e.__class__.__name__ + ": " + str(e))
-                    gen.meta = json.dumps(meta)
-                    commit()
+        set_generation_error(sid, f"{generation_timeout_error} {e.__class__.__name__}: {e}")
     except BaseException as e:
-        if sid:
-            with db_session:
-                gen = Generation.get(id=sid)
-                if gen is not None:
-                    gen.state = STATE_ERROR
-                    meta = json.loads(gen.meta)
-                    meta["error"] = (e.__class__.__name__ + ": " + str(e))
-                    gen.meta = json.dumps(meta)
-                    commit()
+        set_generation_error(sid, e.__class__.__name__ + ": " + str(e))
         raise
 
 
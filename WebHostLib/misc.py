@@ -8,6 +8,7 @@ from pony.orm import count, commit, db_session
 
 from worlds.AutoWorld import AutoWorldRegister
 from . import app, cache
+from .autolauncher import notify_room
 from .models import Seed, Room, Command, UUID, uuid4
 
 
@@ -131,6 +132,7 @@ def host_room(room: UUID):
             if cmd:
                 Command(room=room, commandtext=cmd)
                 commit()
+                notify_room(room.id)
 
     now = datetime.datetime.utcnow()
     # indicate that the page should reload to get the assigned port
@@ -1,5 +1,9 @@
 import collections
 import datetime
+import logging
+import os
+import pickle
+import threading
 import typing
 from typing import Counter, Optional, Dict, Any, Tuple
 from uuid import UUID
@@ -14,6 +18,7 @@ from Utils import restricted_loads
 from worlds import lookup_any_item_id_to_name, lookup_any_location_id_to_name, network_data_package
 from worlds.alttp import Items
 from . import app, cache
+from .customserver import TrackerSummary, get_tracker_save_path, load_tracker_save
 from .models import GameDataPackage, Room
 
 alttp_icons = {
@@ -210,13 +215,13 @@ del data
 del item
 
 
-def attribute_item_solo(inventory, item):
+def attribute_item_solo(inventory, item, count: int = 1):
     """Adds item to inventory counter, converts everything to progressive."""
     target_item = links.get(item, item)
     if item in levels:  # non-progressive
         inventory[target_item] = max(inventory[target_item], levels[item])
     else:
-        inventory[target_item] += 1
+        inventory[target_item] += count
 
 
 @app.template_filter()
@@ -244,7 +249,64 @@ app.jinja_env.filters["location_name"] = get_location_name
 app.jinja_env.filters["item_name"] = get_item_name
 
 
-_multidata_cache = {}
+class StaticRoomDataCache:
+    """LRU cache of get_static_room_data by seed id, bounded by the approximate memory size of its entries to
+    TRACKER_CACHE_SIZE bytes. With TRACKER_CACHE_SHARED, entries are also stored in the flask-caching backend,
+    so that web workers using a shared backend only decompress each multidata once."""
+    memory_per_pickled_byte = 8
+    """static room data takes about this many bytes of memory per byte of its pickle"""
+    shared_timeout = 60 * 60
+
+    def __init__(self) -> None:
+        self.entries: typing.OrderedDict[UUID, Tuple[Tuple[Any, ...], int]] = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, seed_id: UUID) -> Optional[Tuple[Any, ...]]:
+        with self._lock:
+            entry = self.entries.get(seed_id, None)
+            if entry:
+                self.entries.move_to_end(seed_id)
+                self.hits += 1
+                return entry[0]
+        entry = cache.get(f"static_room_data_{seed_id}") if app.config["TRACKER_CACHE_SHARED"] else None
+        if entry:
+            self._add(seed_id, *entry)
+        with self._lock:
+            if entry:
+                self.shared_hits += 1
+                return entry[0]
+            self.misses += 1
+        return None
+
+    def set(self, seed_id: UUID, result: Tuple[Any, ...]) -> None:
+        size = len(pickle.dumps(result, pickle.HIGHEST_PROTOCOL)) * self.memory_per_pickled_byte
+        if app.config["TRACKER_CACHE_SHARED"]:
+            cache.set(f"static_room_data_{seed_id}", (result, size), self.shared_timeout)
+        self._add(seed_id, result, size)
+
+    def _add(self, seed_id: UUID, result: Tuple[Any, ...], size: int) -> None:
+        max_size = app.config["TRACKER_CACHE_SIZE"]
+        if size > max_size:
+            return
+        with self._lock:
+            old_entry = self.entries.pop(seed_id, None)
+            if old_entry:
+                self.size -= old_entry[1]
+            while self.entries and self.size + size > max_size:
+                self.size -= self.entries.popitem(last=False)[1][1]
+            self.entries[seed_id] = result, size
+            self.size += size
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "bytes": self.size, "max_bytes": app.config["TRACKER_CACHE_SIZE"],
+                "hits": self.hits, "shared_hits": self.shared_hits, "misses": self.misses}
+
+
+_multidata_cache = StaticRoomDataCache()
 
 
 def get_location_table(checks_table: dict) -> dict:
@@ -257,8 +319,23 @@ def get_location_table(checks_table: dict) -> dict:
     return loc_to_area
 
 
+def get_room_save(room: Room) -> Dict[str, Any]:
+    """The multisave of room as far as trackers need it, read from the tracker save the room server writes after each
+    save when that is at least as new as the last activity of the room, so the full multisave is only loaded without."""
+    path = get_tracker_save_path(room.id)
+    try:
+        if os.path.getmtime(path) >= room.last_activity.replace(tzinfo=datetime.timezone.utc).timestamp():
+            with open(path, "rb") as f:
+                return load_tracker_save(f.read())
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logging.exception(f"Could not load tracker save of room {room.id}.")
+    return restricted_loads(room.multisave) if room.multisave else {}
+
+
 def get_static_room_data(room: Room):
-    result = _multidata_cache.get(room.seed.id, None)
+    result = _multidata_cache.get(room.seed.id)
     if result:
         return result
     multidata = Context.decompress(room.seed.multidata)
@@ -314,10 +391,27 @@ def get_static_room_data(room: Room):
     result = locations, names, use_door_tracker, player_checks_in_area, player_location_to_area, \
              multidata["precollected_items"], games, multidata["slot_data"], groups, saving_second, \
              custom_locations, custom_items
-    _multidata_cache[room.seed.id] = result
+    _multidata_cache.set(room.seed.id, result)
     return result
 
 
+def get_tracker_summary(multisave: Dict[str, Any], locations: Dict[int, Dict[int, Tuple[int, int, int]]],
+                        names: typing.List[typing.List[str]], groups: Dict[int, typing.Iterable[int]],
+                        precollected_items: Dict[int, typing.List[int]],
+                        player_location_to_area: Dict[int, Dict[int, str]]) -> Dict[str, Any]:
+    """Returns the TrackerSummary saved by the room server, aggregating it from the location checks for rooms saved
+    without one."""
+    summary = multisave.get("tracker", None)
+    if summary and summary["version"] == TrackerSummary.version:
+        return summary
+    tracker_summary = TrackerSummary(locations, groups, player_location_to_area, precollected_items,
+                                     [(team, player) for team, team_names in enumerate(names)
+                                      for player in range(1, len(team_names) + 1) if player not in groups])
+    for (team, player), locations_checked in multisave.get("location_checks", {}).items():
+        tracker_summary.count_checks(team, player, locations_checked)
+    return tracker_summary.dump(multisave.get("client_activity_timers", ()))
+
+
 @app.route('/tracker/<suuid:tracker>/<int:tracked_team>/<int:tracked_player>')
 def get_player_tracker(tracker: UUID, tracked_team: int, tracked_player: int, want_generic: bool = False):
     key = f"{tracker}_{tracked_team}_{tracked_player}_{want_generic}"
@@ -343,40 +437,16 @@ def _get_player_tracker(tracker: UUID, tracked_team: int, tracked_player: int, w
         precollected_items, games, slot_data, groups, saving_second, custom_locations, custom_items = \
         get_static_room_data(room)
     player_name = names[tracked_team][tracked_player - 1]
-    location_to_area = player_location_to_area[tracked_player]
     inventory = collections.Counter()
     checks_done = {loc_name: 0 for loc_name in default_locations}
 
-    # Add starting items to inventory
-    starting_items = precollected_items[tracked_player]
-    if starting_items:
-        for item_id in starting_items:
-            attribute_item_solo(inventory, item_id)
+    multisave: Dict[str, Any] = get_room_save(room)
 
-    if room.multisave:
-        multisave: Dict[str, Any] = restricted_loads(room.multisave)
-    else:
-        multisave: Dict[str, Any] = {}
-
-    slots_aimed_at_player = {tracked_player}
-    for group_id, group_members in groups.items():
-        if tracked_player in group_members:
-            slots_aimed_at_player.add(group_id)
-
-    # Add items to player inventory
-    for (ms_team, ms_player), locations_checked in multisave.get("location_checks", {}).items():
-        # Skip teams and players not matching the request
-        player_locations = locations[ms_player]
-        if ms_team == tracked_team:
-            # If the player does not have the item, do nothing
-            for location in locations_checked:
-                if location in player_locations:
-                    item, recipient, flags = player_locations[location]
-                    if recipient in slots_aimed_at_player:  # a check done for the tracked player
-                        attribute_item_solo(inventory, item)
-                    if ms_player == tracked_player:  # a check done by the tracked player
-                        checks_done[location_to_area[location]] += 1
-                        checks_done["Total"] += 1
+    # Received and starting items and the checks done by the tracked player, as summarized by the room server
+    summary = get_tracker_summary(multisave, locations, names, groups, precollected_items, player_location_to_area)
+    for item_id, count in summary["inventory"].get((tracked_team, tracked_player), {}).items():
+        attribute_item_solo(inventory, item_id, count)
+    checks_done.update(summary["checks_done"].get((tracked_team, tracked_player), {}))
     specific_tracker = game_specific_trackers.get(games[tracked_player], None)
     if specific_tracker and not want_generic:
         tracker =  specific_tracker(multisave, room, locations, inventory, tracked_team, tracked_player, player_name,
@@ -1361,26 +1431,21 @@ def _get_multiworld_tracker_data(tracker: UUID) -> typing.Optional[typing.Dict[s
                     for teamnumber, team in enumerate(names)}
 
     hints = {team: set() for team in range(len(names))}
-    if room.multisave:
-        multisave = restricted_loads(room.multisave)
-    else:
-        multisave = {}
+    multisave = get_room_save(room)
     if "hints" in multisave:
         for (team, slot), slot_hints in multisave["hints"].items():
             hints[team] |= set(slot_hints)
 
-    for (team, player), locations_checked in multisave.get("location_checks", {}).items():
-        if player in groups:
-            continue
-        player_locations = locations[player]
-        checks_done[team][player]["Total"] = sum(1 for loc in locations_checked if loc in player_locations)
+    summary = get_tracker_summary(multisave, locations, names, groups, precollected_items, player_location_to_area)
+    for (team, player), player_checks_done in summary["checks_done"].items():
+        checks_done[team][player].update(player_checks_done)
         percent_total_checks_done[team][player] = int(checks_done[team][player]["Total"] /
                                                       checks_in_area[player]["Total"] * 100) \
             if checks_in_area[player]["Total"] else 100
 
     activity_timers = {}
     now = datetime.datetime.utcnow()
-    for (team, player), timestamp in multisave.get("client_activity_timers", []):
+    for (team, player), timestamp in summary["activity"].items():
         activity_timers[team, player] = now - datetime.datetime.utcfromtimestamp(timestamp)
 
     player_names = {}
@@ -1403,27 +1468,15 @@ def _get_multiworld_tracker_data(tracker: UUID) -> typing.Optional[typing.Dict[s
                 activity_timers=activity_timers, video=video, hints=hints,
                 long_player_names=long_player_names,
                 multisave=multisave, precollected_items=precollected_items, groups=groups,
-                locations=locations, games=games, states=states)
+                locations=locations, games=games, states=states, summary=summary)
 
 
 def _get_inventory_data(data: typing.Dict[str, typing.Any]) -> typing.Dict[int, typing.Dict[int, int]]:
     inventory = {teamnumber: {playernumber: collections.Counter() for playernumber in team_data}
                  for teamnumber, team_data in data["checks_done"].items()}
 
-    groups = data["groups"]
-
-    for (team, player), locations_checked in data["multisave"].get("location_checks", {}).items():
-        if player in data["groups"]:
-            continue
-        player_locations = data["locations"][player]
-        precollected = data["precollected_items"][player]
-        for item_id in precollected:
-            inventory[team][player][item_id] += 1
-        for location in locations_checked:
-            item_id, recipient, flags = player_locations[location]
-            recipients = groups.get(recipient, [recipient])
-            for recipient in recipients:
-                inventory[team][recipient][item_id] += 1
+    for (team, player), items in data["summary"]["inventory"].items():
+        inventory[team][player].update(items)
     return inventory
 
 
@@ -1475,39 +1528,17 @@ def get_LttP_multiworld_tracker(tracker: UUID):
                                  for teamnumber, team in enumerate(names)}
 
     hints = {team: set() for team in range(len(names))}
-    if room.multisave:
-        multisave = restricted_loads(room.multisave)
-    else:
-        multisave = {}
+    multisave = get_room_save(room)
     if "hints" in multisave:
         for (team, slot), slot_hints in multisave["hints"].items():
             hints[team] |= set(slot_hints)
 
-    def attribute_item(team: int, recipient: int, item: int):
-        nonlocal inventory
-        target_item = links.get(item, item)
-        if item in levels:  # non-progressive
-            inventory[team][recipient][target_item] = max(inventory[team][recipient][target_item], levels[item])
-        else:
-            inventory[team][recipient][target_item] += 1
-
-    for (team, player), locations_checked in multisave.get("location_checks", {}).items():
-        if player in groups:
-            continue
-        player_locations = locations[player]
-        if precollected_items:
-            precollected = precollected_items[player]
-            for item_id in precollected:
-                attribute_item(team, player, item_id)
-        for location in locations_checked:
-            if location not in player_locations or location not in player_location_to_area[player]:
-                continue
-            item, recipient, flags = player_locations[location]
-            recipients = groups.get(recipient, [recipient])
-            for recipient in recipients:
-                attribute_item(team, recipient, item)
-                checks_done[team][player][player_location_to_area[player][location]] += 1
-                checks_done[team][player]["Total"] += 1
+    summary = get_tracker_summary(multisave, locations, names, groups, precollected_items, player_location_to_area)
+    for (team, player), items in summary["inventory"].items():
+        for item_id, count in items.items():
+            attribute_item_solo(inventory[team][player], item_id, count)
+    for (team, player), player_checks_done in summary["checks_done"].items():
+        checks_done[team][player].update(player_checks_done)
         percent_total_checks_done[team][player] = int(
             checks_done[team][player]["Total"] / seed_checks_in_area[player]["Total"] * 100) if \
         seed_checks_in_area[player]["Total"] else 100
@@ -1536,7 +1567,7 @@ def get_LttP_multiworld_tracker(tracker: UUID):
 
     activity_timers = {}
     now = datetime.datetime.utcnow()
-    for (team, player), timestamp in multisave.get("client_activity_timers", []):
+    for (team, player), timestamp in summary["activity"].items():
         activity_timers[team, player] = now - datetime.datetime.utcfromtimestamp(timestamp)
 
     player_names = {}
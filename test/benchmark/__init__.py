@@ -0,0 +1,27 @@
+"""
+Benchmarks for generation internals. They are not collected as tests and are run as modules, for example
+`python -m test.benchmark.reachability`.
+"""
+import time
+import typing
+
+from test.general import setup_multiworld
+
+default_games = ("A Link to the Past", "Timespinner", "Hollow Knight", "Rogue Legacy", "Super Mario 64")
+
+
+def get_games(players: int, games: typing.Sequence[str] = default_games) -> typing.List[str]:
+    return [games[index % len(games)] for index in range(players)]
+
+
+class Timer:
+    """Context manager that accumulates the wall time spent inside it."""
+    def __init__(self) -> None:
+        self.total = 0.0
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.total += time.perf_counter() - self.start
@@ -0,0 +1,41 @@
+"""
+Times progression balancing separately from the main fill on a generated multiworld, with every slot set to the same
+progression_balancing. The placement digest allows comparing results between runs with a fixed PYTHONHASHSEED.
+"""
+import argparse
+import hashlib
+import logging
+
+from Fill import balance_multiworld_progression, distribute_items_restrictive
+from Options import ProgressionBalancing
+from test.benchmark import Timer, default_games, get_games, setup_multiworld
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--balancing", type=int, default=99, help="progression_balancing of every slot")
+    parser.add_argument("--games", nargs="+", default=default_games, help="games to cycle through for the slots")
+    args = parser.parse_args()
+    games = get_games(args.players, args.games)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    multiworld = setup_multiworld(games, args.seed)
+    for player in multiworld.player_ids:
+        multiworld.progression_balancing[player] = ProgressionBalancing(args.balancing)
+    with Timer() as fill_timer:
+        distribute_items_restrictive(multiworld)
+    with Timer() as balancing_timer:
+        balance_multiworld_progression(multiworld)
+
+    placements = sorted(f"{location} {location.item}" for location in multiworld.get_filled_locations())
+    digest = hashlib.sha1("\n".join(placements).encode()).hexdigest()[:12]
+    print(f"{args.players} players, seed {args.seed}, progression_balancing {args.balancing}")
+    print(f"{'fill':<12}{fill_timer.total:>10.2f}")
+    print(f"{'balancing':<12}{balancing_timer.total:>10.2f}")
+    print(f"placements {digest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Times NetUtils.encode and NetUtils.decode on typical ReceivedItems, Connected and DataPackage payloads, with orjson
+if it is installed and with the pure Python fallback, and checks that both produce the same wire output.
+"""
+import argparse
+import timeit
+import typing
+
+import NetUtils
+from NetUtils import NetworkItem, NetworkPlayer, NetworkSlot, SlotType, decode, encode
+
+
+def get_payloads(players: int, items: int) -> typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]]:
+    import worlds
+    received_items = [{"cmd": "ReceivedItems", "index": 0,
+                       "items": [NetworkItem(item, item + 1000, item % players + 1, item % 3) for item in range(items)]}]
+    connected = [{"cmd": "Connected", "team": 0, "slot": 1,
+                  "players": [NetworkPlayer(0, slot, f"Alias{slot}", f"Player{slot}")
+                              for slot in range(1, players + 1)],
+                  "missing_locations": list(range(1000, 1000 + items)),
+                  "checked_locations": list(range(1000 + items, 1000 + items + items // 2)),
+                  "slot_info": {slot: NetworkSlot(f"Player{slot}", "Clique", SlotType.player)
+                                for slot in range(1, players + 1)},
+                  "slot_data": {"goal": 1, "shuffle": [1, 2, 3], "names": {"a": "b"}}, "hint_points": 5}]
+    data_package = [{"cmd": "DataPackage", "data": {"games": worlds.network_data_package["games"]}}]
+    return {"ReceivedItems": received_items, "Connected": connected, "DataPackage": data_package}
+
+
+def best(function: typing.Callable[[], typing.Any], repeat: int) -> float:
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--items", type=int, default=2000, help="received items and locations of the slot")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    orjson = NetUtils.orjson
+    backends = ["orjson", "python"] if orjson else ["python"]
+    print(f"{args.players} players, {args.items} items, best of {args.repeat} in ms")
+    print(f"{'payload':<16}{'size':>10}" + "".join(f"{f'{step} {backend}':>18}"
+                                                  for step in ("encode", "decode") for backend in backends))
+    identical = True
+    try:
+        for name, payload in get_payloads(args.players, args.items).items():
+            encode_timings: typing.List[float] = []
+            decode_timings: typing.List[float] = []
+            outputs: typing.List[str] = []
+            decoded: typing.List[typing.Any] = []
+            for backend in backends:
+                NetUtils.orjson = orjson if backend == "orjson" else None
+                outputs.append(encode(payload))
+                encode_timings.append(best(lambda: encode(payload), args.repeat))
+                decode_timings.append(best(lambda: decode(outputs[0]), args.repeat))
+                decoded.append(decode(outputs[0]))
+                identical = identical and outputs[-1] == outputs[0] and decoded[-1] == decoded[0]
+            print(f"{name:<16}{len(outputs[0]):>10}" +
+                  "".join(f"{timing:>18.2f}" for timing in encode_timings + decode_timings))
+    finally:
+        NetUtils.orjson = orjson
+    print("output identical" if identical else "output DIFFERS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compares the incremental reachability engine of CollectionState against the plain BFS over all blocked connections,
+on the same seed, and checks that both produce the same placements.
+"""
+import argparse
+import logging
+import typing
+
+from BaseClasses import CollectionState
+from Fill import distribute_items_restrictive
+from test.benchmark import Timer, default_games, get_games, setup_multiworld
+
+
+def run(games: typing.Sequence[str], seed: int, incremental: bool) \
+        -> typing.Tuple[float, float, typing.List[typing.Tuple[str, str]]]:
+    CollectionState.incremental_reachability = incremental
+    multiworld = setup_multiworld(games, seed)
+    with Timer() as fill_timer:
+        distribute_items_restrictive(multiworld)
+    with Timer() as spheres_timer:
+        for _ in multiworld.get_spheres():
+            pass
+    placements = [(str(location), str(location.item)) for location in multiworld.get_filled_locations()]
+    return fill_timer.total, spheres_timer.total, placements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--games", nargs="+", default=default_games, help="games to cycle through for the slots")
+    args = parser.parse_args()
+    games = get_games(args.players, args.games)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    default = CollectionState.incremental_reachability
+    try:
+        bfs_fill, bfs_spheres, bfs_placements = run(games, args.seed, False)
+        inc_fill, inc_spheres, inc_placements = run(games, args.seed, True)
+    finally:
+        CollectionState.incremental_reachability = default
+
+    print(f"{args.players} players, seed {args.seed}")
+    print(f"{'engine':<12}{'fill':>10}{'spheres':>10}")
+    print(f"{'bfs':<12}{bfs_fill:>10.2f}{bfs_spheres:>10.2f}")
+    print(f"{'incremental':<12}{inc_fill:>10.2f}{inc_spheres:>10.2f}")
+    print("placements identical" if bfs_placements == inc_placements else "placements DIFFER")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Times the sphere searches run after fill (get_spheres, fulfills_accessibility and the spoiler playthrough)
+with and without incremental reachability on one filled multiworld, and checks that both produce the same results.
+"""
+import argparse
+import logging
+import typing
+
+from BaseClasses import CollectionState, MultiWorld, Spoiler
+from Fill import distribute_items_restrictive
+from test.benchmark import Timer, default_games, get_games, setup_multiworld
+
+
+def run(multiworld: MultiWorld, incremental: bool) -> typing.Tuple[typing.Dict[str, float], typing.Tuple[typing.Any, ...]]:
+    CollectionState.incremental_reachability = incremental
+    timings: typing.Dict[str, float] = {}
+    with Timer() as timer:
+        spheres = [sorted(map(str, sphere)) for sphere in multiworld.get_spheres()]
+    timings["spheres"] = timer.total
+    with Timer() as timer:
+        accessible = multiworld.fulfills_accessibility()
+    timings["accessibility"] = timer.total
+    # the playthrough pushes the precollected items it culled back at the end, keep the order for the next run
+    precollected_items = {player: items.copy() for player, items in multiworld.precollected_items.items()}
+    spoiler = Spoiler(multiworld)
+    with Timer() as timer:
+        spoiler.create_playthrough()
+    timings["playthrough"] = timer.total
+    multiworld.precollected_items = precollected_items
+    return timings, (spheres, accessible, spoiler.playthrough, spoiler.paths)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--games", nargs="+", default=default_games, help="games to cycle through for the slots")
+    args = parser.parse_args()
+    games = get_games(args.players, args.games)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    multiworld = setup_multiworld(games, args.seed)
+    distribute_items_restrictive(multiworld)
+
+    default = CollectionState.incremental_reachability
+    try:
+        bfs_timings, bfs_results = run(multiworld, False)
+        inc_timings, inc_results = run(multiworld, True)
+    finally:
+        CollectionState.incremental_reachability = default
+
+    print(f"{args.players} players, seed {args.seed}")
+    print(f"{'engine':<12}" + "".join(f"{name:>15}" for name in bfs_timings))
+    print(f"{'bfs':<12}" + "".join(f"{timing:>15.2f}" for timing in bfs_timings.values()))
+    print(f"{'incremental':<12}" + "".join(f"{timing:>15.2f}" for timing in inc_timings.values()))
+    print("results identical" if bfs_results == inc_results else "results DIFFER")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measures CollectionState.copy() followed by collecting a single item and updating that player's reachability,
+with copy-on-write sharing against cloning every player's structures up front like copies used to.
+"""
+import argparse
+import logging
+import tracemalloc
+import typing
+
+from BaseClasses import CollectionState, Item
+from test.benchmark import Timer, default_games, get_games, setup_multiworld
+
+
+def copy_and_collect(state: CollectionState, item: Item, eager: bool) -> CollectionState:
+    child = state.copy()
+    if eager:
+        for player in state.multiworld.get_all_ids():
+            child.unshare(player)
+    child.collect(item, True)
+    for region in state.multiworld.get_regions(item.player):
+        region.can_reach(child)
+    return child
+
+
+def measure(state: CollectionState, items: typing.List[Item], eager: bool) -> typing.Tuple[float, float]:
+    """returns seconds and bytes per copy"""
+    with Timer() as timer:
+        for item in items:
+            copy_and_collect(state, item, eager)
+    tracemalloc.start()
+    children = [copy_and_collect(state, item, eager) for item in items[:20]]
+    size = tracemalloc.get_traced_memory()[0] / len(children)
+    tracemalloc.stop()
+    return timer.total / len(items), size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--games", nargs="+", default=default_games, help="games to cycle through for the slots")
+    parser.add_argument("--copies", type=int, default=200)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    multiworld = setup_multiworld(get_games(args.players, args.games), args.seed)
+    # roughly half-way through a playthrough, so every player has reachable regions and events to share
+    state = CollectionState(multiworld)
+    items = [item for item in multiworld.itempool if item.advancement]
+    for item in items[::2]:
+        state.collect(item, True)
+    state.sweep_for_events()
+    for player in multiworld.player_ids:
+        state.update_reachable_regions(player)
+    remaining = items[1::2][:args.copies]
+
+    eager_time, eager_size = measure(state, remaining, True)
+    shared_time, shared_size = measure(state, remaining, False)
+    print(f"{args.players} players, seed {args.seed}, {len(remaining)} copies")
+    print(f"{'copy':<16}{'ms/copy':>10}{'KiB/copy':>10}")
+    print(f"{'eager':<16}{eager_time * 1000:>10.3f}{eager_size / 1024:>10.1f}")
+    print(f"{'copy-on-write':<16}{shared_time * 1000:>10.3f}{shared_size / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,10 @@ from typing import List, Iterable
 import unittest
 from worlds.AutoWorld import World
 from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
-    distribute_early_items, distribute_items_restrictive
-from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
+    distribute_early_items, distribute_items_restrictive, remaining_fill
+from BaseClasses import CollectionState, Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
     ItemClassification
-from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
+from worlds.generic.Rules import CollectionRule, add_item_rule, forbid_item, locality_rules, set_rule
 
 
 def generate_multi_world(players: int = 1) -> MultiWorld:
@@ -383,6 +383,36 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertTrue(sphere1_loc.item, "Did not swap required item into Sphere 1")
         self.assertEqual(sphere1_loc.item, allowed_item, "Wrong item in Sphere 1")
 
+    def test_first_fitting_location(self):
+        multi_world = generate_multi_world()
+        player1 = generate_player_data(multi_world, 1, 4, 2)
+        locations = player1.locations
+        items = player1.prog_items
+
+        set_rule(locations[0], lambda state: state.has("Missing Item", player1.id))
+        forbid_item(locations[1], items[1].name, player1.id)
+        fill_restrictive(multi_world, multi_world.state, locations.copy(), items.copy(), allow_partial=True)
+
+        self.assertIsNone(locations[0].item)
+        self.assertEqual(locations[1].item, items[0])
+        self.assertEqual(locations[2].item, items[1])
+        self.assertIsNone(locations[3].item)
+
+    def test_remaining_fill_first_fitting_location(self):
+        multi_world = generate_multi_world(2)
+        player1 = generate_player_data(multi_world, 1, 2, 0, 2)
+        player2 = generate_player_data(multi_world, 2, 2, 0, 1)
+        multi_world.local_items[player2.id].value = {player2.basic_items[0].name}
+        locality_rules(multi_world)
+        locations = [player1.locations[0], player2.locations[0], player1.locations[1], player2.locations[1]]
+
+        remaining_fill(multi_world, locations, player1.basic_items + player2.basic_items)
+
+        self.assertEqual(player2.locations[0].item, player2.basic_items[0])
+        self.assertEqual(player1.locations[0].item, player1.basic_items[1])
+        self.assertEqual(player1.locations[1].item, player1.basic_items[0])
+        self.assertEqual(locations, [player2.locations[1]])
+
     def test_double_sweep(self):
         # test for PR1114
         multi_world = generate_multi_world(1)
@@ -398,6 +428,42 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertTrue(multi_world.state.prog_items[item.name, item.player], "Sweep did not collect - Test flawed")
         self.assertEqual(multi_world.state.prog_items[item.name, item.player], 1, "Sweep collected multiple times")
 
+    def test_double_sweep_locked_dungeon_item(self):
+        class DungeonItem(Item):
+            locked_dungeon_item = True
+
+        multi_world = generate_multi_world(1)
+        player1 = generate_player_data(multi_world, 1, 1)
+        location = player1.locations[0]
+        location.address = None
+        location.event = True
+        item = DungeonItem("Big Key", ItemClassification.progression, None, player1.id)
+        location.place_locked_item(item)
+        multi_world.state.sweep_for_events()
+        multi_world.state.sweep_for_events()
+        self.assertEqual(multi_world.state.prog_items[item.name, item.player], 1, "Sweep collected multiple times")
+
+    def test_imprecise_remove(self):
+        multi_world = generate_multi_world(1)
+        world = multi_world.worlds[1]
+
+        def collect(state: CollectionState, item: Item) -> bool:
+            # counts all collected progression, but World.remove does not uncount it
+            if World.collect(world, state, item):
+                state.prog_items["Progression", world.player] += 1
+                return True
+            return False
+
+        world.collect = collect
+        player1 = generate_player_data(multi_world, 1, 5, 4)
+        # only the 4 placed items are left to count, so locations[0] should never be reachable
+        set_rule(player1.locations[0], lambda state: state.has("Progression", player1.id, 5))
+
+        fill_restrictive(multi_world, multi_world.state, player1.locations.copy(), player1.prog_items.copy())
+
+        self.assertIsNone(player1.locations[0].item)
+        self.assertTrue(all(location.item for location in player1.locations[1:]))
+
 
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
@@ -0,0 +1,45 @@
+import unittest
+
+import GenerationProfile
+from BaseClasses import CollectionState, Location
+from worlds import AutoWorld
+from worlds.AutoWorld import AutoWorldRegister
+from . import setup_solo_multiworld
+
+
+class TestGenerationProfile(unittest.TestCase):
+    def test_records_worlds_and_state(self):
+        world_type = AutoWorldRegister.world_types["Clique"]
+        with GenerationProfile.GenerationProfile() as profile:
+            multiworld = setup_solo_multiworld(world_type)
+            AutoWorld.call_stage(multiworld, "assert_generate")
+            state = CollectionState(multiworld)
+            for location in multiworld.get_locations():
+                state.can_reach(location)
+        report = profile.report()
+
+        self.assertEqual(report["worlds"]["Clique"]["create_regions"]["calls"], 1)
+        self.assertIn("stage_assert_generate", report["worlds"]["Clique"])
+        self.assertEqual(report["stages"]["assert_generate"]["calls"], 1)
+        self.assertEqual(report["state"]["CollectionState.can_reach"]["calls"], len(multiworld.get_locations()))
+        self.assertIn("Location.can_reach", report["state"])
+
+    def test_uninstalls(self):
+        can_reach = Location.can_reach
+        call_single = AutoWorld.call_single
+        with GenerationProfile.GenerationProfile():
+            self.assertIsNot(Location.can_reach, can_reach)
+        self.assertIs(Location.can_reach, can_reach)
+        self.assertIs(AutoWorld.call_single, call_single)
+        self.assertNotIn("stage_assert_generate", vars(AutoWorldRegister.world_types["Clique"]))
+        self.assertIsNone(GenerationProfile.active)
+
+    def test_nested_calls_count_once(self):
+        @GenerationProfile.profiled("test", "recursive")
+        def recursive(depth: int) -> int:
+            return recursive(depth - 1) + 1 if depth else 0
+
+        self.assertEqual(recursive(3), 3)
+        with GenerationProfile.GenerationProfile() as profile:
+            recursive(3)
+        self.assertEqual(profile.report()["test"]["recursive"]["calls"], 1)
@@ -0,0 +1,50 @@
+import functools
+import unittest
+from typing import Dict, List
+
+from worlds.AutoWorld import call_all, call_all_parallel
+from . import gen_steps, setup_multiworld
+
+games = ("ChecksFinder", "Clique", "ChecksFinder", "ChecksFinder", "Clique", "ChecksFinder")
+
+
+class TestParallelGeneration(unittest.TestCase):
+    def testSameResult(self):
+        """Worlds generating in parallel end up with the same regions, items and random state"""
+        sequential = setup_multiworld(games, steps=())
+        for step in gen_steps[:-1]:
+            call_all(sequential, step)
+
+        parallel = setup_multiworld(games, steps=())
+        for step in gen_steps[:-1]:
+            call_all_parallel(parallel, step)
+
+        self.assertEqual([(region.name, region.player) for region in sequential.regions],
+                         [(region.name, region.player) for region in parallel.regions])
+        self.assertEqual([(item.name, item.player) for item in sequential.itempool],
+                         [(item.name, item.player) for item in parallel.itempool])
+        self.assertEqual(sequential.random.getstate(), parallel.random.getstate())
+
+    def testGlobalRandomIsGuarded(self):
+        multiworld = setup_multiworld(games, steps=())
+        multiworld.worlds[3].generate_early = lambda: multiworld.random.random()  # runs together with player 4
+        self.assertRaises(RuntimeError, call_all_parallel, multiworld, "generate_early")
+        self.assertTrue(multiworld.random.passthrough)
+
+    def testPlayersTakeTurns(self):
+        """Worlds without parallel_generation run after all players before them and before all players after them"""
+        multiworld = setup_multiworld(games, steps=())
+        called = []
+        seen_by: Dict[int, List[int]] = {}
+
+        def record(player: int, parallel: bool) -> None:
+            if not parallel:
+                seen_by[player] = sorted(called)
+            called.append(player)
+
+        for player, world in multiworld.worlds.items():
+            world.generate_early = functools.partial(record, player, world.parallel_generation)
+        call_all_parallel(multiworld, "generate_early")
+        self.assertEqual(sorted(called), list(multiworld.player_ids))
+        self.assertEqual(seen_by, {player: list(range(1, player)) for player, game in enumerate(games, 1)
+                                   if game == "Clique"})
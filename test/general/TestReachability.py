@@ -1,7 +1,7 @@
 import unittest
 
-from BaseClasses import CollectionState
-from worlds.AutoWorld import AutoWorldRegister
+from BaseClasses import CollectionState, Entrance, Item, ItemClassification, Location, MultiWorld, Region, SphereSearch
+from worlds.AutoWorld import AutoWorldRegister, World
 
 from . import setup_solo_multiworld
 
@@ -66,3 +66,170 @@ class TestBase(unittest.TestCase):
                             locations.add(location)
                     self.assertGreater(len(locations), 0,
                                        msg="Need to be able to reach at least one location to get started.")
+
+    def testIncrementalReachabilityMatchesFullSearch(self):
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest("Game", game=game_name):
+                world = setup_solo_multiworld(world_type)
+                incremental_state = CollectionState(world)
+                full_state = CollectionState(world)
+                full_state.incremental_reachability = False
+                items = world.get_items()
+                step = max(1, len(items) // 10)
+                for start in range(0, len(items), step):
+                    for item in items[start:start + step]:
+                        incremental_state.collect(item, True)
+                        full_state.collect(item, True)
+                    incremental_state.sweep_for_events()
+                    full_state.sweep_for_events()
+                    with self.subTest("Reachability should match", collected=start):
+                        self.assertEqual({region for region in world.get_regions()
+                                          if region.can_reach(incremental_state)},
+                                         {region for region in world.get_regions() if region.can_reach(full_state)})
+                        self.assertEqual(incremental_state.events, full_state.events)
+
+
+class TestIncrementalReachability(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = MultiWorld(1)
+        self.multiworld.game[1] = "Archipelago"
+        self.multiworld.worlds[1] = World(self.multiworld, 1)
+        self.multiworld.set_default_common_options()
+        menu = Region("Menu", 1, self.multiworld)
+        self.target = Region("Target", 1, self.multiworld)
+        self.multiworld.regions += [menu, self.target]
+        self.rule_calls = 0
+
+        def rule(state: CollectionState) -> bool:
+            self.rule_calls += 1
+            return state.has("Key", 1)
+
+        self.entrance = Entrance(1, "Door", menu)
+        menu.exits.append(self.entrance)
+        self.entrance.connect(self.target)
+        self.entrance.access_rule = rule
+
+    def collect(self, state: CollectionState, name: str) -> None:
+        state.collect(Item(name, ItemClassification.progression, None, 1), True)
+
+    def testOnlyDependentConnectionsAreRetried(self):
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.target.can_reach(state))
+        self.assertEqual(self.rule_calls, 1)
+        self.collect(state, "Unrelated")
+        self.assertFalse(self.target.can_reach(state))
+        self.assertEqual(self.rule_calls, 1)
+        self.collect(state, "Key")
+        self.assertTrue(self.target.can_reach(state))
+        self.assertEqual(self.rule_calls, 2)
+
+    def testCopyKeepsDependencies(self):
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.target.can_reach(state))
+        child = state.copy()
+        self.collect(child, "Key")
+        self.assertTrue(self.target.can_reach(child))
+        self.assertFalse(self.target.can_reach(state))
+
+    def testCopiesRecordDependenciesSeparately(self):
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.target.can_reach(state))
+        child = state.copy()
+        window = Entrance(1, "Window", self.multiworld.get_region("Menu", 1))
+        window.access_rule = lambda state: state.has("Key", 1)
+        self.assertFalse(child.can_traverse(window))
+        self.assertEqual(child.connection_dependencies[1][("Key", 1)], {self.entrance, window})
+        self.assertEqual(state.connection_dependencies[1][("Key", 1)], {self.entrance})
+
+    def testRuleChangeRetriesConnections(self):
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.target.can_reach(state))
+        self.entrance.access_rule = lambda state: True
+        state.stale[1] = True
+        self.assertTrue(self.target.can_reach(state))
+
+    def testUntrackedRuleIsAlwaysRetried(self):
+        self.entrance.access_rule = lambda state: len(state.locations_checked) > 0
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.target.can_reach(state))
+        location = Location(1, "Somewhere", None, self.multiworld.get_region("Menu", 1))
+        state.collect(Item("Unrelated", ItemClassification.progression, None, 1), True, location)
+        self.assertTrue(self.target.can_reach(state))
+
+    def testCopiesAreIndependent(self):
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.target.can_reach(state))
+        child = state.copy()
+        self.assertEqual(child.shared_players, {1})
+        location = Location(1, "Somewhere", None, self.multiworld.get_region("Menu", 1))
+        child.events.add(location)
+        self.collect(child, "Key")
+        self.assertTrue(self.target.can_reach(child))
+        self.assertNotIn(location, state.events)
+        self.assertFalse(self.target.can_reach(state))
+        self.assertNotIn(self.target, state.reachable_regions[1])
+        self.assertNotIn(self.target, state.path)
+        self.assertIn(self.target, child.path)
+
+    def testAssigningViewsKeepsCopiesIndependent(self):
+        state = CollectionState(self.multiworld)
+        self.collect(state, "Key")
+        self.assertTrue(self.target.can_reach(state))
+        location = Location(1, "Somewhere", None, self.multiworld.get_region("Menu", 1))
+        state.events.add(location)
+        state.locations_checked.add(location)
+        child = state.copy()
+        child.events = {location}
+        child.locations_checked = {event for event in child.locations_checked if event is not location}
+        child.path = {self.target: ("Target", None)}
+        self.assertEqual(set(child.events), {location})
+        self.assertEqual(set(child.locations_checked), set())
+        self.assertEqual(dict(child.path), {self.target: ("Target", None)})
+        self.assertIn(location, state.locations_checked)
+        self.assertNotEqual(dict(state.path), dict(child.path))
+        child.reachable_regions[1].clear()
+        self.assertIn(self.target, state.reachable_regions[1])
+
+    def testUnchangedPlayersStayShared(self):
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.target.can_reach(state))
+        child = state.copy()
+        self.assertFalse(self.target.can_reach(child))
+        self.assertIs(child.reachable_regions[1], state.reachable_regions[1])
+        self.collect(child, "Unrelated")
+        self.assertFalse(self.target.can_reach(child))
+        self.assertIs(child.reachable_regions[1], state.reachable_regions[1])
+
+    def testSpheresOnlyRetestDependentLocations(self):
+        menu = self.multiworld.get_region("Menu", 1)
+        key_location = Location(1, "Key Location", None, menu)
+        key_location.place_locked_item(Item("Key", ItemClassification.progression, None, 1))
+        locked_rule_calls = []
+        locked = Location(1, "Locked", None, menu)
+        locked.access_rule = lambda state: locked_rule_calls.append(state) or state.has("Key", 1)
+        behind_door = Location(1, "Behind Door", None, self.target)
+
+        state = CollectionState(self.multiworld)
+        spheres = []
+        for sphere in state.iter_spheres([key_location, locked, behind_door]):
+            spheres.append(sphere)
+            state.collect(Item("Unrelated", ItemClassification.progression, None, 1), True)
+            for location in sphere:
+                if location.item:
+                    state.collect(location.item, True, location)
+        self.assertEqual(spheres, [{key_location}, {locked, behind_door}])
+        self.assertEqual(len(locked_rule_calls), 2)
+
+    def testClosingSearchKeepsOtherSearches(self):
+        menu = self.multiworld.get_region("Menu", 1)
+        locked = Location(1, "Locked", None, menu)
+        locked.access_rule = lambda state: state.has("Key", 1)
+
+        state = CollectionState(self.multiworld)
+        search = SphereSearch(state, [locked])
+        self.assertEqual(search.next_sphere(), set())
+        # a second search on the same state has an equal set of changes, closing it must not stop the first one
+        SphereSearch(state, []).close()
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        self.assertEqual(search.next_sphere(), {locked})
+        search.close()
@@ -0,0 +1,29 @@
+import unittest
+
+from BaseClasses import Spoiler
+from .TestFill import generate_multi_world, generate_player_data
+
+
+class TestPlaythrough(unittest.TestCase):
+    def test_culled_playthrough(self):
+        multi_world = generate_multi_world()
+        player1 = generate_player_data(multi_world, 1, 16, 17)
+        items = player1.prog_items
+        player1.generate_region(player1.menu, 1, lambda state: state.has(items[3].name, 1))
+        for location, item in zip(player1.locations, items):
+            location.place_locked_item(item)
+        multi_world.completion_condition[1] = lambda state: state.has_all(
+            {items[3].name, items[9].name, items[10].name, items[16].name}, 1) \
+            and state.has_any({items[12].name, items[13].name}, 1)
+
+        spoiler = Spoiler(multi_world)
+        spoiler.create_playthrough(create_paths=False)
+
+        self.assertEqual(len(spoiler.playthrough), 3)
+        first_sphere = set(spoiler.playthrough["1"].values())
+        self.assertLessEqual({str(items[3]), str(items[9]), str(items[10])}, first_sphere)
+        self.assertEqual(len(first_sphere & {str(items[12]), str(items[13])}), 1)
+        self.assertEqual(len(first_sphere), 4)
+        self.assertEqual(set(spoiler.playthrough["2"].values()), {str(items[16])})
+        # culled items are put back
+        self.assertEqual([location.item for location in player1.locations], items)
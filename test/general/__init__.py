@@ -1,8 +1,8 @@
 from argparse import Namespace
-from typing import Type, Tuple
+from typing import Sequence, Type, Tuple
 
 from BaseClasses import MultiWorld
-from worlds.AutoWorld import call_all, World
+from worlds.AutoWorld import AutoWorldRegister, call_all, World
 
 gen_steps = ("generate_early", "create_regions", "create_items", "set_rules", "generate_basic", "pre_fill")
 
@@ -20,3 +20,23 @@ def setup_solo_multiworld(world_type: Type[World], steps: Tuple[str, ...] = gen_
     for step in steps:
         call_all(multiworld, step)
     return multiworld
+
+
+def setup_multiworld(games: Sequence[str], seed: int = 0, steps: Tuple[str, ...] = gen_steps) -> MultiWorld:
+    """Creates a multiworld with one slot per entry in games, all on default options, and runs steps on it."""
+    multiworld = MultiWorld(len(games))
+    multiworld.player_name = {}
+    args = Namespace()
+    for player, game in enumerate(games, 1):
+        multiworld.game[player] = game
+        multiworld.player_name[player] = f"Tester{player}"
+        for name, option in AutoWorldRegister.world_types[game].option_definitions.items():
+            if not hasattr(args, name):
+                setattr(args, name, {})
+            getattr(args, name)[player] = option.from_any(option.default)
+    multiworld.set_seed(seed)
+    multiworld.set_options(args)
+    multiworld.set_default_common_options()
+    for step in steps:
+        call_all(multiworld, step)
+    return multiworld
@@ -1,5 +1,12 @@
+import asyncio
+import os
+import tempfile
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+
+from MultiServer import CheckedLocations, Client, Context, SaveJournal, ServerCommandProcessor, collect_hints, \
+    collect_player, get_checked_checks, get_missing_checks, get_remaining, register_location_checks
+from NetUtils import Hint, NetworkItem, NetworkSlot, SlotType, decode
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +45,270 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class FakeSocket:
+    open = True
+
+
+def make_context(slots: int) -> Context:
+    ctx = Context("", 0, "", "", 0, 0, False)
+    ctx.player_names = {(0, slot): f"Player{slot}" for slot in range(1, slots + 1)}
+    ctx.clients = {0: {slot: [] for slot in range(1, slots + 1)}}
+    for slot in range(1, slots + 1):
+        client = Client(FakeSocket(), ctx)
+        client.auth, client.team, client.slot = True, 0, slot
+        client.items_handling = 0b111
+        ctx.clients[0][slot].append(client)
+        ctx.endpoints.append(client)
+    # every slot has a location for each slot, holding an item for that slot
+    ctx.locations = {slot: {slot * 100 + target: (target, target, 0) for target in range(1, slots + 1)}
+                     for slot in range(1, slots + 1)}
+    ctx._init_location_index()
+    return ctx
+
+
+class TestLocationIndex(unittest.TestCase):
+    def test_hints_include_groups(self) -> None:
+        ctx = make_context(3)
+        # slot 4 is a group of slots 1 and 2, its item 1 is at location 305
+        ctx.groups = {4: {1, 2}}
+        ctx.locations[3][305] = (1, 4, 0)
+        ctx._init_location_index()
+        ctx.location_checks[0, 3] = {305}
+
+        hints = collect_hints(ctx, 0, 1, 1)
+        self.assertEqual(sorted((hint.receiving_player, hint.finding_player, hint.location, hint.found)
+                                for hint in hints),
+                         [(1, 1, 101, False), (1, 2, 201, False), (1, 3, 301, False), (4, 3, 305, True)])
+        self.assertEqual([hint.location for hint in collect_hints(ctx, 0, 3, 1)], [])
+        self.assertEqual(ctx.receiver_locations[4], {3: [305]})
+
+
+class TestLocationChecks(unittest.TestCase):
+    def test_checked_and_missing(self) -> None:
+        ctx = make_context(3)
+        checks = ctx.location_checks[0, 2]
+        self.assertIsInstance(checks, CheckedLocations)
+        checks.update([203, 201, 201, 999])
+        self.assertEqual(len(checks), 2)
+        self.assertIn(201, checks)
+        self.assertNotIn(999, checks)
+        self.assertEqual(get_checked_checks(ctx, 0, 2), [201, 203])
+        self.assertEqual(get_missing_checks(ctx, 0, 2), [202])
+        self.assertEqual(get_remaining(ctx, 0, 2), [2])
+        self.assertEqual({201, 202, 999} - checks, {202, 999})
+        self.assertEqual(ctx.get_save()["location_checks"], {(0, 2): {201, 203}})
+        checks.discard(201)
+        self.assertEqual(set(checks), {203})
+
+    def test_sparse_location_ids(self) -> None:
+        checks = CheckedLocations((5, 9, 20), [20, 9, 10, 21])
+        self.assertIsNone(checks.offset)
+        self.assertEqual(checks.checked(), [9, 20])
+        self.assertEqual(checks.missing(), [5])
+        self.assertNotIn(10, checks)
+
+    def test_other_types(self) -> None:
+        for checks in (CheckedLocations((5, 6, 7)), CheckedLocations((5, 9, 20))):
+            checks.update(["5", 9.0, None, (5,)])
+            self.assertEqual(len(checks), 0)
+            for location_id in ("5", 5.5, None, [5]):
+                self.assertNotIn(location_id, checks)
+                checks.discard(location_id)
+
+
+class TestEncodedPayloads(unittest.TestCase):
+    def test_data_package(self) -> None:
+        ctx = make_context(1)
+        games = ["Archipelago", "Clique"]
+        expected = ctx.dumper([{"cmd": "DataPackage",
+                                "data": {"games": {game: ctx.gamespackage[game] for game in games}}}])
+        self.assertEqual(ctx.get_encoded_data_package(games), expected)
+        self.assertEqual(ctx.get_encoded_data_package(games), expected)
+        self.assertEqual(ctx.get_encoded_data_package([]), ctx.dumper([{"cmd": "DataPackage", "data": {"games": {}}}]))
+
+    def test_room_info(self) -> None:
+        ctx = make_context(1)
+        ctx.games = {1: "Clique"}
+        ctx.seed_name = "seed"
+        ctx.password = "password"
+        (room_info,) = decode(ctx.get_encoded_room_info())
+        self.assertEqual(room_info["cmd"], "RoomInfo")
+        self.assertTrue(room_info["password"])
+        self.assertEqual(set(room_info["games"]), {"Archipelago", "Clique"})
+        self.assertEqual(set(room_info["datapackage_checksums"]), {"Archipelago", "Clique"})
+        self.assertEqual(room_info["seed_name"], "seed")
+        ctx.hint_cost = 5
+        self.assertEqual(decode(ctx.get_encoded_room_info())[0]["hint_cost"], 5)
+
+    def test_connected(self) -> None:
+        ctx = make_context(2)
+        ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Clique", SlotType.player) for slot in (1, 2)}
+        ctx.slot_data = {1: {"color": "red"}, 2: {}}
+
+        def expected(slot: int, slot_data: bool) -> str:
+            packet = {"cmd": "Connected", "team": 0, "slot": slot, "players": ctx.get_players_package(),
+                      "missing_locations": get_missing_checks(ctx, 0, slot),
+                      "checked_locations": get_checked_checks(ctx, 0, slot), "slot_info": ctx.slot_info}
+            if slot_data:
+                packet["slot_data"] = ctx.slot_data[slot]
+            return ctx.dumper(packet)
+
+        self.assertEqual(ctx.get_encoded_connected(0, 1, True), expected(1, True))
+        self.assertEqual(ctx.get_encoded_connected(0, 2, False), expected(2, False))
+        ctx.location_checks[0, 1].add(101)
+        ctx.name_aliases[0, 2] = "Alias"
+        self.assertEqual(ctx.get_encoded_connected(0, 1, True), expected(1, True))
+        self.assertIn("Alias", ctx.get_encoded_connected(0, 1, True))
+
+
+class TestOutboundBatching(unittest.IsolatedAsyncioTestCase):
+    async def send_and_record(self, ctx: Context, send: typing.Callable[[], None]) \
+            -> typing.Dict[int, typing.List[typing.List[dict]]]:
+        """Runs send and returns the frames each slot received, decoded."""
+        frames: typing.Dict[int, typing.List[typing.List[dict]]] = {}
+
+        async def broadcast_send_encoded_msgs(endpoints, msg: str) -> bool:
+            for endpoint in endpoints:
+                frames.setdefault(endpoint.slot, []).append(decode(msg))
+            return True
+
+        ctx.broadcast_send_encoded_msgs = broadcast_send_encoded_msgs
+        ctx.send_encoded_msgs = lambda endpoint, msg: broadcast_send_encoded_msgs((endpoint,), msg)
+        send()
+        await asyncio.sleep(0)
+        return frames
+
+    async def test_location_checks_send_one_frame_per_client(self) -> None:
+        ctx = make_context(3)
+        frames = await self.send_and_record(ctx, lambda: register_location_checks(ctx, 0, 1, [101, 102, 103]))
+
+        self.assertEqual({slot: len(slot_frames) for slot, slot_frames in frames.items()}, {1: 1, 2: 1, 3: 1})
+        for slot, (frame,) in frames.items():
+            commands = [msg["cmd"] for msg in frame]
+            self.assertEqual(commands.count("PrintJSON"), 3)
+            self.assertEqual(commands.count("ReceivedItems"), 1)
+            self.assertEqual(commands.count("RoomUpdate"), 1 if slot == 1 else 0)
+            received = next(msg for msg in frame if msg["cmd"] == "ReceivedItems")
+            self.assertEqual([item.item for item in received["items"]], [slot])
+
+    async def test_found_hints_notify_subscribers(self) -> None:
+        ctx = make_context(3)
+        hint = Hint(2, 1, 102, 2, False)
+        ctx.add_hint(0, 1, hint)
+        ctx.add_hint(0, 2, hint)
+        ctx.stored_data_notification_clients["_read_hints_0_2"].add(ctx.clients[0][2][0])
+        frames = await self.send_and_record(ctx, lambda: register_location_checks(ctx, 0, 1, [102]))
+
+        found_hint = hint._replace(found=True)
+        self.assertEqual(ctx.hints[0, 1], {found_hint})
+        self.assertEqual(ctx.hints[0, 2], {found_hint})
+        self.assertEqual(ctx.unfound_hints, {})
+        (set_reply,) = [msg for msg in frames[2][0] if msg["cmd"] == "SetReply"]
+        self.assertEqual(set_reply["key"], "_read_hints_0_2")
+        self.assertEqual([received["found"] for received in set_reply["value"]], [True])
+        self.assertNotIn("SetReply", [msg["cmd"] for msg in frames[1][0]])
+
+    async def test_collect_only_sends_to_collecting_slot(self) -> None:
+        ctx = make_context(3)
+        frames = await self.send_and_record(ctx, lambda: collect_player(ctx, 0, 2))
+
+        self.assertEqual({slot: len(slot_frames) for slot, slot_frames in frames.items()}, {1: 1, 2: 1, 3: 1})
+        received = [msg for msg in frames[2][0] if msg["cmd"] == "ReceivedItems"]
+        self.assertEqual(len(received), 1)
+        self.assertEqual(sorted(item.location for item in received[0]["items"]), [102, 202, 302])
+        for slot in (1, 3):
+            self.assertNotIn("ReceivedItems", [msg["cmd"] for msg in frames[slot][0]])
+
+
+class TestSaveJournal(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.save_filename = os.path.join(self.directory.name, "test.apsave")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def load(self) -> Context:
+        ctx = make_context(3)
+        ctx.save_filename = self.save_filename
+
+        async def broadcast_send_encoded_msgs(endpoints, msg: str) -> bool:
+            return True
+        ctx.broadcast_send_encoded_msgs = broadcast_send_encoded_msgs
+        ctx._load_save_file()
+        return ctx
+
+    def assertSameSave(self, ctx: Context, loaded: Context) -> None:
+        self.assertEqual(loaded.get_save(), ctx.get_save())
+
+    async def test_replays_journal(self) -> None:
+        ctx = self.load()
+        self.assertTrue(ctx._save())
+        snapshot_size = os.path.getsize(self.save_filename)
+
+        register_location_checks(ctx, 0, 1, [101, 102])
+        ctx.stored_data["key"] = [1]
+        ctx.unjournaled_stored_data.add("key")
+        ctx.hints_used[0, 1] += 1
+        ctx.add_hint(0, 3, Hint(3, 2, 203, 3, False))
+        self.assertTrue(ctx._save())
+        register_location_checks(ctx, 0, 2, [203])
+        ctx.received_items[0, 1, True].append(NetworkItem(1, -1, 0, 0))
+        ctx.name_aliases[0, 2] = "Alias"
+        self.assertTrue(ctx._save())
+        await asyncio.sleep(0)
+
+        self.assertEqual(os.path.getsize(self.save_filename), snapshot_size, "should only append to the journal")
+        self.assertEqual(len(ctx.get_save_delta()), 0)
+        loaded = self.load()
+        self.assertEqual(loaded.location_checks[0, 1], {101, 102})
+        self.assertEqual(loaded.stored_data["key"], [1])
+        self.assertEqual(loaded.name_aliases[0, 2], "Alias")
+        self.assertEqual(loaded.hints[0, 3], {Hint(3, 2, 203, 3, True)})
+        self.assertSameSave(ctx, loaded)
+
+    async def test_no_journal_collects_nothing(self) -> None:
+        ctx = self.load()
+        ctx.journal = None  # as in WebHost rooms, which save elsewhere
+        register_location_checks(ctx, 0, 1, [101, 102])
+        ctx.add_hint(0, 3, Hint(3, 2, 203, 3, False))
+        register_location_checks(ctx, 0, 2, [203])
+        await asyncio.sleep(0)
+
+        self.assertEqual(ctx.location_checks[0, 1], {101, 102})
+        self.assertEqual(ctx.hints[0, 3], {Hint(3, 2, 203, 3, True)})
+        self.assertFalse(ctx.unjournaled_location_checks)
+        self.assertFalse(ctx.unjournaled_hints)
+
+    async def test_compaction_drops_journal(self) -> None:
+        ctx = self.load()
+        ctx.journal_min_compaction_size = 0
+        self.assertTrue(ctx._save())
+        register_location_checks(ctx, 0, 1, [101])
+        self.assertTrue(ctx._save())
+        self.assertGreater(ctx.journal.size, SaveJournal.id_size)
+        ctx.snapshot_size = ctx.journal.size  # as if the journal outgrew the snapshot
+        register_location_checks(ctx, 0, 3, [301])
+        self.assertTrue(ctx._save())
+        await asyncio.sleep(0)
+
+        self.assertEqual(ctx.journal.size, SaveJournal.id_size)
+        self.assertSameSave(ctx, self.load())
+
+    async def test_ignores_incomplete_record(self) -> None:
+        ctx = self.load()
+        self.assertTrue(ctx._save())
+        register_location_checks(ctx, 0, 1, [101])
+        self.assertTrue(ctx._save())
+        await asyncio.sleep(0)
+        with open(ctx.journal.filename, "ab") as f:
+            f.write(b"\0\0\1")
+
+        loaded = self.load()
+        self.assertSameSave(ctx, loaded)
+        register_location_checks(loaded, 0, 2, [201])
+        self.assertTrue(loaded._save())
+        await asyncio.sleep(0)
+        self.assertEqual(self.load().location_checks[0, 2], {201})
@@ -0,0 +1,49 @@
+# Tests for encode and decode in NetUtils.py
+
+import json
+import unittest
+
+import NetUtils
+from NetUtils import Hint, NetworkItem, NetworkPlayer, NetworkSlot, SlotType, decode, encode
+
+
+def reference_encode(obj):
+    def to_json(value):
+        if isinstance(value, tuple) and hasattr(value, "_fields"):
+            return {**{field: to_json(item) for field, item in zip(value._fields, value)},
+                    "class": value.__class__.__name__}
+        if isinstance(value, (list, tuple)):
+            return [to_json(item) for item in value]
+        if isinstance(value, dict):
+            return {key: to_json(item) for key, item in value.items()}
+        return value
+    return json.dumps(to_json(obj), ensure_ascii=False, check_circular=False, separators=(",", ":"))
+
+
+class TestEncode(unittest.TestCase):
+    payloads = [
+        [{"cmd": "ReceivedItems", "index": 3, "items": [NetworkItem(1, 2, 3, 4), NetworkItem(5, 6, 7, 0)]}],
+        [{"cmd": "Connected", "players": [NetworkPlayer(0, 1, "Alias", "Name")], "missing_locations": [1, 2],
+          "slot_info": {1: NetworkSlot("Name", "Game", SlotType.player, [2, 3])}, "slot_data": {"a": 1.5e-05}}],
+        [{"cmd": "DataPackage", "data": {"games": {"Game": {"item_name_to_id": {"Ärger \"\n": 1}, "version": 0}}}}],
+        # mixed and nested tuples, floats and integers that do not fit into 64 bit
+        [NetworkItem(1.5, 2, 3, 4), (NetworkItem(1, 2, 3, 4), 5), {"big": 2 ** 70, "nan": float("nan")},
+         Hint(1, 2, 3, 4, False), [NetworkItem(1, 2, 3, 4), Hint(1, 2, 3, 4, True, "", 0)], True, None, "\ud800"],
+    ]
+
+    def test_identical_to_reference(self):
+        orjson = NetUtils.orjson
+        try:
+            for backend in {orjson, None}:
+                NetUtils.orjson = backend
+                for payload in self.payloads:
+                    with self.subTest(payload=payload, backend=backend):
+                        self.assertEqual(encode(payload), reference_encode(payload))
+        finally:
+            NetUtils.orjson = orjson
+
+    def test_round_trip(self):
+        self.assertEqual(decode(encode(self.payloads[0])), self.payloads[0])
+        self.assertEqual(decode('[{"big": 18446744073709551616, "small": -9223372036854775809}]'),
+                         [{"big": 2 ** 64, "small": -2 ** 63 - 1}])
+        self.assertEqual(decode('[1.5, NaN, "\\ud800"]')[2], "\ud800")
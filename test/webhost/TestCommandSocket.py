@@ -0,0 +1,71 @@
+import asyncio
+import os
+import socket
+import tempfile
+import unittest
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "command sockets need AF_UNIX")
+class TestCommandSocket(unittest.TestCase):
+    def setUp(self) -> None:
+        from WebHostLib.autolauncher import CommonLocker, get_command_socket_path
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        old_folder = CommonLocker.lock_folder
+        CommonLocker.lock_folder = folder.name
+        self.addCleanup(setattr, CommonLocker, "lock_folder", old_folder)
+        self.path = get_command_socket_path(1)
+
+    def run_listener(self, test):
+        """Runs test with room 1 listening for commands, which only polls the database on start and when notified."""
+        from WebHostLib.customserver import WebHostContext
+        ctx = WebHostContext.__new__(WebHostContext)
+        ctx.room_id = 1
+        ctx.db_command_poll_interval = 60
+
+        async def main():
+            polled = asyncio.Queue()
+
+            def pop_db_commands():
+                ctx.main_loop.call_soon_threadsafe(polled.put_nowait, None)
+                return []
+
+            ctx.main_loop = asyncio.get_running_loop()
+            ctx.exit_event = asyncio.Event()
+            ctx.pop_db_commands = pop_db_commands
+            listener = asyncio.create_task(ctx.listen_to_db_commands())
+            await asyncio.wait_for(polled.get(), 5)
+            try:
+                await test(polled)
+            finally:
+                ctx.exit_event.set()
+                listener.cancel()
+                try:
+                    await listener
+                except asyncio.CancelledError:
+                    pass
+
+        asyncio.run(main())
+
+    def test_notify_wakes_up_room(self):
+        from WebHostLib.autolauncher import notify_room
+
+        async def test(polled: asyncio.Queue):
+            self.assertTrue(os.path.exists(self.path))
+            for _ in range(3):
+                notify_room(1)
+                await asyncio.wait_for(polled.get(), 5)
+
+        self.run_listener(test)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_keeps_socket_of_next_process(self):
+        replacement = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.addCleanup(replacement.close)
+
+        async def test(polled: asyncio.Queue):
+            os.unlink(self.path)
+            replacement.bind(self.path)
+
+        self.run_listener(test)
+        self.assertTrue(os.path.exists(self.path))
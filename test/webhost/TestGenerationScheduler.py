@@ -0,0 +1,181 @@
+import multiprocessing
+import queue
+import time
+import unittest
+import uuid
+from unittest import mock
+
+
+class FakeProcess:
+    def __init__(self):
+        self.running = True
+
+    def is_alive(self) -> bool:
+        return self.running
+
+    def terminate(self):
+        self.running = False
+
+    def join(self):
+        pass
+
+
+class TestGenerationScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        from WebHostLib import autolauncher
+
+        class FakeWorker(autolauncher.GeneratorWorker):
+            """Runs no process, its jobs are finished by the test sending their results."""
+            def start(self):
+                self.close_results()
+                self.job_queue = queue.Queue()
+                self.results, self.sender = multiprocessing.Pipe(duplex=False)
+                self.process = FakeProcess()
+                self.jobs_done = 0
+
+            def finish(self, error=None):
+                self.sender.send((self.job.sid, None if error else uuid.uuid4(), error))
+
+        class FakeScheduler(autolauncher.GenerationScheduler):
+            worker_type = FakeWorker
+
+        self.scheduler_type = FakeScheduler
+        self.errors = {}
+        self.seeds = []
+        patches = [mock.patch.object(autolauncher, "set_generation_error",
+                                     lambda sid, message: self.errors.__setitem__(sid, message)),
+                   mock.patch.object(autolauncher, "handle_generation_success", self.seeds.append),
+                   mock.patch.object(autolauncher, "generation_fork", False)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def make_scheduler(self, generators=1, memory=0, job_time=None, max_jobs=0):
+        scheduler = self.scheduler_type({"PONY": {}, "GENERATORS": generators, "GENERATOR_MEMORY": memory,
+                                         "JOB_TIME": job_time, "GENERATOR_MAX_JOBS": max_jobs})
+        self.addCleanup(scheduler.close)
+        return scheduler
+
+    @staticmethod
+    def queue_job(scheduler, memory: float, waited: float = 0):
+        from WebHostLib.autolauncher import GenerationJob
+        sid = uuid.uuid4()
+        scheduler.queue[sid] = GenerationJob(sid, {}, {}, uuid.uuid4(), memory, time.monotonic() - waited)
+        return sid
+
+    def running(self, scheduler):
+        return [worker.job.sid for worker in scheduler.workers if worker.job]
+
+    def test_smallest_first(self):
+        scheduler = self.make_scheduler()
+        large, small, medium = (self.queue_job(scheduler, memory) for memory in (300, 100, 200))
+        order = []
+        for _ in range(3):
+            scheduler.schedule()
+            order += self.running(scheduler)
+            scheduler.workers[0].finish()
+            scheduler.collect()
+        self.assertEqual(order, [small, medium, large])
+        self.assertEqual(len(self.seeds), 3)
+
+    def test_memory_budget(self):
+        scheduler = self.make_scheduler(generators=3, memory=500)
+        large, small, medium = (self.queue_job(scheduler, memory) for memory in (400, 200, 300))
+        scheduler.schedule()
+        # the large one waits for memory, with a worker left idle
+        self.assertCountEqual(self.running(scheduler), [small, medium])
+        for worker in scheduler.workers:
+            if worker.job:
+                worker.finish()
+        scheduler.collect()
+        scheduler.schedule()
+        self.assertEqual(self.running(scheduler), [large])
+
+        # runs alone even when it exceeds the budget
+        next(worker for worker in scheduler.workers if worker.job).finish()
+        scheduler.collect()
+        too_large = self.queue_job(scheduler, 1000)
+        scheduler.schedule()
+        self.assertEqual(self.running(scheduler), [too_large])
+
+    def test_overdue_first(self):
+        scheduler = self.make_scheduler(job_time=10)
+        self.queue_job(scheduler, 100)
+        overdue = self.queue_job(scheduler, 1000, waited=20)
+        scheduler.schedule()
+        self.assertEqual(self.running(scheduler), [overdue])
+
+    def test_recycles_worker(self):
+        scheduler = self.make_scheduler(max_jobs=2)
+        worker = scheduler.workers[0]
+        first_process = worker.process
+        first_jobs = worker.job_queue
+        for _ in range(2):
+            self.queue_job(scheduler, 100)
+            scheduler.schedule()
+            worker.finish()
+            scheduler.collect()
+        self.assertIsNot(worker.process, first_process)
+        self.assertIsNone(first_jobs.queue[-1])  # lets the previous process exit
+        self.assertEqual(worker.jobs_done, 0)
+
+    def test_terminates_overdue_generation(self):
+        from WebHostLib.autolauncher import generation_timeout_error
+        scheduler = self.make_scheduler(job_time=10)
+        worker = scheduler.workers[0]
+        sid = self.queue_job(scheduler, 100)
+        scheduler.schedule()
+        process = worker.process
+        worker.job_start -= 20
+        scheduler.collect()
+        self.assertFalse(process.running)
+        self.assertEqual(self.errors, {sid: generation_timeout_error})
+        self.assertIsNone(worker.job)
+        self.assertTrue(worker.alive())
+
+    def test_reports_errors_and_ended_processes(self):
+        scheduler = self.make_scheduler(generators=2)
+        failing, ending = self.queue_job(scheduler, 100), self.queue_job(scheduler, 200)
+        scheduler.schedule()
+        failing_worker, ending_worker = sorted(scheduler.workers, key=lambda worker: worker.job.memory)
+        failing_worker.finish(("Exception: failed", "Traceback"))
+        ending_worker.process.running = False
+        ending_worker.sender.close()
+        scheduler.collect()
+        self.assertEqual(self.errors, {failing: "Exception: failed",
+                                       ending: "Generation process ended unexpectedly."})
+        self.assertEqual(self.running(scheduler), [])
+        self.assertEqual(self.seeds, [])
+
+
+class TestGeneratorWorker(unittest.TestCase):
+    def test_forked_generation_results(self):
+        import multiprocessing.util
+        import os
+        import signal
+        from WebHostLib import autolauncher
+        if not autolauncher.generation_fork:
+            self.skipTest("generations only fork on Linux")
+
+        def generate_seed(options, meta, owner, sid):
+            if meta["exit_after_result"]:
+                multiprocessing.util.Finalize(None, os._exit, args=(3,), exitpriority=0)
+            else:
+                os._exit(5)
+            return sid
+
+        jobs = multiprocessing.Queue()
+        sids = [uuid.uuid4(), uuid.uuid4()]
+        for sid, exit_after_result in zip(sids, (True, False)):
+            jobs.put((sid, {}, {"exit_after_result": exit_after_result}, uuid.uuid4()))
+        jobs.put(None)
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self.addCleanup(signal.signal, signal.SIGTERM, signal.getsignal(signal.SIGTERM))
+        with mock.patch.object(autolauncher, "init_db"), mock.patch.object(autolauncher.db, "disconnect"), \
+                mock.patch.object(autolauncher, "generate_seed", generate_seed):
+            autolauncher.run_generator_worker(0, {}, jobs, sender)
+
+        # a generation process failing after it sent its result still succeeded
+        self.assertEqual(receiver.recv(), (sids[0], sids[0], None))
+        self.assertEqual(receiver.recv(), (sids[1], None, ("Generation process ended unexpectedly.", "Exit code 5")))
+        self.assertFalse(receiver.poll())
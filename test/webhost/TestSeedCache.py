@@ -0,0 +1,35 @@
+import unittest
+
+from NetUtils import NetworkSlot, SlotType
+
+
+class TestSeedCache(unittest.TestCase):
+    def test_round_trip(self):
+        from WebHostLib.customserver import dump_seed_cache, load_seed_cache
+        multidata = {
+            "seed_name": "12345",
+            "slot_info": {1: NetworkSlot("Player1", "Clique", SlotType.player),
+                          2: NetworkSlot("Player2", "Clique", SlotType.player)},
+            "connect_names": {"Player1": (0, 1), "Player2": (0, 2)},
+            "locations": {1: {69696969: (69696969, 2, 1)}, 2: {69696969: (69696968, 1, 0)}},
+            "slot_data": {1: {"color": "red"}, 2: {"color": "blue"}},
+            "checks_in_area": {1: {"Total": 1}, 2: {"Total": 1}},
+        }
+        cached = load_seed_cache(dump_seed_cache(multidata))
+
+        for key in ("seed_name", "slot_info", "connect_names", "locations", "checks_in_area"):
+            self.assertEqual(cached[key], multidata[key])
+        self.assertEqual(list(cached["slot_data"]), [1, 2])
+        self.assertEqual(cached["slot_data"][2], {"color": "blue"})
+        self.assertIs(cached["slot_data"][2], cached["slot_data"][2])
+
+    def test_rejects_other_data(self):
+        from WebHostLib.customserver import load_seed_cache
+        with self.assertRaises(ValueError):
+            load_seed_cache(b"\x03compressed multidata")
+
+    def test_rejects_other_globals(self):
+        import pickle
+        from WebHostLib.customserver import load_seed_cache, seed_cache_magic
+        with self.assertRaises(pickle.UnpicklingError):
+            load_seed_cache(seed_cache_magic + pickle.dumps(({"seed_name": unittest.TestCase}, {})))
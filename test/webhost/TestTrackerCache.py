@@ -0,0 +1,41 @@
+import unittest
+import uuid
+
+
+class TestStaticRoomDataCache(unittest.TestCase):
+    def setUp(self) -> None:
+        from WebHostLib import app
+        self.config = app.config
+        self.old_config = {key: app.config[key] for key in ("TRACKER_CACHE_SIZE", "TRACKER_CACHE_SHARED")}
+
+    def tearDown(self) -> None:
+        self.config.update(self.old_config)
+
+    def test_evicts_least_recently_used(self):
+        from WebHostLib.tracker import StaticRoomDataCache
+        cache = StaticRoomDataCache()
+        seeds = [uuid.uuid4() for _ in range(3)]
+        entry_size = 100 * StaticRoomDataCache.memory_per_pickled_byte
+        self.config.update({"TRACKER_CACHE_SIZE": entry_size * 2, "TRACKER_CACHE_SHARED": False})
+        cache._add(seeds[0], ("first",), entry_size)
+        cache._add(seeds[1], ("second",), entry_size)
+        self.assertEqual(cache.get(seeds[0]), ("first",))
+        cache._add(seeds[2], ("third",), entry_size)
+
+        self.assertIsNone(cache.get(seeds[1]))
+        self.assertEqual(cache.get(seeds[2]), ("third",))
+        cache._add(seeds[1], ("too big",), entry_size * 3)
+        self.assertIsNone(cache.get(seeds[1]))
+        self.assertEqual(cache.stats(), {"entries": 2, "bytes": entry_size * 2, "max_bytes": entry_size * 2,
+                                         "hits": 2, "shared_hits": 0, "misses": 2})
+
+    def test_shared(self):
+        from WebHostLib.tracker import StaticRoomDataCache
+        self.config.update({"TRACKER_CACHE_SIZE": 1024 * 1024, "TRACKER_CACHE_SHARED": True})
+        seed = uuid.uuid4()
+        StaticRoomDataCache().set(seed, ("data",))
+        cache = StaticRoomDataCache()
+
+        self.assertEqual(cache.get(seed), ("data",))
+        self.assertEqual(cache.get(seed), ("data",))
+        self.assertEqual((cache.hits, cache.shared_hits, cache.misses), (1, 1, 0))
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+import uuid
+
+
+class TestTrackerEvents(unittest.TestCase):
+    def test_read(self):
+        from WebHostLib.customserver import read_tracker_events
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "room.jsonl")
+            self.assertEqual(read_tracker_events(path, 0), ([], 0))
+            with open(path, "wb") as f:
+                f.write(b'{"type":"status","team":0,"slot":1,"status":30}\n{"type":"check"')
+            events, offset = read_tracker_events(path, 0)
+            self.assertEqual(events, [{"type": "status", "team": 0, "slot": 1, "status": 30}])
+
+            # the second event is still being written
+            self.assertEqual(read_tracker_events(path, offset), ([], offset))
+            self.assertEqual(read_tracker_events(path, offset + 3), ([], offset + 3))
+            with open(path, "ab") as f:
+                f.write(b',"team":0,"slot":1,"locations":[5]}\n')
+            events, end = read_tracker_events(path, offset)
+            self.assertEqual(events, [{"type": "check", "team": 0, "slot": 1, "locations": [5]}])
+            self.assertEqual(end, os.path.getsize(path))
+            # within an event, continues with the next one
+            self.assertEqual(read_tracker_events(path, 3), (events, end))
+            self.assertEqual(read_tracker_events(path, 0, 1)[1], offset)
+            # written anew after pruning
+            self.assertEqual(read_tracker_events(path, end + 100), (None, 0))
+
+    def test_rotate(self):
+        from WebHostLib.customserver import WebHostContext, get_tracker_events_end, read_tracker_events
+        ctx = WebHostContext.__new__(WebHostContext)
+        ctx.room_id = f"test-{uuid.uuid4()}"
+        ctx.open_tracker_events(100)
+        try:
+            path = ctx.tracker_events_path
+            self.assertEqual(read_tracker_events(path, 100), ([], 100))
+            for slot in (1, 2, 3):
+                ctx.write_tracker_event({"type": "status", "team": 0, "slot": slot, "status": 30})
+            self.assertEqual(get_tracker_events_end(path), ctx.tracker_events_size)
+            events, offset = read_tracker_events(path, 100, 1)
+            self.assertEqual([event["slot"] for event in events], [1])
+
+            ctx.rotate_tracker_events(offset)
+            self.assertEqual(read_tracker_events(path, 100), (None, offset))
+            events, end = read_tracker_events(path, offset)
+            self.assertEqual([event["slot"] for event in events], [2, 3])
+            self.assertEqual(end, ctx.tracker_events_size)
+
+            # a restarted room continues where it left off
+            ctx.open_tracker_events(0)
+            self.assertEqual((ctx.tracker_events_base, ctx.tracker_events_size), (offset, end))
+        finally:
+            os.unlink(ctx.tracker_events_path)
+
+    def test_tracker_save(self):
+        from WebHostLib.customserver import dump_tracker_save, load_tracker_save
+        save = {
+            "version": 2,
+            "connect_names": {"Player1": (0, 1)},
+            "location_checks": {(0, 1): {69696969}, (0, 2): set()},
+            "received_items": {(0, 1, True): [], (0, 2, True): []},
+            "hints": {(0, 1): set()},
+            "tracker": {"events_offset": 100},
+        }
+        loaded = load_tracker_save(dump_tracker_save(save))
+
+        self.assertNotIn("connect_names", loaded)
+        for key in ("version", "hints", "tracker"):
+            self.assertEqual(loaded[key], save[key])
+        self.assertEqual(list(loaded["location_checks"]), [(0, 1), (0, 2)])
+        self.assertEqual(loaded["location_checks"][0, 1], {69696969})
+        self.assertEqual(dict(loaded["received_items"]), save["received_items"])
+        with self.assertRaises(ValueError):
+            load_tracker_save(b"\x80multisave")
+
+    def test_tracker_save_rejects_other_globals(self):
+        import pickle
+        from WebHostLib.customserver import load_tracker_save, tracker_save_magic
+        with self.assertRaises(pickle.UnpicklingError):
+            load_tracker_save(tracker_save_magic + pickle.dumps(({"version": unittest.TestCase}, {})))
+        loaded = load_tracker_save(tracker_save_magic + pickle.dumps(
+            ({}, {"location_checks": {(0, 1): pickle.dumps(unittest.TestCase)}})))
+        with self.assertRaises(pickle.UnpicklingError):
+            loaded["location_checks"][0, 1]
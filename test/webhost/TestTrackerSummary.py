@@ -0,0 +1,37 @@
+import unittest
+
+
+class TestTrackerSummary(unittest.TestCase):
+    locations = {1: {100: (200, 2, 1), 101: (201, 3, 0), 102: (202, 1, 0)}, 2: {110: (210, 1, 1)}}
+    groups = {3: {1, 2}}
+    checks_in_area = {1: {"Light World": [102], "Hyrule Castle": [100, 101], "Total": 3},
+                      2: {"Light World": [110], "Total": 1}}
+
+    def create_summary(self):
+        from WebHostLib.customserver import TrackerSummary
+        return TrackerSummary(self.locations, self.groups, TrackerSummary.get_location_areas(self.checks_in_area),
+                              {1: [300], 2: []}, [(0, 1), (0, 2)])
+
+    def test_count_checks(self):
+        summary = self.create_summary()
+        summary.count_checks(0, 1, {100, 101})
+        summary.count_checks(0, 1, [102, 999])  # unknown locations are ignored
+        summary.count_checks(0, 3, [100])  # groups have no locations
+        dump = summary.dump([((0, 1), 1234.5)])
+
+        self.assertEqual(dump["inventory"], {(0, 1): {300: 1, 201: 1, 202: 1}, (0, 2): {200: 1, 201: 1}})
+        self.assertEqual(dump["checks_done"], {(0, 1): {"Hyrule Castle": 2, "Light World": 1, "Total": 3}, (0, 2): {}})
+        self.assertEqual(dump["activity"], {(0, 1): 1234.5})
+
+    def test_aggregates_old_saves(self):
+        from WebHostLib.tracker import get_location_table, get_tracker_summary
+        summary = self.create_summary()
+        summary.count_checks(0, 2, [110])
+        multisave = {"location_checks": {(0, 1): set(), (0, 2): {110}}, "client_activity_timers": (((0, 2), 10.0),)}
+        location_to_area = {player: get_location_table(areas) for player, areas in self.checks_in_area.items()}
+
+        aggregated = get_tracker_summary(multisave, self.locations, [["Player1", "Player2", "Group"]], self.groups,
+                                         {1: [300], 2: []}, location_to_area)
+        self.assertEqual(aggregated, summary.dump([((0, 2), 10.0)]))
+        multisave["tracker"] = summary.dump([])
+        self.assertIs(get_tracker_summary(multisave, self.locations, [], self.groups, {}, {}), multisave["tracker"])
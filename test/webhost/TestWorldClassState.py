@@ -0,0 +1,35 @@
+import unittest
+
+
+class TestWorldClassState(unittest.TestCase):
+    def test_restores_world_class_attributes(self):
+        from WebHostLib.autolauncher import WorldClassState
+        from worlds.AutoWorld import AutoWorldRegister
+        world_type = AutoWorldRegister.world_types["Clique"]
+        item_name_to_id = world_type.item_name_to_id
+        topology_present = world_type.topology_present
+        state = WorldClassState()
+
+        world_type.added_by_generation = True
+        world_type.topology_present = not topology_present
+        world_type.item_name_to_id["Added by generation"] = -1
+        state.restore()
+
+        self.assertFalse(hasattr(world_type, "added_by_generation"))
+        self.assertEqual(world_type.topology_present, topology_present)
+        self.assertIs(world_type.item_name_to_id, item_name_to_id)
+        self.assertNotIn("Added by generation", world_type.item_name_to_id)
+
+    def test_restores_nested_contents(self):
+        from WebHostLib.autolauncher import WorldClassState
+        from worlds.AutoWorld import AutoWorldRegister
+        world_type = AutoWorldRegister.world_types["Clique"]
+        world_type.nested_test_attribute = {"items": ["first"]}
+        try:
+            state = WorldClassState()
+            for _ in range(2):
+                world_type.nested_test_attribute["items"].append("added by generation")
+                state.restore()
+                self.assertEqual(world_type.nested_test_attribute, {"items": ["first"]})
+        finally:
+            del world_type.nested_test_attribute
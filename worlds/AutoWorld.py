@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import concurrent.futures
 import hashlib
+import itertools
 import logging
+import os
 import pathlib
 import sys
 from typing import Any, Callable, ClassVar, Dict, FrozenSet, List, Optional, Set, TYPE_CHECKING, TextIO, Tuple, Type, \
@@ -11,7 +14,7 @@ from BaseClasses import CollectionState
 from Options import AssembleOptions
 
 if TYPE_CHECKING:
-    from BaseClasses import MultiWorld, Item, Location, Tutorial
+    from BaseClasses import MultiWorld, Item, Location, Region, Tutorial
     from . import GamesPackage
 
 
@@ -84,6 +87,14 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
     return method(*args)
 
 
+def _assert_unique_items(multiworld: "MultiWorld", player: int, new_items: List[Item]) -> None:
+    for i, item in enumerate(new_items):
+        for other in new_items[i+1:]:
+            assert item is not other, (
+                f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+
+
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types: Set[AutoWorldRegister] = set()
     for player in multiworld.player_ids:
@@ -91,12 +102,7 @@ def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
         world_types.add(multiworld.worlds[player].__class__)
         call_single(multiworld, method_name, player, *args)
         if __debug__:
-            new_items = multiworld.itempool[prev_item_count:]
-            for i, item in enumerate(new_items):
-                for other in new_items[i+1:]:
-                    assert item is not other, (
-                        f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
-                        f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+            _assert_unique_items(multiworld, player, multiworld.itempool[prev_item_count:])
 
     # TODO: investigate: Iterating through a set is not a deterministic order.
     # If any random is used, this could make unreproducible seed.
@@ -106,6 +112,75 @@ def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
             stage_callable(multiworld, *args)
 
 
+def _new_objects(objects: List[Any], before: List[Any]) -> List[Any]:
+    """Objects in the list that weren't in it before, in order."""
+    if objects[:len(before)] == before:
+        return objects[len(before):]  # only appended to
+    known = {id(obj) for obj in before}
+    return [obj for obj in objects if id(obj) not in known]
+
+
+def _put_in_player_order(objects: List[Any], added: Dict[int, List[Any]]) -> None:
+    """Reorders the objects added by each player so the list ends up as if the players had added them in order."""
+    new = {id(obj) for player_added in added.values() for obj in player_added}
+    present = {id(obj) for obj in objects}
+    objects[:] = [obj for obj in objects if id(obj) not in new] + \
+        [obj for player in sorted(added) for obj in added[player] if id(obj) in present]
+
+
+def call_all_parallel(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
+    """
+    Same as call_all, but runs the method of worlds that declare parallel_generation in a thread pool of up to one
+    thread per CPU. Players still take turns in order: consecutive players with parallel_generation run together after
+    the players before them and before the players after them, so every other world sees the multiworld as call_all
+    would leave it. The regions and items added by the players running together are put in player order afterwards.
+    """
+    world_types: Set[AutoWorldRegister] = set()
+    for parallel, players in itertools.groupby(multiworld.player_ids,
+                                               lambda player: multiworld.worlds[player].parallel_generation):
+        players = list(players)
+        if parallel and len(players) > 1:
+            _call_together(multiworld, method_name, players, *args)
+        else:
+            for player in players:
+                prev_item_count = len(multiworld.itempool)
+                call_single(multiworld, method_name, player, *args)
+                if __debug__:
+                    _assert_unique_items(multiworld, player, multiworld.itempool[prev_item_count:])
+        world_types.update(multiworld.worlds[player].__class__ for player in players)
+
+    for world_type in world_types:
+        stage_callable = getattr(world_type, f"stage_{method_name}", None)
+        if stage_callable:
+            stage_callable(multiworld, *args)
+
+
+def _call_together(multiworld: "MultiWorld", method_name: str, players: List[int], *args: Any) -> None:
+    """Runs the method of players, which all declare parallel_generation, in a thread pool."""
+    regions, itempool = multiworld.regions[:], multiworld.itempool[:]
+    multiworld.random.passthrough = False
+    try:
+        with concurrent.futures.ThreadPoolExecutor(min(os.cpu_count() or 1, len(players))) as executor:
+            futures = [executor.submit(call_single, multiworld, method_name, player, *args) for player in players]
+    finally:
+        multiworld.random.passthrough = True
+    for future in futures:
+        future.result()  # raises the exception of the first failing player, if any
+
+    # worlds generating in parallel may only add their own regions and items
+    added_regions: Dict[int, List[Region]] = {player: [] for player in players}
+    added_items: Dict[int, List[Item]] = {player: [] for player in players}
+    for region in _new_objects(multiworld.regions, regions):
+        added_regions.setdefault(region.player, []).append(region)
+    for item in _new_objects(multiworld.itempool, itempool):
+        added_items.setdefault(item.player, []).append(item)
+    if __debug__:
+        for player in players:
+            _assert_unique_items(multiworld, player, added_items[player])
+    _put_in_player_order(multiworld.regions, added_regions)
+    _put_in_player_order(multiworld.itempool, added_items)
+
+
 def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types = {multiworld.worlds[player].__class__ for player in multiworld.player_ids}
     for world_type in world_types:
@@ -187,6 +262,12 @@ class World(metaclass=AutoWorldRegister):
     hidden: ClassVar[bool] = False
     """Hide World Type from various views. Does not remove functionality."""
 
+    parallel_generation: ClassVar[bool] = False
+    """
+    Set to True if generate_early, create_regions, create_items, set_rules and generate_basic of this world only touch
+    its own slot and use multiworld.per_slot_randoms instead of multiworld.random, to let them run in a thread pool.
+    """
+
     web: ClassVar[WebWorld] = WebWorld()
     """see WebWorld for options"""
 
@@ -243,6 +243,8 @@ def parse_arguments(argv, no_defaults=False):
     parser.add_argument('--game', default="A Link to the Past")
     parser.add_argument('--race', default=defval(False), action='store_true')
     parser.add_argument('--outputname')
+    parser.add_argument('--profile', default=defval(False), action='store_true',
+                        help='Write a JSON report of generation timings next to the output.')
     if multiargs.multi:
         for player in range(1, multiargs.multi + 1):
             parser.add_argument(f'--p{player}', default=defval(''), help=argparse.SUPPRESS)
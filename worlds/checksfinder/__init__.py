@@ -28,6 +28,7 @@ class ChecksFinderWorld(World):
     game: str = "ChecksFinder"
     option_definitions = checksfinder_options
     topology_present = True
+    parallel_generation = True
     web = ChecksFinderWeb()
 
     item_name_to_id = {name: data.code for name, data in item_table.items()}
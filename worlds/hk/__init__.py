@@ -530,7 +530,8 @@ class HKWorld(World):
             for effect_name, effect_value in item_effects.get(item.name, {}).items():
                 if state.prog_items[effect_name, item.player] == effect_value:
                     del state.prog_items[effect_name, item.player]
-                state.prog_items[effect_name, item.player] -= effect_value
+                else:
+                    state.prog_items[effect_name, item.player] -= effect_value
 
         return change
 